@@ -0,0 +1,380 @@
+import argparse
+import asyncio
+import json
+import logging
+import math
+import re
+import secrets
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import audit
+import db
+import ids
+import ledger
+import partitions
+import passwords
+import services
+from writer import SerialWriter, WriterBusy
+
+# Local HTTP/JSON API over the service layer, so branch terminals and scripts
+# can work against one database concurrently:
+#
+#   python api.py [--host 127.0.0.1] [--port 8080] [--db time_bank.db] [--archive-interval 86400]
+#
+#   POST   /login                 {"username", "password"} -> {"token", ...}
+#   GET    /branches
+#   GET    /accounts?q=term[&limit=&offset=]
+#   GET    /accounts/<account_no>
+#   POST   /accounts              {"cust_name", "dob", "phone", "city", "address",
+#                                  "email", "account_type"[, "initial_deposit", "branch_id"]}
+#   POST   /transactions          {"account_no", "type", "amount"[, "description"]}
+#   POST   /transfers             {"from_account", "to_account", "amount"[, "description"]}
+#   GET    /metrics
+#   POST   /employees             {"emp_name", "gender", "branch_id", "job_title",
+#                                  "dob", "phone", "city", "address", "email"}
+#   DELETE /employees/<emp_id>
+#
+# Every route except /login needs "Authorization: Bearer <token>" from a
+# login by an employee of a department allowed on it, the same split as the
+# dashboards. Reads run on a thread pool with their own pooled connections
+# (parallel under WAL); writes go through one SerialWriter, so concurrent
+# clients never contend for SQLite's write lock. IDs and password hashes are
+# prepared on the read pool before a write is queued, keeping the writer's
+# transactions short. The server also archives closed months of transactions
+# (partitions.ArchiveService) every --archive-interval seconds; 0 turns that
+# off, for deployments that schedule `python -m partitions archive` instead.
+
+HR = 107
+ACCOUNTANT = 101
+MANAGER = 102
+
+TELLERS = {ACCOUNTANT, MANAGER}
+
+MAX_BODY = 64 * 1024
+
+# Expired sessions are dropped at most this often (on a login)
+SESSION_SWEEP_INTERVAL = 60.0
+
+REASONS = {
+    200: "OK", 201: "Created", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden", 404: "Not Found",
+    405: "Method Not Allowed", 413: "Payload Too Large", 422: "Unprocessable Entity", 429: "Too Many Requests",
+    500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+ACCOUNT_FIELDS = ("account_no", "cust_name", "balance", "account_type", "opened_date", "status")
+SEARCH_FIELDS = ("account_no", "cust_name", "phone", "city", "account_type", "balance", "status")
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _log():
+    return logging.getLogger("timebank.api")
+
+
+def _field(body, name, kind=str, default=None):
+    value = body.get(name, default)
+    if value is None:
+        raise HttpError(400, f"Missing field: {name}")
+    # int() would accept true and truncate 12.9
+    if kind in (int, float) and isinstance(value, bool):
+        raise HttpError(400, f"Invalid {name}")
+    if kind is int and isinstance(value, float) and not value.is_integer():
+        raise HttpError(400, f"Invalid {name}")
+    try:
+        value = kind(value)
+    except (TypeError, ValueError):
+        raise HttpError(400, f"Invalid {name}")
+    # float() takes "inf" and "nan", and json.loads takes Infinity and NaN
+    if kind is float and not math.isfinite(value):
+        raise HttpError(400, f"Invalid {name}")
+    return value
+
+
+class ApiServer:
+    def __init__(self, readers=8, session_ttl=8 * 3600.0, writer=None):
+        self.session_ttl = session_ttl
+        self.writer = writer or SerialWriter(db.get_pool())
+        self._readers = ThreadPoolExecutor(readers, thread_name_prefix="api-reader")
+        # token: (emp_id, emp_name, dep_id, job_title, expires)
+        self._sessions = {}
+        self._swept_at = time.monotonic()
+
+        # (method, path pattern, handler, departments allowed; None for anyone)
+        self._routes = [
+            ("POST", r"/login", self.login, None),
+            ("GET", r"/branches", self.branches, {HR} | TELLERS),
+            ("GET", r"/accounts", self.search_accounts, TELLERS),
+            ("GET", r"/accounts/(\d+)", self.get_account, TELLERS),
+            ("POST", r"/accounts", self.create_account, TELLERS),
+            ("POST", r"/transactions", self.post_transaction, TELLERS),
+            ("POST", r"/transfers", self.transfer, TELLERS),
+            ("GET", r"/metrics", self.metrics, {MANAGER}),
+            ("POST", r"/employees", self.hire_employee, {HR}),
+            ("DELETE", r"/employees/(\d+)", self.fire_employee, {HR}),
+        ]
+        self._routes = [(method, re.compile(pattern + "$"), handler, departments)
+                        for method, pattern, handler, departments in self._routes]
+
+    async def read(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._readers, fn, *args)
+
+    async def write(self, fn, *args):
+        try:
+            future = self.writer.submit(fn, *args)
+        except WriterBusy as e:
+            raise HttpError(503, str(e))
+        return await asyncio.wrap_future(future)
+
+    # Routing and sessions
+
+    def _employee(self, headers, departments):
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        session = self._sessions.get(token) if scheme.lower() == "bearer" else None
+        if session is None or session[4] < time.monotonic():
+            self._sessions.pop(token, None)
+            raise HttpError(401, "Login required")
+        if session[2] not in departments:
+            raise HttpError(403, "Not allowed for your department")
+        return session
+
+    def _sweep_sessions(self):
+        now = time.monotonic()
+        if now - self._swept_at >= SESSION_SWEEP_INTERVAL:
+            self._swept_at = now
+            for token in [token for token, session in self._sessions.items() if session[4] < now]:
+                del self._sessions[token]
+
+    def _revoke_sessions(self, emp_id):
+        for token in [token for token, session in self._sessions.items() if session[0] == emp_id]:
+            del self._sessions[token]
+
+    async def dispatch(self, method, target, headers, body):
+        url = urlsplit(target)
+        allowed = False
+        for route_method, pattern, handler, departments in self._routes:
+            match = pattern.match(url.path)
+            if not match:
+                continue
+            allowed = True
+            if route_method != method:
+                continue
+            employee = self._employee(headers, departments) if departments is not None else None
+            query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            return await handler(employee, body, query, *match.groups())
+        raise HttpError(405 if allowed else 404, "Method not allowed" if allowed else "Not found")
+
+    # Handlers: (status, payload)
+
+    async def login(self, employee, body, query):
+        username = _field(body, "username")
+        password = _field(body, "password")
+        try:
+            result = await self.read(services.authenticate, username, password)
+        except passwords.TooManyAttempts as e:
+            raise HttpError(429, str(e))
+        if result is None:
+            raise HttpError(401, "Invalid username or password")
+        emp_id, emp_name, dep_id, job_title = result
+        if job_title is None:
+            raise HttpError(403, "Employee is no longer active")
+
+        self._sweep_sessions()
+        token = secrets.token_urlsafe(32)
+        self._sessions[token] = (emp_id, emp_name, dep_id, job_title, time.monotonic() + self.session_ttl)
+        return 200, {"token": token, "emp_id": emp_id, "emp_name": emp_name, "dep_id": dep_id,
+                     "job_title": job_title}
+
+    async def branches(self, employee, body, query):
+        rows = await self.read(services.load_branches)
+        return 200, [{"branch_id": branch_id, "branch_name": name} for branch_id, name in rows]
+
+    async def search_accounts(self, employee, body, query):
+        term = _field(query, "q")
+        limit = min(_field(query, "limit", int, 20), 100)
+        offset = _field(query, "offset", int, 0)
+        rows = await self.read(services.search_accounts, term, limit, offset)
+        return 200, [dict(zip(SEARCH_FIELDS, row)) for row in rows]
+
+    async def get_account(self, employee, body, query, account_no):
+        account = await self.read(services.find_account, account_no)
+        if account is None or account[0] != int(account_no):
+            raise HttpError(404, "Account not found")
+        return 200, dict(zip(ACCOUNT_FIELDS, account))
+
+    async def create_account(self, employee, body, query):
+        account_type = _field(body, "account_type")
+        if account_type not in services.ACCOUNT_TYPES:
+            raise HttpError(400, "Invalid account_type")
+        initial_deposit = _field(body, "initial_deposit", float, 0.0)
+        if initial_deposit < 0:
+            raise HttpError(400, "Invalid initial_deposit")
+        branch_id = _field(body, "branch_id", int) if body.get("branch_id") is not None else None
+        details = (_field(body, "cust_name"), _field(body, "dob"), _field(body, "phone", int),
+                   _field(body, "city"), _field(body, "address"), _field(body, "email"))
+
+        cust_id, account_no = await self.read(lambda: (ids.next_cust_id(), ids.next_account_no()))
+        await self.write(services.apply_account_opening, cust_id, account_no, *details, account_type,
+                         initial_deposit, branch_id)
+        return 201, {"cust_id": cust_id, "account_no": account_no}
+
+    async def post_transaction(self, employee, body, query):
+        transaction_id, balance = await self.write(
+            ledger.apply_posting, _field(body, "account_no", int), _field(body, "type"),
+            _field(body, "amount", float), _field(body, "description", str, ""))
+        return 201, {"transaction_id": transaction_id, "balance": balance}
+
+    async def transfer(self, employee, body, query):
+        debit_id, credit_id, from_balance, to_balance = await self.write(
+            ledger.apply_transfer, _field(body, "from_account", int), _field(body, "to_account", int),
+            _field(body, "amount", float), _field(body, "description", str, ""))
+        return 201, {"debit_transaction_id": debit_id, "credit_transaction_id": credit_id,
+                     "from_balance": from_balance, "to_balance": to_balance}
+
+    async def metrics(self, employee, body, query):
+        total_employees, total_accounts, total_balance, departments = await self.read(services.load_metrics)
+        return 200, {"total_employees": total_employees, "total_accounts": total_accounts,
+                     "total_balance": total_balance, "departments": dict(departments)}
+
+    async def hire_employee(self, employee, body, query):
+        emp_name = _field(body, "emp_name").strip()
+        if not emp_name:
+            raise HttpError(400, "Invalid emp_name")
+        job_title = _field(body, "job_title")
+        # Salary and department come from the job title's salary band, never the body
+        band = (await self.read(services.load_salary_bands)).get(job_title)
+        if band is None:
+            raise HttpError(400, "Invalid job_title")
+        gender = _field(body, "gender")
+        if gender not in services.GENDERS:
+            raise HttpError(400, "Invalid gender")
+        details = (emp_name, gender, _field(body, "branch_id", int), job_title,
+                   band[1], _field(body, "dob"), _field(body, "phone", int),
+                   _field(body, "city"), _field(body, "address"), _field(body, "email"))
+
+        emp_id, username, password, password_hash = await self.read(services.new_credentials, emp_name)
+        await self.write(services.apply_hire, employee[0], emp_id, username, password_hash, *details)
+        return 201, {"emp_id": emp_id, "username": username, "password": password}
+
+    async def fire_employee(self, employee, body, query, emp_id):
+        emp_name = await self.write(services.apply_fire, employee[0], int(emp_id))
+        if emp_name is None:
+            raise HttpError(404, "Employee not found")
+        # Sessions live here, not in the database: a fired employee's token
+        # stops working at once rather than when it expires
+        self._revoke_sessions(int(emp_id))
+        return 200, {"emp_id": int(emp_id), "emp_name": emp_name}
+
+    # HTTP/1.1 with keep-alive
+
+    async def _respond(self, method, target, headers, raw_body):
+        try:
+            body = json.loads(raw_body) if raw_body else {}
+            if not isinstance(body, dict):
+                raise HttpError(400, "Body must be a JSON object")
+            return await self.dispatch(method, target, headers, body)
+        except json.JSONDecodeError:
+            return 400, {"error": "Invalid JSON"}
+        except HttpError as e:
+            return e.status, {"error": str(e)}
+        except ledger.PostingError as e:
+            return 422, {"error": str(e)}
+        except Exception:
+            _log().exception("Internal error on %s %s", method, target)
+            return 500, {"error": "Internal error"}
+
+    async def handle_client(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_BODY:
+                    status, payload = 413, {"error": "Request body too large"}
+                    keep_alive = False
+                else:
+                    raw_body = await reader.readexactly(length) if length else b""
+                    status, payload = await self._respond(method, target, headers, raw_body)
+                    connection = headers.get("connection", "").lower()
+                    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+
+                data = json.dumps(payload).encode("utf-8")
+                head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", "Content-Type: application/json",
+                        f"Content-Length: {len(data)}"]
+                if not keep_alive:
+                    head.append("Connection: close")
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8080, on_ready=None):
+        server = await asyncio.start_server(self.handle_client, host, port)
+        if on_ready is not None:
+            on_ready(server.sockets[0].getsockname()[:2])
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.writer.close()
+        self._readers.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON API for teller and HR operations.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--db", help=f"database file (default {db.DB_NAME})")
+    parser.add_argument("--archive-interval", type=float, default=86400.0,
+                        help="seconds between archival runs, 0 for none (default: daily)")
+    args = parser.parse_args(argv)
+
+    from migrations import initialize_database
+    if args.db:
+        db.configure(args.db)
+    initialize_database()
+    audit.recover()
+
+    api = ApiServer()
+    archiver = partitions.ArchiveService(args.archive_interval) if args.archive_interval > 0 else None
+    if archiver is not None:
+        archiver.start()
+    try:
+        asyncio.run(api.serve(args.host, args.port,
+                              on_ready=lambda address: print(f"Listening on http://{address[0]}:{address[1]}",
+                                                             flush=True)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if archiver is not None:
+            archiver.close()
+        api.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+import atexit
+import os
+import threading
+import time
+
+import db
+import partitions
+
+# Every row in transactions is mirrored into transaction_log, the audit trail.
+# The log is append-only (migration 6 rejects UPDATE and DELETE on it) and is
+# written by a background thread rather than inside each posting: postings
+# call notify() after they commit, the writer waits up to max_delay for more
+# to arrive and then copies everything past the last logged transaction_id in
+# one transaction. Auditing therefore adds at most max_delay of lag and one
+# commit per group instead of one per posting.
+#
+# transaction_ids are assigned in commit order, so the log is always a prefix
+# of transactions. After a crash the only thing that can be missing is the
+# tail that had not been copied yet, which recover() appends on startup;
+# verify() does the full comparison, archived months included (the log stays
+# whole in the live database; see partitions.py).
+
+# Copies transactions past the high-water mark. The MAX() is read inside the
+# writer's BEGIN IMMEDIATE, so concurrent writers (other processes) never copy
+# the same rows twice.
+_COPY_SQL = """
+INSERT INTO transaction_log (transaction_id, account_no, transaction_type, transaction_amount,
+                             transaction_date, transaction_description, transaction_status)
+SELECT transaction_id, account_no, transaction_type, transaction_amount,
+       COALESCE(transaction_date, CURRENT_TIMESTAMP), transaction_description, transaction_status
+FROM transactions
+WHERE transaction_id > (SELECT COALESCE(MAX(transaction_id), 0) FROM transaction_log)
+ORDER BY transaction_id
+LIMIT ?
+"""
+
+
+def copy_pending(pool=None, batch_size=10000, pause=0.0):
+    # Appends every transaction not yet in the log; returns the number of rows.
+    # With pause > 0, waits pause times as long as each full batch took before
+    # the next one: back-to-back write transactions would otherwise starve
+    # postings waiting in SQLite's busy handler while a large backlog drains.
+    pool = pool or db.get_pool()
+    copied = 0
+    while True:
+        start = time.perf_counter()
+        with pool.transaction(immediate=True) as conn:
+            count = conn.execute(_COPY_SQL, (batch_size,)).rowcount
+        copied += count
+        if count < batch_size:
+            return copied
+        if pause:
+            time.sleep((time.perf_counter() - start) * pause)
+
+
+class AuditWriter:
+    def __init__(self, pool=None, max_delay=0.05, batch_size=10000):
+        self.pool = pool
+        self.max_delay = max_delay
+        self.batch_size = batch_size
+
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = None
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self.error = None
+
+    def _start(self):
+        # A forked child has no writer thread of its own
+        if self._thread is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+
+    def notify(self):
+        with self._lock:
+            if self._stopped:
+                return
+            self._start()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            if self._stopped:
+                return
+            # Group window: postings arriving meanwhile go into the same commit
+            time.sleep(self.max_delay)
+            self._wake.clear()
+            try:
+                copy_pending(self.pool, self.batch_size, pause=1.0)
+                self.error = None
+            except Exception as e:
+                # Nothing is lost: the rows stay pending until the next copy
+                # (or recover() on the next start) succeeds
+                self.error = e
+            if self._stopped:
+                return
+
+    def flush(self):
+        # Copies whatever is pending on the calling thread
+        return copy_pending(self.pool, self.batch_size)
+
+    def close(self):
+        with self._lock:
+            self._stopped = True
+            thread = self._thread if self._pid == os.getpid() else None
+        self._wake.set()
+        if thread is not None:
+            thread.join()
+        try:
+            self.flush()
+        except Exception:
+            pass
+
+
+# One writer per pool, i.e. per database file
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(pool=None):
+    pool = pool or db.get_pool()
+    with _writers_lock:
+        writer = _writers.get(pool)
+        if writer is None:
+            writer = _writers[pool] = AuditWriter(pool)
+            atexit.register(writer.close)
+        return writer
+
+
+def notify(pool=None):
+    get_writer(pool).notify()
+
+
+def recover(pool=None):
+    # Startup check: appends transactions committed before a crash but not yet
+    # logged. Returns the number of rows recovered.
+    return copy_pending(pool)
+
+
+_MISSING_SQL = """
+SELECT t.transaction_id FROM {source} t
+WHERE NOT EXISTS (SELECT 1 FROM transaction_log l WHERE l.transaction_id = t.transaction_id)
+ORDER BY t.transaction_id
+"""
+
+_ORPHANED_SQL = """
+SELECT l.transaction_id FROM transaction_log l
+WHERE NOT EXISTS (SELECT 1 FROM {source} t WHERE t.transaction_id = l.transaction_id) AND {log_filter}
+ORDER BY l.transaction_id
+"""
+
+_MISMATCHED_SQL = """
+SELECT l.transaction_id FROM transaction_log l
+JOIN {source} t ON t.transaction_id = l.transaction_id
+WHERE l.account_no != t.account_no
+   OR l.transaction_type != t.transaction_type
+   OR l.transaction_amount != t.transaction_amount
+   OR l.transaction_date IS NOT COALESCE(t.transaction_date, l.transaction_date)
+   OR l.transaction_description IS NOT t.transaction_description
+   OR l.transaction_status IS NOT t.transaction_status
+ORDER BY l.transaction_id
+"""
+
+
+def _compare(conn, source, log_filter, params=()):
+    # (missing, orphaned, mismatched) between one transactions table and the
+    # log rows log_filter selects for it
+    return ([row[0] for row in conn.execute(_MISSING_SQL.format(source=source))],
+            [row[0] for row in conn.execute(_ORPHANED_SQL.format(source=source, log_filter=log_filter), params)],
+            [row[0] for row in conn.execute(_MISMATCHED_SQL.format(source=source))])
+
+
+def _id_ranges(archived):
+    # The archived months' transaction_id ranges, adjacent ones merged
+    ranges = []
+    for partition in sorted(archived, key=lambda partition: partition.first_id or 0):
+        if partition.first_id is None:
+            continue
+        if ranges and partition.first_id == ranges[-1][1] + 1:
+            ranges[-1][1] = partition.last_id
+        else:
+            ranges.append([partition.first_id, partition.last_id])
+    return ranges
+
+
+def verify(pool=None):
+    # Full reconciliation of transactions against transaction_log. Returns
+    # (missing, orphaned, mismatched): transaction_ids with no log row, log
+    # rows with no transaction, and log rows that differ from the transaction.
+    pool = pool or db.get_pool()
+    with pool.transaction() as conn:
+        archived = partitions.archived(conn)
+        # Log rows of archived months are checked against their partition
+        ranges = _id_ranges(archived)
+        covered = " OR ".join("l.transaction_id BETWEEN ? AND ?" for _ in ranges)
+        missing, orphaned, mismatched = _compare(conn, "main.transactions", f"NOT ({covered or 0})",
+                                                 [bound for id_range in ranges for bound in id_range])
+
+    # One archived month at a time (a registered partition never changes)
+    with pool.connection() as conn:
+        for partition in archived:
+            with partitions.attached(conn, partition) as schema:
+                with pool.transaction():
+                    results = _compare(conn, f"{schema}.transactions", """
+                    l.transaction_id BETWEEN ? AND ?
+                    AND NOT EXISTS (SELECT 1 FROM main.transactions h WHERE h.transaction_id = l.transaction_id)
+                    """, (partition.first_id, partition.last_id))
+            for found, result in zip((missing, orphaned, mismatched), results):
+                found.extend(result)
+    return sorted(missing), sorted(orphaned), sorted(mismatched)
@@ -0,0 +1,328 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import namedtuple
+from contextlib import closing
+from datetime import datetime, timezone
+
+import audit
+import db
+import ledger
+import partitions
+
+# Online backups of the live database and point-in-time restore.
+#
+# snapshot() copies the database with SQLite's backup API, step_pages pages
+# per step, from inside one read transaction on a pooled connection. Under WAL
+# that read transaction is a fixed snapshot, so the copy is consistent and
+# never restarts when tellers commit meanwhile, and tellers never wait for it
+# (it only holds back checkpointing until it ends). Between steps the copy
+# pauses for pause times as long as the step took, which leaves the disk and
+# the GIL to postings on a busy server.
+#
+# Snapshots are written under a .partial name, renamed when complete and
+# recorded in backups.json in the backup directory together with the time the
+# snapshot was taken and the last transaction_id it contains; only the newest
+# `keep` are kept. Archived months' partition files (see partitions.py) are
+# copied into the backup directory alongside, each once: they never change.
+#
+# restore() copies a snapshot to a new file and replays the transactions
+# committed after it from the live database's transaction_log (the
+# append-only audit trail, so a mistake being undone cannot have altered it)
+# up to a point in time or a transaction_id: accounts opened meanwhile are
+# created, the transactions are inserted with their original ids and dates and
+# balances move by their effect. Other tables (employees, loans, interest runs)
+# are restored as of the snapshot.
+
+MANIFEST = "backups.json"
+
+# taken_at is UTC, formatted like transaction_date
+Snapshot = namedtuple("Snapshot", ["path", "taken_at", "last_transaction_id", "pages", "seconds"])
+
+_TIMESTAMP = "%Y-%m-%d %H:%M:%S"
+
+_CUSTOMER_COLUMNS = "cust_id, cust_name, dob, phone, city, address, email"
+_ACCOUNT_COLUMNS = ("opened_date, account_type, account_status, interest_rate, minimum_balance, currency")
+_TRANSACTION_COLUMNS = ("transaction_id, account_no, transaction_type, transaction_amount, "
+                        "transaction_date, transaction_description, transaction_status")
+
+# The last transaction_id handed out, whether or not its row has since been
+# archived out of the file
+_LAST_TRANSACTION_ID_SQL = """
+SELECT COALESCE((SELECT seq FROM main.sqlite_sequence WHERE name = 'transactions'), 0)
+"""
+
+
+def load_manifest(backup_dir):
+    try:
+        with open(os.path.join(backup_dir, MANIFEST), encoding="utf-8") as f:
+            return [Snapshot(**entry) for entry in json.load(f)]
+    except FileNotFoundError:
+        return []
+
+
+def save_manifest(backup_dir, snapshots):
+    path = os.path.join(backup_dir, MANIFEST)
+    with open(path + ".partial", "w", encoding="utf-8") as f:
+        json.dump([snapshot._asdict() for snapshot in snapshots], f, indent=2)
+    os.replace(path + ".partial", path)
+
+
+def _utc_now():
+    return datetime.now(timezone.utc)
+
+
+def snapshot(backup_dir, keep=7, step_pages=1024, pause=0.5, on_progress=None, pool=None):
+    # Takes one snapshot and rotates old ones out; returns its Snapshot.
+    # on_progress(remaining, total) is called after every step.
+    pool = pool or db.get_pool()
+    os.makedirs(backup_dir, exist_ok=True)
+
+    now = _utc_now()
+    path = os.path.join(backup_dir, f"time_bank-{now:%Y%m%d-%H%M%S-%f}.db")
+    partial = path + ".partial"
+    start = time.perf_counter()
+    step_start = start
+
+    def progress(status, remaining, total):
+        nonlocal step_start
+        if on_progress is not None:
+            on_progress(remaining, total)
+        if pause and remaining:
+            time.sleep((time.perf_counter() - step_start) * pause)
+        step_start = time.perf_counter()
+
+    target = sqlite3.connect(partial)
+    try:
+        with pool.transaction() as conn:
+            # The first read fixes the snapshot, everything below sees it
+            last_id = conn.execute(_LAST_TRANSACTION_ID_SQL).fetchone()[0]
+            taken_at = _utc_now().strftime(_TIMESTAMP)
+            pages = conn.execute("PRAGMA page_count").fetchone()[0]
+            archived = [partition.path for partition in partitions.archived(conn)]
+            conn.backup(target, pages=step_pages, progress=progress)
+        target.close()
+        partitions.copy_files(archived, backup_dir)
+        os.replace(partial, path)
+    except BaseException:
+        target.close()
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+
+    taken = Snapshot(path, taken_at, last_id, pages, round(time.perf_counter() - start, 3))
+    snapshots = load_manifest(backup_dir) + [taken]
+    for old in snapshots[:-keep] if keep else []:
+        if os.path.exists(old.path):
+            os.remove(old.path)
+    save_manifest(backup_dir, snapshots[-keep:] if keep else snapshots)
+    return taken
+
+
+def latest_snapshot(backup_dir, until=None, until_id=None):
+    # The newest snapshot taken at or before until (UTC, transaction_date
+    # format) that holds no transaction past until_id, or None
+    candidates = [s for s in load_manifest(backup_dir)
+                  if (until is None or s.taken_at <= until)
+                  and (until_id is None or s.last_transaction_id <= until_id)]
+    return candidates[-1] if candidates else None
+
+
+def _replay_end(conn, after_id, until, until_id):
+    # Last transaction_id to replay. Stopping at the first transaction past
+    # until (rather than filtering by date) keeps the replayed rows a prefix
+    # of the log even where two commits carry the same second.
+    last_id = conn.execute("SELECT COALESCE(MAX(transaction_id), 0) FROM src.transaction_log").fetchone()[0]
+    if until_id is not None:
+        last_id = min(last_id, until_id)
+    if until is not None:
+        first_after = conn.execute("""
+        SELECT MIN(transaction_id) FROM src.transaction_log
+        WHERE transaction_id > ? AND transaction_date > ?
+        """, (after_id, until)).fetchone()[0]
+        if first_after is not None:
+            last_id = min(last_id, first_after - 1)
+    return last_id
+
+
+def restore(snapshot_path, target_path, source_path=None, until=None, until_id=None):
+    # Restores snapshot_path into a new database at target_path, then replays
+    # source_path's transaction_log (normally the live database) up to until
+    # (UTC, transaction_date format) and/or until_id. Without a source the
+    # result is the snapshot itself. Returns the number of transactions
+    # replayed.
+    if os.path.exists(target_path):
+        raise FileExistsError(target_path)
+
+    partial = target_path + ".partial"
+    with closing(sqlite3.connect(snapshot_path)) as snapshot_conn, closing(sqlite3.connect(partial)) as target:
+        snapshot_conn.backup(target)
+        archived = [os.path.join(os.path.dirname(snapshot_path), file)
+                    for file in partitions.registered_files(snapshot_conn)]
+    partitions.copy_files(archived, os.path.dirname(os.path.abspath(target_path)))
+
+    conn = sqlite3.connect(partial, isolation_level=None)
+    try:
+        replayed = 0
+        if source_path is not None:
+            conn.execute("ATTACH DATABASE ? AS src", (source_path,))
+            # Deferred: only the new file is written, so the live database is
+            # just read, from one snapshot, and never write-locked
+            conn.execute("BEGIN")
+            after_id = conn.execute(_LAST_TRANSACTION_ID_SQL).fetchone()[0]
+            if until_id is not None and after_id > until_id:
+                raise ValueError(f"Snapshot {snapshot_path} already contains transactions after {until_id}")
+            if until is not None and conn.execute("SELECT 1 FROM main.transactions WHERE transaction_date > ? LIMIT 1",
+                                                  (until,)).fetchone():
+                raise ValueError(f"Snapshot {snapshot_path} already contains transactions after {until}")
+            last_id = _replay_end(conn, after_id, until, until_id)
+            replayed = _replay(conn, after_id, last_id)
+            conn.execute("COMMIT")
+            conn.execute("DETACH DATABASE src")
+    except BaseException:
+        conn.close()
+        os.remove(partial)
+        raise
+    conn.close()
+    os.replace(partial, target_path)
+
+    # Bring the restored audit trail up to date with its transactions
+    pool = db.ConnectionPool(target_path, max_idle=1)
+    try:
+        audit.copy_pending(pool)
+    finally:
+        pool.close_all()
+    return replayed
+
+
+def _replay(conn, after_id, last_id):
+    if last_id <= after_id:
+        return 0
+
+    # Accounts (and their customers) opened after the snapshot, starting from
+    # a zero balance: their opening deposit is among the replayed transactions
+    conn.execute("CREATE TEMP TABLE replay_accounts AS SELECT DISTINCT account_no FROM src.transaction_log "
+                 "WHERE transaction_id > ? AND transaction_id <= ? "
+                 "AND account_no NOT IN (SELECT account_no FROM main.accounts)", (after_id, last_id))
+    conn.execute(f"""
+    INSERT INTO main.customer ({_CUSTOMER_COLUMNS})
+    SELECT {_CUSTOMER_COLUMNS} FROM src.customer
+    WHERE cust_id IN (SELECT a.cust_id FROM src.accounts a JOIN temp.replay_accounts r ON r.account_no = a.account_no)
+      AND cust_id NOT IN (SELECT cust_id FROM main.customer)
+    """)
+    conn.execute(f"""
+    INSERT INTO main.accounts (account_no, cust_id, balance, {_ACCOUNT_COLUMNS})
+    SELECT account_no, cust_id, 0, {_ACCOUNT_COLUMNS} FROM src.accounts
+    WHERE account_no IN (SELECT account_no FROM temp.replay_accounts)
+    """)
+
+    replayed = conn.execute(f"""
+    INSERT INTO main.transactions ({_TRANSACTION_COLUMNS})
+    SELECT {_TRANSACTION_COLUMNS} FROM src.transaction_log
+    WHERE transaction_id > ? AND transaction_id <= ?
+    ORDER BY transaction_id
+    """, (after_id, last_id)).rowcount
+
+    # One UPDATE per touched account, like a posting batch
+    conn.execute(f"""
+    UPDATE main.accounts SET balance = balance + (
+        SELECT SUM({ledger.SIGNED_AMOUNT_SQL}) FROM main.transactions t
+        WHERE t.account_no = accounts.account_no AND t.transaction_id > ? AND t.transaction_status = 'Completed'
+    )
+    WHERE account_no IN (SELECT account_no FROM main.transactions
+                         WHERE transaction_id > ? AND transaction_status = 'Completed')
+    """, (after_id, after_id))
+
+    # IDs handed out after the snapshot must not be handed out again
+    conn.execute("""
+    UPDATE main.id_sequences SET next_value = MAX(next_value, (
+        SELECT s.next_value FROM src.id_sequences s WHERE s.name = id_sequences.name))
+    WHERE name IN (SELECT name FROM src.id_sequences)
+    """)
+    conn.execute("DROP TABLE temp.replay_accounts")
+    return replayed
+
+
+class BackupService:
+    # Takes a snapshot every `interval` seconds on a background thread until
+    # closed. The last failure, if any, is kept in `error`.
+
+    def __init__(self, backup_dir, interval=3600.0, keep=7, step_pages=1024, pause=0.5, pool=None):
+        self.backup_dir = backup_dir
+        self.interval = interval
+        self.keep = keep
+        self.step_pages = step_pages
+        self.pause = pause
+        self.pool = pool
+
+        self._stop = threading.Event()
+        self._thread = None
+        self.last = None
+        self.error = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="backup", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.last = snapshot(self.backup_dir, self.keep, self.step_pages, self.pause, pool=self.pool)
+                self.error = None
+            except Exception as e:
+                self.error = e
+            self._stop.wait(self.interval)
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Online backups and point-in-time restore.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    take = commands.add_parser("snapshot", help="take a snapshot of the live database")
+    take.add_argument("backup_dir")
+    take.add_argument("--keep", type=int, default=7)
+    take.add_argument("--every", type=float, help="keep running, one snapshot every EVERY seconds")
+
+    back = commands.add_parser("restore", help="restore a snapshot, replaying later transactions")
+    back.add_argument("backup_dir")
+    back.add_argument("target")
+    back.add_argument("--until", help="UTC time, YYYY-MM-DD HH:MM:SS (default: replay everything)")
+    back.add_argument("--until-id", type=int, help="last transaction_id to replay")
+    back.add_argument("--no-replay", action="store_true", help="restore the snapshot as it is")
+    args = parser.parse_args(argv)
+
+    if args.command == "snapshot":
+        while True:
+            taken = snapshot(args.backup_dir, args.keep)
+            print(f"{taken.path}: {taken.pages:,} pages, up to transaction {taken.last_transaction_id} "
+                  f"in {taken.seconds:.1f}s")
+            if args.every is None:
+                return 0
+            time.sleep(args.every)
+
+    if not args.no_replay:
+        # Postings committed but not yet in the audit trail
+        audit.recover()
+    chosen = latest_snapshot(args.backup_dir, args.until, args.until_id)
+    if chosen is None:
+        print("No snapshot taken at or before that point", file=sys.stderr)
+        return 1
+    replayed = restore(chosen.path, args.target, None if args.no_replay else db.DB_NAME, args.until, args.until_id)
+    print(f"restored {chosen.path} ({chosen.taken_at}) to {args.target}, replayed {replayed:,} transactions")
+    return 0
+
+
+if __name__ == "__main__":
+    from migrations import initialize_database
+    initialize_database()
+    sys.exit(main())
@@ -0,0 +1,171 @@
+# Load test of the HTTP API (api.py) at 1, 8 and 64 concurrent clients. The
+# server runs in its own process; each client keeps one HTTP/1.1 connection
+# and sends postings (80%) and account lookups (20%) back to back for a fixed
+# time. Reports requests/s, error rate and p50/p99 latency, then the same
+# postings made directly from as many threads, each committing on its own
+# (the pattern of several app instances writing to one file).
+#
+#   python -m benchmarks.bench_api [seconds_per_level]
+
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import audit
+import db
+import ledger
+import services
+from migrations import migrate
+
+ACCOUNTS = 10000
+CLIENTS = (1, 8, 64)
+
+
+def setup(path):
+    pool = db.configure(path)
+    migrate(pool)
+    _, username, password = services.hire_employee(1001, "Bench Teller", "M", 1, "Accountant", 1000,
+                                                   "1990-01-01", 900000000, "Addis Ababa", "-", "-")
+    with pool.transaction() as conn:
+        conn.executemany("INSERT INTO customer (cust_id, cust_name) VALUES (?, ?)",
+                         ((i, f"Customer {i}") for i in range(ACCOUNTS)))
+        conn.executemany("INSERT INTO accounts (account_no, cust_id, balance, account_type) VALUES (?, ?, 1e9, 'Savings')",
+                         ((100000 + i, i) for i in range(ACCOUNTS)))
+    return pool, username, password
+
+
+async def request(reader, writer, method, path, body=None, token=None):
+    data = json.dumps(body).encode() if body is not None else b""
+    head = [f"{method} {path} HTTP/1.1", "Host: localhost", f"Content-Length: {len(data)}"]
+    if token:
+        head.append(f"Authorization: Bearer {token}")
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + data)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def client(host, port, token, seed, deadline, latencies, errors):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            account_no = 100000 + rng.randrange(ACCOUNTS)
+            start = time.perf_counter()
+            try:
+                if rng.random() < 0.8:
+                    status, _ = await request(reader, writer, "POST", "/transactions",
+                                              {"account_no": account_no, "type": "Deposit", "amount": 1}, token)
+                else:
+                    status, _ = await request(reader, writer, "GET", f"/accounts/{account_no}", token=token)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                errors.append("connection")
+                reader, writer = await asyncio.open_connection(host, port)
+                continue
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run_level(host, port, token, clients, seconds):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, token, seed, deadline, latencies, errors) for seed in range(clients)))
+    return time.perf_counter() - start, latencies, errors
+
+
+async def login(host, port, username, password):
+    reader, writer = await asyncio.open_connection(host, port)
+    status, body = await request(reader, writer, "POST", "/login", {"username": username, "password": password})
+    writer.close()
+    assert status == 200, body
+    return body["token"]
+
+
+def report(label, elapsed, latencies, errors):
+    latencies.sort()
+    count = len(latencies) + len(errors)
+    if not latencies:
+        print(f"{label:22s} no successful requests, {len(errors)} errors")
+        return
+    print(f"{label:22s} {len(latencies) / elapsed:7,.0f} req/s  errors {len(errors) / count:6.2%}  "
+          f"p50 {latencies[len(latencies) // 2] * 1000:6.2f} ms  p99 {latencies[int(len(latencies) * 0.99)] * 1000:7.2f} ms")
+
+
+def direct(pool, threads, seconds):
+    # Every thread commits its own postings through the pool (with_retry
+    # covers busy errors), as separate app instances would
+    latencies, errors = [], []
+    deadline = time.perf_counter() + seconds
+
+    def run(seed):
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                ledger.post(100000 + rng.randrange(ACCOUNTS), "Deposit", 1, pool=pool)
+            except Exception as e:
+                errors.append(e)
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    workers = [threading.Thread(target=run, args=(seed,)) for seed in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start, latencies, errors
+
+
+def main(seconds=5):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "api.db")
+        pool, username, password = setup(path)
+        audit.get_writer(pool).close()
+
+        server = subprocess.Popen([sys.executable, "api.py", "--port", "0", "--db", path],
+                                  cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  stdout=subprocess.PIPE, text=True)
+        try:
+            address = server.stdout.readline().strip().rsplit("/", 1)[-1]
+            host, port = address.rsplit(":", 1)
+            token = asyncio.run(login(host, port, username, password))
+
+            print(f"API, {os.cpu_count()} CPU(s), 80% postings / 20% lookups, {seconds}s per level")
+            for clients in CLIENTS:
+                report(f"{clients} client(s)", *asyncio.run(run_level(host, port, token, clients, seconds)))
+        finally:
+            server.terminate()
+            server.wait()
+
+        print("direct postings, one commit each")
+        pool = db.ConnectionPool(path)
+        for threads in CLIENTS:
+            report(f"{threads} thread(s)", *direct(pool, threads, seconds))
+        audit.get_writer(pool).close()
+        pool.close_all()
+        db.get_pool().close_all()
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:2]]
+    main(*args)
@@ -0,0 +1,77 @@
+# Cost of mirroring postings into transaction_log: no audit trail, the
+# group-committing background writer (audit.py), and a log row committed
+# separately after every posting. Also reports how far the log trails behind.
+#
+#   python -m benchmarks.bench_audit_log [postings]
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+import audit
+import db
+import ledger
+from migrations import migrate
+
+ACCOUNTS = 10000
+
+
+def setup(path):
+    db.configure(path)
+    pool = db.get_pool()
+    migrate(pool)
+    with pool.transaction() as conn:
+        conn.executemany("INSERT INTO accounts (account_no, cust_id, balance, account_type) VALUES (?, ?, 0, 'Savings')",
+                         ((100000 + i, i) for i in range(ACCOUNTS)))
+    return pool
+
+
+def logged_count(pool):
+    with pool.connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM transaction_log").fetchone()[0]
+
+
+def run(label, postings, post):
+    rng = random.Random(0)
+    start = time.perf_counter()
+    for _ in range(postings):
+        post(100000 + rng.randrange(ACCOUNTS), rng.randint(1, 500))
+    elapsed = time.perf_counter() - start
+    print(f"{label:22} {postings / elapsed:8,.0f} postings/s ({elapsed / postings * 1e6:6.1f} us each)")
+
+
+def main(postings=5000):
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = setup(os.path.join(tmp, "audit.db"))
+
+        def unaudited(account_no, amount):
+            with pool.transaction(immediate=True) as conn:
+                ledger.apply_posting(conn, account_no, "Deposit", amount)
+
+        def per_posting(account_no, amount):
+            unaudited(account_no, amount)
+            audit.copy_pending(pool)
+
+        run("no audit trail", postings, unaudited)
+        audit.copy_pending(pool)
+
+        run("log commit per posting", postings, per_posting)
+
+        run("group commit", postings, lambda account_no, amount: ledger.post(account_no, "Deposit", amount))
+        done = time.perf_counter()
+        with pool.connection() as conn:
+            total = conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+        while logged_count(pool) < total:
+            time.sleep(0.001)
+        print(f"log caught up {(time.perf_counter() - done) * 1000:.1f} ms after the last posting")
+
+        audit.get_writer(pool).close()
+        print(f"verify: {[len(rows) for rows in audit.verify(pool)]} missing/orphaned/mismatched")
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:2]]
+    main(*args)
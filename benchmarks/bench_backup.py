@@ -0,0 +1,103 @@
+# Posting throughput while an online backup runs: a teller thread posts
+# continuously, first with no backup (baseline), then during a one-shot copy
+# (the whole database in a single backup step) and during stepped copies with
+# and without a pause between steps. Reports postings/s and latency for each
+# window, and the time the backup took.
+#
+#   python -m benchmarks.bench_backup [transactions]
+
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import audit
+import backup
+import db
+import ledger
+from migrations import migrate
+
+ACCOUNTS = 10000
+BATCH = 100000
+BASELINE_SECONDS = 3.0
+
+# (label, step_pages, pause)
+RUNS = [
+    ("one step", -1, 0.0),
+    ("1024-page steps", 1024, 0.0),
+    ("1024-page steps, pause 0.5", 1024, 0.5),
+    ("256-page steps, pause 1.0", 256, 1.0),
+]
+
+
+def setup(path, count, seed=0):
+    rng = random.Random(seed)
+    pool = db.ConnectionPool(path)
+    migrate(pool)
+    with pool.transaction() as conn:
+        conn.executemany("INSERT INTO accounts (account_no, cust_id, balance, account_type) VALUES (?, ?, 1e9, 'Savings')",
+                         ((100000 + i, i) for i in range(ACCOUNTS)))
+        for start in range(0, count, BATCH):
+            conn.executemany("""
+            INSERT INTO transactions (account_no, transaction_type, transaction_amount, transaction_description, transaction_status)
+            VALUES (?, 'Deposit', ?, 'bench', 'Completed')
+            """, ((100000 + rng.randrange(ACCOUNTS), rng.randint(1, 500)) for _ in range(min(BATCH, count - start))))
+    return pool
+
+
+def teller(pool, stop, latencies):
+    rng = random.Random(1)
+    while not stop.is_set():
+        start = time.perf_counter()
+        ledger.post(100000 + rng.randrange(ACCOUNTS), "Deposit", 1, pool=pool)
+        latencies.append(time.perf_counter() - start)
+
+
+def measure(pool, work):
+    # Runs work() while the teller posts; returns (seconds, latencies)
+    stop = threading.Event()
+    latencies = []
+    thread = threading.Thread(target=teller, args=(pool, stop, latencies))
+    thread.start()
+    start = time.perf_counter()
+    work()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    thread.join()
+    return elapsed, latencies
+
+
+def report(label, elapsed, latencies, extra=""):
+    latencies.sort()
+    print(f"{label:28s} {len(latencies) / elapsed:8,.0f} postings/s  "
+          f"p50 {latencies[len(latencies) // 2] * 1000:5.2f} ms  "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:6.2f} ms  "
+          f"max {latencies[-1] * 1000:7.1f} ms{extra}")
+
+
+def main(count=1000000):
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = setup(os.path.join(tmp, "live.db"), count)
+        audit.copy_pending(pool)
+        with pool.connection() as conn:
+            size = conn.execute("PRAGMA page_count").fetchone()[0] * conn.execute("PRAGMA page_size").fetchone()[0]
+        print(f"database: {count:,} transactions, {size / 1e6:.0f} MB")
+
+        elapsed, latencies = measure(pool, lambda: time.sleep(BASELINE_SECONDS))
+        report("no backup", elapsed, latencies)
+
+        backup_dir = os.path.join(tmp, "backups")
+        for label, step_pages, pause in RUNS:
+            elapsed, latencies = measure(pool, lambda: backup.snapshot(backup_dir, keep=1, step_pages=step_pages,
+                                                                        pause=pause, pool=pool))
+            report(label, elapsed, latencies, f"  backup {elapsed:.2f}s")
+
+        audit.get_writer(pool).close()
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:2]]
+    main(*args)
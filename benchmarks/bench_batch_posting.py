@@ -0,0 +1,65 @@
+# Sustained throughput of ledger.post_batch against a local SQLite file, with
+# a share of deliberately bad rows to exercise the failure report.
+#
+#   python -m benchmarks.bench_batch_posting [rows] [batch_size]
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+import db
+import ledger
+from migrations import migrate
+
+ACCOUNTS = 100000
+
+
+def setup(path):
+    pool = db.ConnectionPool(path)
+    migrate(pool)
+    with pool.transaction() as conn:
+        conn.executemany("INSERT INTO customer (cust_id, cust_name) VALUES (?, ?)",
+                         ((i, f"Customer {i}") for i in range(ACCOUNTS)))
+        conn.executemany("INSERT INTO accounts (account_no, cust_id, balance, account_type) VALUES (?, ?, 100.0, 'Savings')",
+                         ((100000 + i, i) for i in range(ACCOUNTS)))
+    return pool
+
+
+def generate(count, seed=0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        # ~1% unknown accounts, withdrawals large enough to fail now and then
+        account_no = 100000 + rng.randrange(int(ACCOUNTS * 1.01))
+        if rng.random() < 0.7:
+            yield account_no, "Deposit", rng.randint(1, 500), "branch deposit"
+        else:
+            yield account_no, "Withdrawal", rng.randint(1, 400), "branch withdrawal"
+
+
+def main(rows=500000, batch_size=10000):
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = setup(os.path.join(tmp, "batch.db"))
+
+        postings = list(generate(rows))
+
+        start = time.perf_counter()
+        report = ledger.post_batch(postings, batch_size=batch_size, pool=pool)
+        elapsed = time.perf_counter() - start
+
+        with pool.connection() as conn:
+            negative = conn.execute("SELECT COUNT(*) FROM accounts WHERE balance < 0").fetchone()[0]
+        pool.close_all()
+
+    reasons = {}
+    for _, reason in report.failed:
+        reasons[reason] = reasons.get(reason, 0) + 1
+
+    print(f"{rows} rows in batches of {batch_size}: {elapsed:.2f}s, {rows / elapsed:,.0f} rows/s")
+    print(f"posted {report.posted}, failed {len(report.failed)} {reasons}, negative balances {negative}")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    main(*args)
@@ -0,0 +1,84 @@
+# Per-operation latency of a fresh sqlite3.connect() per call (the old
+# handler pattern) against the shared connection pool in db.py.
+#
+#   python -m benchmarks.bench_connection_pool [iterations]
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import db
+
+
+def setup(path, rows=10000):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("""
+    CREATE TABLE accounts (
+        account_no INTEGER PRIMARY KEY,
+        cust_id INTEGER,
+        balance REAL,
+        account_status TEXT DEFAULT 'Active'
+    )
+    """)
+    conn.executemany("INSERT INTO accounts (account_no, cust_id, balance) VALUES (?, ?, ?)",
+                     ((10000 + i, i, 100.0) for i in range(rows)))
+    conn.commit()
+    conn.close()
+
+
+def per_call_read(path, account_no):
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    cursor.execute("SELECT balance, account_status FROM accounts WHERE account_no = ?", (account_no,))
+    cursor.fetchone()
+    conn.close()
+
+
+def per_call_write(path, account_no):
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    cursor.execute("UPDATE accounts SET balance = balance + 1 WHERE account_no = ?", (account_no,))
+    conn.commit()
+    conn.close()
+
+
+def pooled_read(pool, account_no):
+    with pool.connection() as conn:
+        conn.execute("SELECT balance, account_status FROM accounts WHERE account_no = ?", (account_no,)).fetchone()
+
+
+def pooled_write(pool, account_no):
+    with pool.transaction() as conn:
+        conn.execute("UPDATE accounts SET balance = balance + 1 WHERE account_no = ?", (account_no,))
+
+
+def measure(fn, target, iterations):
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(target, 10000 + i % 10000)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main(iterations=2000):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        setup(path)
+        pool = db.ConnectionPool(path)
+
+        results = [
+            ("read  / connect per call", measure(per_call_read, path, iterations)),
+            ("read  / pooled", measure(pooled_read, pool, iterations)),
+            ("write / connect per call", measure(per_call_write, path, iterations)),
+            ("write / pooled", measure(pooled_write, pool, iterations)),
+        ]
+        pool.close_all()
+
+    for name, micros in results:
+        print(f"{name:<26} {micros:10.1f} us/op")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,108 @@
+# Customer search latency over a synthetic customer table: the FTS5 index
+# (first page of ranked prefix matches, as services.search_accounts runs it)
+# against the LIKE '%term%' scan it replaces.
+#
+#   python -m benchmarks.bench_customer_search [customers] [searches]
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+import db
+import services
+from migrations import migrate
+
+BATCH = 100000
+
+FIRST_NAMES = ["Abel", "Abebe", "Almaz", "Bethlehem", "Dawit", "Eleni", "Fikru", "Genet", "Hana", "Kebede",
+               "Liya", "Meron", "Nahom", "Rahel", "Samuel", "Selam", "Tigist", "Yared", "Yonas", "Zewdu"]
+CITIES = ["Addis Ababa", "Adama", "Bahir Dar", "Dire Dawa", "Gondar", "Hawassa", "Jimma", "Mekelle"]
+SYLLABLES = ["ab", "be", "ka", "le", "ma", "ne", "ra", "se", "ta", "we", "yo", "zu", "gi", "de", "hu"]
+
+
+def surname(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+
+
+def setup(path, customers, seed=0):
+    rng = random.Random(seed)
+    pool = db.ConnectionPool(path)
+    migrate(pool)
+    with pool.transaction() as conn:
+        for start in range(0, customers, BATCH):
+            rows = []
+            for cust_id in range(start, min(customers, start + BATCH)):
+                first, last = rng.choice(FIRST_NAMES), surname(rng)
+                rows.append((cust_id, f"{first} {last}", 900000000 + rng.randrange(100000000), rng.choice(CITIES),
+                             f"{first.lower()}.{last.lower()}{cust_id}@example.com"))
+            conn.executemany("INSERT INTO customer (cust_id, cust_name, phone, city, email) VALUES (?, ?, ?, ?, ?)",
+                             rows)
+            conn.executemany("INSERT INTO accounts (account_no, cust_id, balance, account_type) VALUES (?, ?, 0, 'Savings')",
+                             ((1000000 + row[0], row[0]) for row in rows))
+    return pool
+
+
+def search_terms(count, seed=1):
+    # What a teller types: a first name plus part of a surname, part of a
+    # phone number, or a surname prefix
+    rng = random.Random(seed)
+    terms = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.5:
+            terms.append(("name", f"{rng.choice(FIRST_NAMES)} {surname(rng)[:4]}"))
+        elif kind < 0.75:
+            terms.append(("phone", str(900000000 + rng.randrange(100000000))[:6]))
+        else:
+            terms.append(("surname", surname(rng)[:5]))
+    return terms
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2] * 1000, samples[int(len(samples) * 0.99)] * 1000
+
+
+def main(customers=1000000, searches=500):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "search.db")
+        start = time.perf_counter()
+        pool = setup(path, customers)
+        print(f"setup: {customers:,} customers in {time.perf_counter() - start:.1f}s")
+
+        db.configure(path)
+        terms = search_terms(searches)
+
+        fts = {}
+        found = 0
+        for kind, term in terms:
+            start = time.perf_counter()
+            found += bool(services.search_accounts(term))
+            fts.setdefault(kind, []).append(time.perf_counter() - start)
+
+        like = []
+        with pool.connection() as conn:
+            for _, term in terms[:max(1, searches // 50)]:
+                start = time.perf_counter()
+                conn.execute("""
+                SELECT a.account_no, c.cust_name FROM accounts a JOIN customer c ON a.cust_id = c.cust_id
+                WHERE c.cust_name LIKE ? LIMIT 20
+                """, (f"%{term}%",)).fetchall()
+                like.append(time.perf_counter() - start)
+
+        db.get_pool().close_all()
+        pool.close_all()
+
+    print(f"{found}/{searches} searches found matches")
+    for kind, samples in [("all", sum(fts.values(), []))] + sorted(fts.items()):
+        p50, p99 = percentiles(samples)
+        print(f"fts5 first page, {kind:8} p50 {p50:7.2f} ms, p99 {p99:7.2f} ms")
+    p50, p99 = percentiles(like)
+    print(f"LIKE '%term%',         p50 {p50:7.2f} ms, p99 {p99:7.2f} ms")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    main(*args)
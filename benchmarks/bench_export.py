@@ -0,0 +1,87 @@
+# Export throughput from a snapshot while a teller thread keeps posting:
+# reports rows/s of the export and the posting latency and error count seen
+# meanwhile, which shows the snapshot read does not block writers.
+#
+#   python -m benchmarks.bench_export [transactions]
+
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import audit
+import db
+import exporter
+import ledger
+from migrations import migrate
+
+ACCOUNTS = 10000
+BATCH = 100000
+
+
+def setup(path, count, seed=0):
+    rng = random.Random(seed)
+    pool = db.ConnectionPool(path)
+    migrate(pool)
+    with pool.transaction() as conn:
+        conn.executemany("INSERT INTO accounts (account_no, cust_id, balance, account_type) VALUES (?, ?, 1e9, 'Savings')",
+                         ((100000 + i, i) for i in range(ACCOUNTS)))
+        for start in range(0, count, BATCH):
+            conn.executemany("""
+            INSERT INTO transactions (account_no, transaction_type, transaction_amount, transaction_description, transaction_status)
+            VALUES (?, 'Deposit', ?, 'bench', 'Completed')
+            """, ((100000 + rng.randrange(ACCOUNTS), rng.randint(1, 500)) for _ in range(min(BATCH, count - start))))
+    return pool
+
+
+def teller(pool, stop, latencies, errors):
+    rng = random.Random(1)
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            ledger.post(100000 + rng.randrange(ACCOUNTS), "Deposit", 1, pool=pool)
+        except Exception:
+            errors.append(1)
+        latencies.append(time.perf_counter() - start)
+        time.sleep(0.002)
+
+
+def main(count=1000000):
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = setup(os.path.join(tmp, "export.db"), count)
+        # Bring the audit trail up to date first, so its catch-up copy does
+        # not compete with the postings being measured
+        audit.copy_pending(pool)
+        out_dir = os.path.join(tmp, "out")
+
+        stop = threading.Event()
+        latencies, errors = [], []
+        thread = threading.Thread(target=teller, args=(pool, stop, latencies, errors))
+        thread.start()
+
+        start = time.perf_counter()
+        results = exporter.export(out_dir, pool=pool)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        thread.join()
+
+        rows = sum(result.rows for result in results)
+        size = sum(os.path.getsize(result.path) for result in results if result.path)
+        latencies.sort()
+        print(f"full export: {rows:,} rows, {size / 1e6:.1f} MB csv.gz in {elapsed:.1f}s, {rows / elapsed:,.0f} rows/s")
+        print(f"postings meanwhile: {len(latencies)}, errors {len(errors)}, "
+              f"p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, max {latencies[-1] * 1000:.1f} ms")
+
+        start = time.perf_counter()
+        results = exporter.export(out_dir, tables=["transactions"], pool=pool)
+        print(f"incremental export: {results[0].rows:,} new rows in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        audit.get_writer(pool).close()
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:2]]
+    main(*args)
@@ -0,0 +1,82 @@
+# Creates one million customers and accounts from several processes at once
+# with IDs from ids.IdAllocator, and counts collisions (IntegrityErrors) and
+# invalid check digits. For comparison it also reports how often the old
+# random.randint(10000, 99999) scheme collides while filling a table.
+#
+#   python -m benchmarks.bench_id_allocation [accounts] [processes]
+
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+import db
+import ids
+from migrations import migrate
+
+BATCH = 10000
+
+
+def worker(path, count, block_size):
+    pool = db.ConnectionPool(path, timeout=30.0)
+    customers = ids.IdAllocator("customer", block_size, db_name=path)
+    accounts = ids.IdAllocator("account", block_size, db_name=path)
+    collisions = 0
+
+    for start in range(0, count, BATCH):
+        rows = [(customers.next(), ids.with_check_digit(accounts.next()))
+                for _ in range(min(BATCH, count - start))]
+        with pool.transaction(immediate=True) as conn:
+            for cust_id, account_no in rows:
+                try:
+                    conn.execute("INSERT INTO customer (cust_id, cust_name) VALUES (?, 'Bench')", (cust_id,))
+                    conn.execute("INSERT INTO accounts (account_no, cust_id, balance, account_type) "
+                                 "VALUES (?, ?, 0, 'Savings')", (account_no, cust_id))
+                except sqlite3.IntegrityError:
+                    collisions += 1
+    pool.close_all()
+    return collisions
+
+
+def random_scheme_collisions(count, seed=0):
+    rng = random.Random(seed)
+    used = set()
+    collisions = 0
+    for _ in range(count):
+        account_no = rng.randint(10000, 99999)
+        if account_no in used:
+            collisions += 1
+        used.add(account_no)
+    return collisions
+
+
+def main(total=1000000, processes=4, block_size=1000):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ids.db")
+        pool = db.ConnectionPool(path)
+        migrate(pool)
+
+        start = time.perf_counter()
+        with multiprocessing.Pool(processes) as procs:
+            collisions = sum(procs.starmap(worker, [(path, total // processes, block_size)] * processes))
+        elapsed = time.perf_counter() - start
+
+        with pool.connection() as conn:
+            created = conn.execute("SELECT COUNT(*) FROM accounts").fetchone()[0]
+            invalid = sum(1 for (account_no,) in conn.execute("SELECT account_no FROM accounts")
+                          if not ids.is_valid_account_no(account_no))
+        pool.close_all()
+
+    print(f"allocator: {created:,} accounts from {processes} processes in {elapsed:.1f}s "
+          f"({created / elapsed:,.0f}/s), {collisions} collisions, {invalid} bad check digits")
+    for count in (1000, 10000, 50000):
+        print(f"random.randint(10000, 99999): {random_scheme_collisions(count):,} collisions in {count:,} inserts")
+    return 0 if collisions == 0 and invalid == 0 and created == total else 1
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    sys.exit(main(*args))
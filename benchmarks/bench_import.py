@@ -0,0 +1,61 @@
+# Bulk import throughput: writes a seeded synthetic customers CSV, then loads
+# it into a fresh database in the offline mode that drops and rebuilds the
+# secondary indexes, and into another keeping them, and reports rows/s for
+# both.
+#
+#   python -m benchmarks.bench_import [rows]
+
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+import audit
+import db
+import importer
+from migrations import migrate
+
+FIRST_NAMES = ["Abel", "Abebe", "Almaz", "Dawit", "Eleni", "Genet", "Hana", "Liya", "Meron", "Yonas"]
+CITIES = ["Addis Ababa", "Adama", "Bahir Dar", "Dire Dawa", "Gondar", "Hawassa"]
+
+
+def write_csv(path, rows, seed=0):
+    rng = random.Random(seed)
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(importer.COLUMNS)
+        for i in range(rows):
+            first = rng.choice(FIRST_NAMES)
+            writer.writerow([f"{first} Customer{i}", f"19{rng.randint(40, 99)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                             f"09{rng.randint(10000000, 99999999)}", rng.choice(CITIES), f"Kebele {rng.randint(1, 30)}",
+                             f"{first.lower()}{i}@example.com", rng.choice(("Savings", "Checking", "Business")),
+                             rng.choice(("0", "100", "2500.50")) if rng.random() > 0.001 else "oops"])
+
+
+def run(tmp, path, drop_indexes):
+    pool = db.ConnectionPool(os.path.join(tmp, f"import_{drop_indexes}.db"))
+    migrate(pool)
+    report = importer.import_file(path, drop_indexes=drop_indexes, pool=pool)
+    audit.get_writer(pool).close()
+    pool.close_all()
+    label = "drop and rebuild indexes" if drop_indexes else "keep indexes"
+    print(f"{label:25} {report.loaded:,} loaded, {len(report.failed):,} rejected in {report.seconds:.1f}s, "
+          f"{report.rows / report.seconds:,.0f} rows/s")
+
+
+def main(rows=1000000):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "customers.csv")
+        start = time.perf_counter()
+        write_csv(path, rows)
+        print(f"wrote {rows:,} rows ({os.path.getsize(path) / 1e6:.0f} MB) in {time.perf_counter() - start:.1f}s")
+
+        run(tmp, path, True)
+        run(tmp, path, False)
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:2]]
+    main(*args)
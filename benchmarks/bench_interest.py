@@ -0,0 +1,84 @@
+# Interest accrual over a synthetic accounts table: the pure-Python reference
+# and the NumPy version on the same chunks (results must match exactly), then
+# the full job with write-back and Deposit transactions.
+#
+#   python -m benchmarks.bench_interest [accounts] [chunk_size]
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+import db
+import interest
+from migrations import migrate
+
+BATCH = 100000
+
+
+def setup(path, accounts, seed=0):
+    rng = random.Random(seed)
+    pool = db.ConnectionPool(path)
+    migrate(pool)
+    with pool.transaction() as conn:
+        for start in range(0, accounts, BATCH):
+            conn.executemany("""
+            INSERT INTO accounts (account_no, cust_id, balance, account_type, account_status, interest_rate, minimum_balance)
+            VALUES (?, ?, ?, 'Savings', ?, ?, ?)
+            """, ((100000 + i, i, round(rng.uniform(0, 50000), 2), "Active" if rng.random() < 0.97 else "Inactive",
+                   rng.choice((0.0, 1.5, 3.0, 4.25, 7.0)), rng.choice((0.0, 100.0, 1000.0)))
+                  for i in range(start, min(accounts, start + BATCH))))
+    return pool
+
+
+def chunks(pool, chunk_size):
+    with pool.connection() as conn:
+        after = 0
+        while True:
+            rows = interest._chunk(conn, after, chunk_size)
+            if not rows:
+                return
+            yield rows
+            after = rows[-1][0]
+
+
+def main(accounts=10000000, chunk_size=50000):
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        pool = setup(os.path.join(tmp, "interest.db"), accounts)
+        print(f"setup: {accounts:,} accounts in {time.perf_counter() - start:.1f}s")
+
+        periods = interest.PERIODS["daily"]
+        reference_time = vectorized_time = 0.0
+        mismatches = 0
+        for rows in chunks(pool, chunk_size):
+            start = time.perf_counter()
+            expected = interest.reference_interest(rows, periods)
+            reference_time += time.perf_counter() - start
+
+            if interest.np is not None:
+                start = time.perf_counter()
+                actual = interest.vectorized_interest(rows, periods)
+                vectorized_time += time.perf_counter() - start
+                mismatches += actual != expected
+
+        print(f"compute, pure Python: {reference_time:7.2f}s")
+        if interest.np is not None:
+            print(f"compute, NumPy:       {vectorized_time:7.2f}s ({reference_time / vectorized_time:.1f}x), "
+                  f"{mismatches} chunks differ")
+        else:
+            print("compute, NumPy:       skipped (numpy is not installed)")
+
+        start = time.perf_counter()
+        report = interest.accrue_interest("daily", "2024-01-01", chunk_size, pool=pool)
+        elapsed = time.perf_counter() - start
+        print(f"accrual job ({'NumPy' if interest.np is not None else 'pure Python'}): {elapsed:.1f}s, "
+              f"{report.accounts:,} accounts credited, {accounts / elapsed:,.0f} accounts/s, "
+              f"total {report.total_interest:,.2f}")
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    main(*args)
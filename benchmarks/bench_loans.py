@@ -0,0 +1,86 @@
+# Loan engine at portfolio scale: origination, batch repayments, then the
+# portfolio and delinquency queries (which read the per-loan aggregates)
+# against the same totals computed from loan_repayment directly.
+#
+#   python -m benchmarks.bench_loans [loans] [repayments]
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+import db
+import loans
+from migrations import migrate
+
+BATCH = 100000
+
+
+def setup(path, count, seed=0):
+    rng = random.Random(seed)
+    pool = db.ConnectionPool(path)
+    migrate(pool)
+    with pool.transaction() as conn:
+        conn.executemany("INSERT INTO accounts (account_no, cust_id, balance, account_type) VALUES (?, ?, 1e9, 'Savings')",
+                         ((100000 + i, i) for i in range(count)))
+        for start in range(0, count, BATCH):
+            rows = []
+            for i in range(start, min(count, start + BATCH)):
+                amount, rate, term = rng.choice((5000, 20000, 100000)), rng.choice((0, 8.5, 12, 18)), rng.choice((12, 36, 60))
+                rows.append((i + 1, i, 100000 + i, amount, rate, term, loans.monthly_payment(amount, rate, term), amount))
+            conn.executemany("""
+            INSERT INTO loan (loan_id, cust_id, account_no, loan_amount, interest_rate, start_date, end_date,
+                              term_months, monthly_payment, outstanding_principal, next_due_date)
+            VALUES (?, ?, ?, ?, ?, '2020-01-01', date('2020-01-01', '+' || ? || ' months'), ?, ?, ?, '2020-02-01')
+            """, ((row[0], row[1], row[2], row[3], row[4], row[5], row[5], row[6], row[7]) for row in rows))
+    return pool
+
+
+def timed(label, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    print(f"{label:34} {(time.perf_counter() - start) * 1000:10.2f} ms")
+    return result
+
+
+def main(count=100000, repayments=1000000):
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = setup(os.path.join(tmp, "loans.db"), count)
+
+        start = time.perf_counter()
+        for i in range(1000):
+            loans.originate_loan(100000 + i, 1000, 10, 12, "2020-01-01", pool=pool)
+        print(f"originate: {1000 / (time.perf_counter() - start):,.0f} loans/s")
+
+        rng = random.Random(1)
+        payments = {}
+        with pool.connection() as conn:
+            payments = dict(conn.execute("SELECT loan_id, monthly_payment FROM loan").fetchall())
+        rows = [(loan_id, payments[loan_id], f"2020-{1 + i * 12 // repayments:02d}-15")
+                for i, loan_id in enumerate(rng.randrange(1, count + 1) for _ in range(repayments))]
+
+        start = time.perf_counter()
+        report = loans.post_repayments(rows, pool=pool)
+        elapsed = time.perf_counter() - start
+        print(f"repayments: {repayments:,} in {elapsed:.1f}s, {repayments / elapsed:,.0f} rows/s, "
+              f"posted {report.posted:,}, failed {len(report.failed):,}, paid off {len(report.paid):,}")
+
+        timed("portfolio summary (aggregates)", loans.portfolio_summary, pool)
+        with pool.connection() as conn:
+            timed("portfolio summary (loan_repayment)", lambda: conn.execute("""
+            SELECT l.status, COUNT(*), SUM(COALESCE(r.paid, 0))
+            FROM loan l LEFT JOIN (SELECT loan_id, SUM(amount_paid) AS paid FROM loan_repayment GROUP BY loan_id) r
+            ON r.loan_id = l.loan_id
+            GROUP BY l.status
+            """).fetchall())
+        timed("delinquent loans, first 100", loans.delinquent_loans, "2020-12-31", 30, 100, pool)
+        timed("projected cash flows, 12 months", loans.projected_cash_flows, 12, 50000, pool)
+        defaulted = timed("mark defaults", loans.mark_defaults, "2020-12-31", 90, pool)
+        print(f"defaulted {defaulted:,} loans; {'NumPy' if loans.np is not None else 'pure Python'} cash flows")
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    main(*args)
@@ -0,0 +1,93 @@
+# Login latency (correct password, wrong password, unknown user, locked-out
+# user) and the throughput of concurrent logins from 1 to 8 threads. The KDF
+# dominates and hashlib releases the GIL while it runs, so throughput scales
+# with the CPU cores available.
+#
+#   python -m benchmarks.bench_login [logins_per_thread]
+
+import itertools
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import audit
+import db
+import passwords
+import services
+from migrations import migrate
+
+USERS = 8
+
+
+def setup(path):
+    pool = db.configure(path)
+    migrate(pool)
+    credentials = []
+    for i in range(USERS):
+        _, username, password = services.hire_employee(1001, f"Bench User{i}", "M", 1, "Manager", 1000,
+                                                       "1990-01-01", 900000000 + i, "Addis Ababa", "-", "-")
+        credentials.append((username, password))
+    return pool, credentials
+
+
+def latency(label, attempts, fn):
+    times = []
+    for _ in range(attempts):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    print(f"{label:26s} median {statistics.median(times) * 1000:7.2f} ms  max {times[-1] * 1000:7.2f} ms")
+
+
+def refused(username, password):
+    try:
+        services.authenticate(username, password)
+    except passwords.TooManyAttempts:
+        return
+
+
+def throughput(credentials, threads, per_thread):
+    def run(username, password):
+        for _ in range(per_thread):
+            assert services.authenticate(username, password) is not None
+
+    workers = [threading.Thread(target=run, args=credentials[i % len(credentials)]) for i in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    print(f"{threads} thread(s): {threads * per_thread / elapsed:6.1f} logins/s")
+
+
+def main(per_thread=10):
+    with tempfile.TemporaryDirectory() as tmp:
+        pool, credentials = setup(os.path.join(tmp, "login.db"))
+        username, password = credentials[0]
+        print(f"KDF: {passwords.SCHEME}, {os.cpu_count()} CPU(s)")
+
+        latency("correct password", 20, lambda: services.authenticate(username, password))
+        latency("wrong password", 4, lambda: services.authenticate(credentials[1][0], "wrong"))
+        # A fresh name each time, so the failure cache never locks them out
+        unknown = (f"nobody{i}" for i in itertools.count())
+        latency("unknown user", 20, lambda: services.authenticate(next(unknown), "wrong"))
+        for _ in range(passwords.failures.max_failures):
+            services.authenticate(credentials[2][0], "wrong")
+        latency("locked out", 1000, lambda: refused(credentials[2][0], "wrong"))
+        passwords.failures.clear()
+
+        for threads in (1, 2, 4, 8):
+            throughput(credentials, threads, per_thread)
+
+        audit.get_writer(pool).close()
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:2]]
+    main(*args)
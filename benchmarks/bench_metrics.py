@@ -0,0 +1,96 @@
+# Manager dashboard metrics refresh: the old full COUNT/SUM scans versus the
+# trigger-maintained summary tables, plus what the triggers cost each posting.
+#
+#   python -m benchmarks.bench_metrics [accounts] [refreshes] [postings]
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+import db
+import ledger
+import metrics
+from migrations import migrate
+
+BATCH = 100000
+
+ACCOUNT_TRIGGERS = ("trg_accounts_metrics_insert", "trg_accounts_metrics_update", "trg_accounts_metrics_delete")
+
+
+def setup(path, accounts):
+    pool = db.ConnectionPool(path)
+    migrate(pool)
+    with pool.transaction() as conn:
+        for start in range(0, accounts, BATCH):
+            conn.executemany("INSERT INTO accounts (account_no, cust_id, balance, account_type) VALUES (?, ?, 100.0, 'Savings')",
+                             ((100000 + i, i) for i in range(start, min(accounts, start + BATCH))))
+    return pool
+
+
+def full_scan(conn):
+    totals, _ = metrics.recompute(conn)
+    conn.execute("""
+    SELECT d.dep_name, COUNT(e.emp_id)
+    FROM employee e
+    JOIN department d ON e.dep_id = d.dep_id
+    WHERE e.job_title IS NOT NULL
+    GROUP BY d.dep_name
+    """).fetchall()
+    return totals
+
+
+def time_refresh(pool, load, count):
+    samples = []
+    with pool.connection() as conn:
+        for _ in range(count):
+            start = time.perf_counter()
+            load(conn)
+            samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def time_postings(pool, accounts, count, seed=0):
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    for _ in range(count):
+        ledger.post(100000 + rng.randrange(accounts), "Deposit", rng.randint(1, 500), pool=pool)
+    return (time.perf_counter() - start) / count
+
+
+def main(accounts=10000000, refreshes=5, postings=2000):
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        pool = setup(os.path.join(tmp, "metrics.db"), accounts)
+        print(f"setup: {accounts:,} accounts in {time.perf_counter() - start:.1f}s")
+
+        scan = time_refresh(pool, full_scan, refreshes)
+        summary = time_refresh(pool, metrics.load, max(refreshes, 1000))
+        print(f"refresh, full scans:    {scan * 1000:10.3f} ms (median of {refreshes})")
+        print(f"refresh, summary table: {summary * 1000:10.3f} ms ({scan / summary:,.0f}x faster)")
+
+        with_triggers = time_postings(pool, accounts, postings)
+        with pool.transaction() as conn:
+            saved = [conn.execute("SELECT sql FROM sqlite_master WHERE name = ?", (name,)).fetchone()[0]
+                     for name in ACCOUNT_TRIGGERS]
+            for name in ACCOUNT_TRIGGERS:
+                conn.execute(f"DROP TRIGGER {name}")
+        without_triggers = time_postings(pool, accounts, postings, seed=1)
+        print(f"posting with triggers:    {with_triggers * 1e6:8.1f} us")
+        print(f"posting without triggers: {without_triggers * 1e6:8.1f} us "
+              f"({(with_triggers / without_triggers - 1) * 100:+.1f}%)")
+
+        with pool.transaction() as conn:
+            for sql in saved:
+                conn.execute(sql)
+        # The postings made without triggers show up as drift, and are repaired
+        drift = metrics.reconcile(fix=True, pool=pool)
+        print(f"reconcile: {len(drift)} drifted {drift}, after repair: {metrics.reconcile(pool=pool)}")
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:4]]
+    main(*args)
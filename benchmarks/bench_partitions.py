@@ -0,0 +1,132 @@
+# Hot-path latency with years of history in the live database, against the
+# same database with every closed month archived into partition files
+# (partitions.py). Both start from one generated database whose history ends
+# today, each run on its own copy: the suite's posting and dashboard
+# benchmarks, the size of the live file and the time to snapshot it, plus two
+# reads that reach into archived months (a year's statement and a quarter in
+# the transaction browser). The archival itself is timed too.
+#
+#   python -m benchmarks.bench_partitions [--rows N] [--years Y]
+
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import closing, redirect_stderr
+from datetime import datetime, timedelta, timezone
+from functools import partial
+
+import audit
+import backup
+import db
+import pages
+import partitions
+import services
+import statements
+from benchmarks import datagen, suite
+
+BENCHMARKS = ["posting", "withdrawal", "transfer", "account_lookup", "metrics_refresh", "recent_transactions"]
+
+# Everything else is in milliseconds
+UNITS = {"live file": "MB", "snapshot": "s"}
+
+
+def copy(source, path):
+    with closing(sqlite3.connect(source)) as original, closing(sqlite3.connect(path)) as target:
+        original.backup(target)
+
+
+def median_ms(fn, count=20):
+    fn()
+    times = []
+    for _ in range(count):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def history_reads(pool, account_no, quarter):
+    # A year's statement of one account, and the first browser pages of a quarter
+    year_ago = time.strftime("%Y-%m-%d", time.gmtime(time.time() - 365 * 86400))
+    where, params = services.transaction_filter(*quarter)
+
+    def statement():
+        for _ in statements.statement_lines(account_no, year_ago, pool=pool):
+            pass
+
+    def browse():
+        # As the browser's model reads them (pages.py)
+        prepare = partial(partitions.history_window, start_date=quarter[0], end_date=quarter[1])
+        with pool.connection() as conn:
+            rows = pages.read_page(conn, pages.TRANSACTIONS, None, where, params, suite.PAGE_SIZE, prepare)
+            for _ in range(3):
+                rows = pages.read_page(conn, pages.TRANSACTIONS, rows[-1][-2:], where, params, suite.PAGE_SIZE,
+                                       prepare)
+
+    return {"statement of a year": median_ms(statement), "browser on a quarter": median_ms(browse)}
+
+
+def measure(path, backup_dir, account_no, quarter):
+    pool = db.configure(path)
+    try:
+        with open(os.devnull, "w") as devnull, redirect_stderr(devnull):
+            results = {name: result["p50_ms"] for name, result in suite.run_benchmarks(pool, only=BENCHMARKS).items()}
+        results.update(history_reads(pool, account_no, quarter))
+        with pool.connection() as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        results["live file"] = os.path.getsize(path) / 1e6
+        results["snapshot"] = backup.snapshot(backup_dir, pause=0, pool=pool).seconds
+        return results
+    finally:
+        audit.get_writer(pool).close()
+        pool.close_all()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hot-path latency before and after archiving closed months.")
+    parser.add_argument("--rows", type=int, default=1000000, help="size of the generated database")
+    parser.add_argument("--years", type=int, default=5, help="years of history, ending today")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "generated.db")
+        span = args.years * 365 * 86400
+        print(f"Generating {args.rows:,} rows over {args.years} years...", file=sys.stderr)
+        datagen.generate(source, args.rows, start=int(time.time()) - span, span=span)
+        with closing(sqlite3.connect(source)) as conn:
+            account_no = conn.execute("""
+            SELECT account_no FROM transactions GROUP BY account_no ORDER BY COUNT(*) DESC LIMIT 1
+            """).fetchone()[0]
+        middle = (datetime.now(timezone.utc) - timedelta(seconds=span // 2)).replace(day=1)
+        quarter = (f"{middle:%Y-%m-%d}", f"{middle + timedelta(days=89):%Y-%m-%d}")
+
+        before = os.path.join(tmp, "before.db")
+        copy(source, before)
+        results = {"one file": measure(before, os.path.join(tmp, "backups-before"), account_no, quarter)}
+
+        after = os.path.join(tmp, "after.db")
+        copy(source, after)
+        pool = db.configure(after)
+        months = []
+        start = time.perf_counter()
+        partitions.archive(pool=pool, on_progress=lambda partition, seconds: months.append(seconds))
+        elapsed = time.perf_counter() - start
+        audit.get_writer(pool).close()
+        pool.close_all()
+        results["partitioned"] = measure(after, os.path.join(tmp, "backups-after"), account_no, quarter)
+
+    print(f"{args.rows:,} rows over {args.years} years; archived {len(months)} months in {elapsed:.1f}s "
+          f"(slowest month {max(months, default=0):.2f}s)")
+    print(f"{'':26s} {'one file':>10s} {'partitioned':>12s} {'change':>8s}")
+    for name in results["one file"]:
+        old, new = results["one file"][name], results["partitioned"][name]
+        print(f"{name + ', ' + UNITS.get(name, 'ms'):26s} {old:10.3f} {new:12.3f} {new / old - 1:8.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
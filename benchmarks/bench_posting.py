@@ -0,0 +1,88 @@
+# Concurrent Deposit/Withdrawal stress test for ledger.post. Worker processes
+# hammer a small set of hot accounts; afterwards every account balance must
+# equal its opening balance plus the net of its completed transactions rows,
+# i.e. no update was lost.
+#
+#   python -m benchmarks.bench_posting [postings_per_worker]
+
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+import db
+import ledger
+from migrations import migrate
+
+ACCOUNTS = 20
+OPENING_BALANCE = 1000.0
+
+
+def setup(path):
+    pool = db.ConnectionPool(path)
+    migrate(pool)
+    with pool.transaction() as conn:
+        conn.execute("INSERT INTO customer (cust_id, cust_name) VALUES (1, 'Stress Test')")
+        conn.executemany("INSERT INTO accounts (account_no, cust_id, balance, account_type) VALUES (?, 1, ?, 'Savings')",
+                         [(10000 + i, OPENING_BALANCE) for i in range(ACCOUNTS)])
+    pool.close_all()
+
+
+def worker(path, seed, postings):
+    pool = db.ConnectionPool(path, timeout=30.0)
+    rng = random.Random(seed)
+    rejected = 0
+    for _ in range(postings):
+        account_no = 10000 + rng.randrange(ACCOUNTS)
+        transaction_type = rng.choice(ledger.TRANSACTION_TYPES)
+        try:
+            ledger.post(account_no, transaction_type, rng.randint(1, 50), "stress", pool=pool)
+        except ledger.PostingError:
+            rejected += 1
+    pool.close_all()
+    return rejected
+
+
+def verify(path):
+    pool = db.ConnectionPool(path)
+    with pool.connection() as conn:
+        drift = conn.execute(f"""
+        SELECT a.account_no, a.balance, ? + COALESCE(SUM({ledger.SIGNED_AMOUNT_SQL}), 0) AS expected
+        FROM accounts a
+        LEFT JOIN transactions t ON t.account_no = a.account_no AND t.transaction_status = 'Completed'
+        GROUP BY a.account_no
+        HAVING ABS(a.balance - expected) > 1e-6
+        """, (OPENING_BALANCE,)).fetchall()
+        negative = conn.execute("SELECT COUNT(*) FROM accounts WHERE balance < 0").fetchone()[0]
+    pool.close_all()
+    return drift, negative
+
+
+def run(workers, postings):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "posting.db")
+        setup(path)
+
+        start = time.perf_counter()
+        with multiprocessing.Pool(workers) as procs:
+            rejected = sum(procs.starmap(worker, [(path, seed, postings) for seed in range(workers)]))
+        elapsed = time.perf_counter() - start
+
+        drift, negative = verify(path)
+
+    total = workers * postings
+    status = "ok" if not drift and not negative else f"LOST UPDATES on {len(drift)} accounts, {negative} negative"
+    print(f"{workers:3d} processes  {total:7d} postings  {total / elapsed:9.0f} postings/s  "
+          f"{rejected:6d} rejected  {status}")
+    return not drift and not negative
+
+
+def main(postings=2000):
+    ok = all([run(workers, postings) for workers in (1, 2, 4, 8, 16)])
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
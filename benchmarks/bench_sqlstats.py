@@ -0,0 +1,69 @@
+# Overhead of the SQL instrumentation (sqlstats.py): the suite's dashboard
+# and posting benchmarks with it off, on with the default recording windows,
+# and on for every statement (duty 1), in rotating rounds on the same
+# generated database so drift and caching affect all alike. Prints the mean
+# latency of each and the overhead against running without it.
+#
+#   python -m benchmarks.bench_sqlstats [rows] [rounds]
+
+import os
+import sys
+import tempfile
+from contextlib import redirect_stderr
+
+import audit
+import db
+import sqlstats
+from benchmarks import datagen, suite
+
+BENCHMARKS = ["account_search", "account_lookup", "posting", "metrics_refresh", "recent_transactions",
+              "recent_actions"]
+
+
+MODES = {"off": None, "on": sqlstats.DUTY, "duty 1": 1.0}
+
+
+def run(path, duty):
+    if duty is None:
+        sqlstats.disable()
+    else:
+        sqlstats.enable(duty=duty)
+    pool = db.configure(path)
+    try:
+        with open(os.devnull, "w") as devnull, redirect_stderr(devnull):
+            return suite.run_benchmarks(pool, only=BENCHMARKS)
+    finally:
+        audit.get_writer(pool).close()
+        pool.close_all()
+
+
+def main(rows=100000, rounds=5):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        datagen.generate(path, rows)
+
+        means = {mode: {name: [] for name in BENCHMARKS} for mode in MODES}
+        order = list(MODES)
+        for i in range(rounds):
+            for mode in order[i % len(order):] + order[:i % len(order)]:
+                for name, result in run(path, MODES[mode]).items():
+                    means[mode][name].append(result["mean_ms"])
+
+    print(f"{rows:,} rows, {rounds} rounds, slowest round of each dropped")
+    print(f"{'':20s} " + " ".join(f"{mode + ' ms':>10s}" for mode in MODES) + " " +
+          " ".join(f"{mode + ' +%':>9s}" for mode in order[1:]))
+    totals = dict.fromkeys(MODES, 0.0)
+    for name in BENCHMARKS:
+        mean = {mode: sum(sorted(means[mode][name])[:-1]) / (rounds - 1) for mode in MODES}
+        for mode in MODES:
+            totals[mode] += mean[mode]
+        print(f"{name:20s} " + " ".join(f"{mean[mode]:10.3f}" for mode in MODES) + " " +
+              " ".join(f"{mean[mode] / mean['off'] - 1:9.1%}" for mode in order[1:]))
+    print(f"{'all':20s} " + " ".join(f"{totals[mode]:10.3f}" for mode in MODES) + " " +
+          " ".join(f"{totals[mode] / totals['off'] - 1:9.1%}" for mode in order[1:]))
+    print(f"statements recorded: {len(sqlstats.statements())}, slow: {len(sqlstats.slow_queries())}")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    main(*args)
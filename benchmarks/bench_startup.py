@@ -0,0 +1,115 @@
+# Application startup: time from launching the process to the login window's
+# first paint, and from submitting a login to the first paint of the
+# dashboard, for each role against a database from benchmarks.datagen. Every
+# run is a fresh process (one uncounted warm-up first, so .pyc files exist);
+# the medians are printed. Needs PyQt5; QT_QPA_PLATFORM defaults to offscreen.
+#
+#   python -m benchmarks.bench_startup [--rows N] [--runs R]
+
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import closing
+
+import db
+from benchmarks import datagen
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ROLES = {"HR": 107, "Accountant": 101, "Manager": 102}
+
+
+def child(path, username, password, launched):
+    # Runs the app in this process and prints the timings as JSON, in seconds
+    # since `launched` (the parent's time.time() just before starting it)
+    times = {"interpreter": time.time() - launched}
+    db.configure(path)
+    import app
+    import login
+    from PyQt5.QtCore import QEvent, QObject, QTimer
+    from PyQt5.QtWidgets import QWidget
+    times["imported"] = time.time() - launched
+
+    def log_in():
+        login_window.username_input.setText(username)
+        login_window.password_input.setText(password)
+        times["login_submitted"] = time.time() - launched
+        login_window.authenticate()
+
+    class FirstPaints(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Paint and isinstance(obj, QWidget):
+                window = obj.window()
+                # dashboards is only imported by the first login
+                dashboards = sys.modules.get("dashboards")
+                if isinstance(window, login.LoginWindow) and "login_window" not in times:
+                    times["login_window"] = time.time() - launched
+                    QTimer.singleShot(0, log_in)
+                elif (dashboards is not None and isinstance(window, dashboards.DashboardTemplate)
+                      and "dashboard" not in times):
+                    times["dashboard"] = time.time() - launched
+                    QTimer.singleShot(0, application.quit)
+            return False
+
+    application, login_window = app.start([sys.argv[0]])
+    first_paints = FirstPaints()
+    application.installEventFilter(first_paints)
+    QTimer.singleShot(60000, application.quit)
+    application.exec_()
+    print(json.dumps(times))
+
+
+def launch(tmp, path, username, password):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    launched = time.time()
+    result = subprocess.run([sys.executable, "-m", "benchmarks.bench_startup", "--child", path, username, password,
+                             repr(launched)], cwd=tmp, env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure time to the login window and to the first dashboard paint.")
+    parser.add_argument("--rows", type=int, default=100000, help="size of the generated database")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--child", nargs=4, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        path, username, password, launched = args.child
+        child(path, username, password, float(launched))
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        datagen.generate(path, args.rows)
+        with closing(sqlite3.connect(path)) as conn:
+            # Generated employees (the seeded ones have other passwords)
+            users = {role: conn.execute("SELECT username FROM employee WHERE username LIKE 'user%' AND dep_id = ? "
+                                        "AND job_title IS NOT NULL ORDER BY emp_id LIMIT 1", (dep_id,)).fetchone()[0]
+                     for role, dep_id in ROLES.items()}
+
+        print(f"{args.rows:,} rows, median of {args.runs} launches, ms since the process was started")
+        print(f"{'':12s} {'imported':>9s} {'login win':>10s} {'submitted':>10s} {'dashboard':>10s} "
+              f"{'login->dash':>12s}")
+        launch(tmp, path, users["HR"], datagen.PASSWORD)
+        for role, username in users.items():
+            runs = [launch(tmp, path, username, datagen.PASSWORD) for _ in range(args.runs)]
+
+            def median(name):
+                return statistics.median(run[name] for run in runs) * 1000
+
+            after_login = statistics.median(run["dashboard"] - run["login_submitted"] for run in runs) * 1000
+            print(f"{role:12s} {median('imported'):9.1f} {median('login_window'):10.1f} "
+                  f"{median('login_submitted'):10.1f} {median('dashboard'):10.1f} {after_login:12.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+# Streams statements of growing length for one account to CSV and reports
+# time and peak Python memory, which should stay flat as the row count grows.
+#
+#   python -m benchmarks.bench_statement [max_rows]
+
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import db
+import statements
+from migrations import migrate
+
+ACCOUNT = 100000
+BATCH = 100000
+
+
+def setup(path, rows, seed=0):
+    rng = random.Random(seed)
+    pool = db.ConnectionPool(path)
+    migrate(pool)
+    with pool.transaction() as conn:
+        conn.execute("INSERT INTO accounts (account_no, cust_id, balance, account_type) VALUES (?, 1, 0, 'Savings')",
+                     (ACCOUNT,))
+        balance = 0
+        for start in range(0, rows, BATCH):
+            batch = []
+            for i in range(start, min(rows, start + BATCH)):
+                amount = rng.randint(1, 500)
+                kind = "Deposit" if balance < amount or rng.random() < 0.6 else "Withdrawal"
+                balance += amount if kind == "Deposit" else -amount
+                date = f"20{10 + i * 14 // rows:02d}-{1 + i % 12:02d}-{1 + i % 28:02d} {i % 24:02d}:00:00"
+                batch.append((ACCOUNT, kind, amount, date, "bench"))
+            conn.executemany("""
+            INSERT INTO transactions (account_no, transaction_type, transaction_amount, transaction_date,
+                                      transaction_description, transaction_status)
+            VALUES (?, ?, ?, ?, ?, 'Completed')
+            """, batch)
+        conn.execute("UPDATE accounts SET balance = ? WHERE account_no = ?", (balance, ACCOUNT))
+    return pool, balance
+
+
+def main(max_rows=1000000):
+    with tempfile.TemporaryDirectory() as tmp:
+        pool, balance = setup(os.path.join(tmp, "statement.db"), max_rows)
+        out = os.path.join(tmp, "statement.csv")
+
+        # Statements over the last n rows' worth of history (dates are spread evenly)
+        for fraction in (0.01, 0.1, 1.0):
+            rows = int(max_rows * fraction)
+            with pool.connection() as conn:
+                start_date = conn.execute("""
+                SELECT transaction_date FROM transactions WHERE account_no = ?
+                ORDER BY transaction_date DESC, transaction_id DESC LIMIT 1 OFFSET ?
+                """, (ACCOUNT, rows - 1)).fetchone()[0]
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            with open(out, "w", newline="") as file:
+                lines = statements.statement_lines(ACCOUNT, start_date[:10], pool=pool)
+                count = statements.write_csv(lines, file)
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            with open(out, "rb") as file:
+                file.seek(-200, os.SEEK_END)
+                closing = float(file.read().split(b",")[-1])
+            print(f"{count:>9,} rows: {elapsed:6.2f}s, {count / elapsed:9,.0f} rows/s, peak {peak / 1024:7.0f} KiB, "
+                  f"closing balance {'ok' if abs(closing - balance) < 0.005 else 'WRONG'}")
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:2]]
+    main(*args)
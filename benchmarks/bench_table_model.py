@@ -0,0 +1,94 @@
+# Cost of opening the Recent Transactions grid over a large transactions
+# table: the old fetchall() into per-cell items against LazySqlTableModel,
+# which only loads the first page and keeps a bounded page cache while
+# scrolling. Needs PyQt5 (no display required).
+#
+#   python -m benchmarks.bench_table_model [rows]
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from PyQt5.QtCore import Qt
+
+import db
+import pages
+from migrations import migrate
+from models import LazySqlTableModel, format_amount
+
+VISIBLE_ROWS = 30
+
+
+def setup(path, rows):
+    pool = db.ConnectionPool(path)
+    migrate(pool)
+    with pool.transaction() as conn:
+        conn.executemany("""
+        INSERT INTO transactions (account_no, transaction_type, transaction_amount, transaction_date,
+                                  transaction_description, transaction_status)
+        VALUES (?, 'Deposit', ?, datetime('2020-01-01', '+' || ? || ' seconds'), 'bench', 'Completed')
+        """, ((100000 + i % 5000, i % 1000 + 0.5, i) for i in range(rows)))
+    return pool
+
+
+def measure(label, fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{label:<40} {elapsed * 1000:9.1f} ms  peak {peak / 1e6:8.1f} MB")
+
+
+def fetchall_open(pool):
+    # What update_recent_transactions did, minus the widget items themselves
+    with pool.connection() as conn:
+        rows = conn.execute("""
+        SELECT transaction_date, account_no, transaction_type, transaction_amount,
+               transaction_description, transaction_status
+        FROM transactions ORDER BY transaction_date DESC
+        """).fetchall()
+    [[f"{value:,.2f}" if col == 3 else str(value) for col, value in enumerate(row)] for row in rows]
+
+
+def lazy_model(pool):
+    # The browser's columns over the live table alone
+    return LazySqlTableModel(
+        ["Date", "Account", "Type", "Amount", "Description", "Status"],
+        pages.TRANSACTIONS._replace(from_clause="transactions t"), formatters={3: format_amount}, pool=pool)
+
+
+def paint(model, first_row):
+    for row in range(first_row, min(first_row + VISIBLE_ROWS, model.rowCount())):
+        for column in range(model.columnCount()):
+            model.data(model.index(row, column), Qt.DisplayRole)
+
+
+def lazy_open(pool):
+    model = lazy_model(pool)
+    model.fetchMore()
+    paint(model, 0)
+
+
+def lazy_scroll(pool, depth):
+    model = lazy_model(pool)
+    while model.rowCount() < depth and model.canFetchMore():
+        model.fetchMore()
+    paint(model, depth - VISIBLE_ROWS)
+    paint(model, 0)
+
+
+def main(rows=1000000):
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = setup(os.path.join(tmp, "grid.db"), rows)
+        measure(f"fetchall, {rows:,} rows", lambda: fetchall_open(pool))
+        measure("lazy model, open + first paint", lambda: lazy_open(pool))
+        measure(f"lazy model, scroll to row {rows // 2:,}", lambda: lazy_scroll(pool, rows // 2))
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,78 @@
+# Page latency of the Manager's transaction browser over a database from
+# benchmarks.datagen: each filter combination is paged from the newest row to
+# the oldest as the grid scrolls (keyset on date, id), and the first, median
+# and last page are compared with fetching that last page by OFFSET.
+#
+#   python -m benchmarks.bench_transaction_browser [rows]
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import db
+import services
+from benchmarks import datagen, suite
+
+FILTERS = {
+    "no filters": {},
+    "one quarter": {"start_date": "2024-01-01", "end_date": "2024-03-31"},
+    "branch": {"branch_id": 1},
+    "withdrawals": {"transaction_type": "Withdrawal"},
+    "100 - 999.99": {"amount_band": "100 - 999.99"},
+    "quarter + branch + type": {"start_date": "2024-01-01", "end_date": "2024-03-31", "branch_id": 1,
+                                "transaction_type": "Deposit"},
+    "failed": {"status": "Failed"},
+    "10,000 and over": {"amount_band": "10,000 and over"},
+}
+
+
+def page_sql(where, after):
+    # As LazySqlTableModel builds it: the key bound first
+    conditions = ["(t.transaction_date, t.transaction_id) < (?, ?)"] if after else []
+    if where:
+        conditions.append(f"({where})")
+    return suite.RECENT_TRANSACTIONS_SQL.format(
+        where="WHERE " + " AND ".join(conditions) if conditions else "", limit=suite.PAGE_SIZE)
+
+
+def walk(conn, where, params):
+    # Latency of every keyset page, newest to oldest
+    latencies = []
+    key = None
+    while True:
+        start = time.perf_counter()
+        rows = conn.execute(page_sql(where, key), (key or ()) + params).fetchall()
+        latencies.append(time.perf_counter() - start)
+        if len(rows) < suite.PAGE_SIZE:
+            return latencies
+        key = tuple(rows[-1][-2:])
+
+
+def offset_page(conn, where, params, page):
+    sql = page_sql(where, None).rstrip() + f" OFFSET {page * suite.PAGE_SIZE}"
+    start = time.perf_counter()
+    conn.execute(sql, params).fetchall()
+    return time.perf_counter() - start
+
+
+def main(rows=1000000):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        datagen.generate(path, rows)
+        pool = db.configure(path)
+        print(f"{rows:,} rows, {suite.PAGE_SIZE} rows a page, ms")
+        print(f"{'':24s} {'pages':>7s} {'first':>8s} {'median':>8s} {'last':>8s} {'OFFSET last':>12s}")
+        with pool.connection() as conn:
+            for label, filters in FILTERS.items():
+                where, params = services.transaction_filter(**filters)
+                latencies = walk(conn, where, params)
+                offset = offset_page(conn, where, params, len(latencies) - 1)
+                print(f"{label:24s} {len(latencies):7,d} {latencies[0] * 1000:8.2f} "
+                      f"{statistics.median(latencies) * 1000:8.2f} {latencies[-1] * 1000:8.2f} {offset * 1000:12.2f}")
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,109 @@
+# Throughput of ledger.transfer with many worker processes moving money
+# between random account pairs, and of ledger.transfer_batch. After each run
+# the total bank balance must be unchanged and every account must reconcile
+# against its transactions rows.
+#
+#   python -m benchmarks.bench_transfers [transfers_per_worker]
+
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+import db
+import ledger
+from migrations import migrate
+
+ACCOUNTS = 1000
+OPENING_BALANCE = 500.0
+
+
+def setup(path):
+    pool = db.ConnectionPool(path)
+    migrate(pool)
+    with pool.transaction() as conn:
+        conn.execute("INSERT INTO customer (cust_id, cust_name) VALUES (1, 'Transfer Test')")
+        conn.executemany("INSERT INTO accounts (account_no, cust_id, balance, account_type) VALUES (?, 1, ?, 'Savings')",
+                         [(10000 + i, OPENING_BALANCE) for i in range(ACCOUNTS)])
+    pool.close_all()
+
+
+def random_pairs(rng, count):
+    for _ in range(count):
+        from_account, to_account = rng.sample(range(10000, 10000 + ACCOUNTS), 2)
+        yield from_account, to_account, rng.randint(1, 200)
+
+
+def worker(path, seed, transfers):
+    pool = db.ConnectionPool(path, timeout=30.0)
+    rejected = 0
+    for from_account, to_account, amount in random_pairs(random.Random(seed), transfers):
+        try:
+            ledger.transfer(from_account, to_account, amount, pool=pool)
+        except ledger.PostingError:
+            rejected += 1
+    pool.close_all()
+    return rejected
+
+
+def verify(path):
+    pool = db.ConnectionPool(path)
+    with pool.connection() as conn:
+        total = conn.execute("SELECT SUM(balance) FROM accounts").fetchone()[0]
+        drift = conn.execute(f"""
+        SELECT COUNT(*) FROM (
+            SELECT a.account_no
+            FROM accounts a
+            LEFT JOIN transactions t ON t.account_no = a.account_no
+            GROUP BY a.account_no
+            HAVING ABS(a.balance - ? - COALESCE(SUM({ledger.SIGNED_AMOUNT_SQL}), 0)) > 1e-6
+        )
+        """, (OPENING_BALANCE,)).fetchone()[0]
+    pool.close_all()
+    return abs(total - ACCOUNTS * OPENING_BALANCE) < 1e-6 and drift == 0
+
+
+def report(label, count, elapsed, rejected, ok):
+    print(f"{label:<22} {count:7d} transfers  {count / elapsed:9.0f} transfers/s  "
+          f"{rejected:6d} rejected  {'invariant holds' if ok else 'BALANCE DRIFT'}")
+    return ok
+
+
+def run_workers(workers, transfers):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "transfers.db")
+        setup(path)
+
+        start = time.perf_counter()
+        with multiprocessing.Pool(workers) as procs:
+            rejected = sum(procs.starmap(worker, [(path, seed, transfers) for seed in range(workers)]))
+        elapsed = time.perf_counter() - start
+
+        return report(f"{workers} processes", workers * transfers, elapsed, rejected, verify(path))
+
+
+def run_batched(count, batch_size):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "transfers.db")
+        setup(path)
+        rows = list(random_pairs(random.Random(0), count))
+
+        pool = db.ConnectionPool(path)
+        start = time.perf_counter()
+        result = ledger.transfer_batch(rows, batch_size=batch_size, pool=pool)
+        elapsed = time.perf_counter() - start
+        pool.close_all()
+
+        return report(f"batched ({batch_size})", count, elapsed, len(result.failed), verify(path))
+
+
+def main(transfers=1000):
+    ok = all([run_workers(workers, transfers) for workers in (1, 4, 16, 32)])
+    ok = run_batched(200000, 10000) and ok
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000))
@@ -0,0 +1,132 @@
+# Runs EXPLAIN QUERY PLAN for the dashboard lookups against a freshly migrated
+# database and fails if any of them falls back to a full table scan or sorts
+# through a temporary b-tree (ranked full-text searches may sort their matches).
+# Table pages are built from pages.py as the dashboards build them, reading
+# transactions through temp.transaction_history; tests/test_query_plans.py
+# checks the same with archived months attached.
+#
+#   python -m benchmarks.check_query_plans
+
+import itertools
+import os
+import re
+import sys
+import tempfile
+
+import db
+import pages
+import partitions
+import services
+from migrations import migrate
+
+HOT_QUERIES = [
+    ("search_account by number", """
+    SELECT a.account_no, c.cust_name, a.balance, a.account_type, a.opened_date, a.account_status
+    FROM accounts a
+    JOIN customer c ON a.cust_id = c.cust_id
+    WHERE a.account_no = ?
+    """, (10001,)),
+    # Pages as LazySqlTableModel reads them, past the first
+    ("account history page", pages.page_sql(pages.ACCOUNT_HISTORY, "t.account_no = ?", keyed=True),
+     ("2024-01-01 00:00:00", 500, 10001)),
+    ("recent transactions page", pages.page_sql(pages.TRANSACTIONS, keyed=True), ("2024-01-01 00:00:00", 500)),
+    ("recent employee actions page", pages.page_sql(pages.EMPLOYEE_ACTIONS, keyed=True),
+     ("2024-01-01 00:00:00", 500)),
+    ("employee list page", pages.page_sql(pages.EMPLOYEES, keyed=True), (1000,)),
+    ("statement page", """
+    SELECT transaction_id, transaction_date, transaction_type, transaction_description,
+           transaction_status, transaction_amount
+    FROM transactions
+    WHERE account_no = ? AND (transaction_date, transaction_id) > (?, ?)
+      AND transaction_date < date(?, '+1 day')
+    ORDER BY transaction_date, transaction_id
+    LIMIT 1000
+    """, (10001, "2024-03-01 00:00:00", 500, "2024-12-31")),
+    ("loan portfolio summary", """
+    SELECT status, COUNT(*), SUM(outstanding_principal), SUM(total_paid)
+    FROM loan
+    GROUP BY status
+    """, ()),
+    ("delinquent loans", """
+    SELECT loan_id, account_no, next_due_date, outstanding_principal
+    FROM loan
+    WHERE status = 'Active' AND next_due_date < date(?, ?)
+    ORDER BY next_due_date, loan_id
+    LIMIT 100
+    """, ("2024-01-01", "-0 days")),
+    ("process_transaction lookup", """
+    SELECT balance, account_status FROM accounts WHERE account_no = ?
+    """, (10001,)),
+]
+
+# The Manager's transaction browser: every combination of its filters, on a
+# page past the first
+BROWSER_FILTERS = {
+    "dates": {"start_date": "2024-01-01", "end_date": "2024-03-31"},
+    "branch": {"branch_id": 1},
+    "type": {"transaction_type": "Withdrawal"},
+    "status": {"status": "Failed"},
+    "completed": {"status": "Completed"},
+    "amount": {"amount_band": "100 - 999.99"},
+    "large": {"amount_band": "10,000 and over"},
+}
+
+
+def browser_queries():
+    names = list(BROWSER_FILTERS)
+    for size in range(len(names) + 1):
+        for combination in itertools.combinations(names, size):
+            if {"status", "completed"} <= set(combination) or {"amount", "large"} <= set(combination):
+                continue
+            filters = {}
+            for name in combination:
+                filters.update(BROWSER_FILTERS[name])
+            where, params = services.transaction_filter(**filters)
+            yield (f"transaction browser [{', '.join(combination) or 'no filters'}]",
+                   pages.page_sql(pages.TRANSACTIONS, where, keyed=True), ("2024-02-01 00:00:00", 500) + params)
+
+
+# Full-text searches sort their matches by rank, so a temp b-tree is expected;
+# it holds only the rows the MATCH found, never a whole table.
+RANKED_QUERIES = [
+    ("search results page", pages.page_sql(pages.SEARCH_RESULTS, "customer_fts MATCH ?", keyed=True, limit=50),
+     (-1.0, 10001, '"abe"*')),
+]
+
+# "SCAN t USING INDEX ..." under ORDER BY ... LIMIT walks the index and stops
+# early; a bare "SCAN t" or a temp b-tree sort reads the whole table.
+FULL_SCAN = re.compile(r"^SCAN \w+$|USE TEMP B-TREE")
+TABLE_SCAN = re.compile(r"^SCAN \w+$")
+
+
+def query_plan(conn, sql, params=()):
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def check(pool):
+    failures = []
+    with pool.connection() as conn:
+        # The hot file alone; nothing is archived yet
+        partitions.history_window(conn)
+        queries = ([(query, FULL_SCAN) for query in HOT_QUERIES + list(browser_queries())] +
+                   [(query, TABLE_SCAN) for query in RANKED_QUERIES])
+        for (name, sql, params), pattern in queries:
+            plan = query_plan(conn, sql, params)
+            bad = [step for step in plan if pattern.search(step)]
+            print(f"{'FAIL' if bad else 'ok  '} {name}: {'; '.join(plan)}")
+            if bad:
+                failures.append(name)
+    return failures
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = db.ConnectionPool(os.path.join(tmp, "plans.db"))
+        migrate(pool)
+        failures = check(pool)
+        pool.close_all()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,325 @@
+# Seeded synthetic data for the whole schema, at any scale from ~10k to ~100M
+# rows: branches, employees, employee_actions, customers, accounts, loans and
+# transactions (plus the audit trail, search index and metrics derived from
+# them). The same rows and seed always produce the same database, so runs
+# against it can be compared across versions.
+#
+# Transactions are generated in date order over two years (or any span from
+# any start), like a ledger that has been in use: deposits, withdrawals that never overdraw, transfers
+# as two signed legs, and a few pending/failed rows. Account balances are
+# the sum of their completed transactions. Every generated employee's
+# password is PASSWORD (hashed once, since the KDF is deliberately slow).
+#
+#   python -m benchmarks.datagen PATH [--rows N] [--seed S]
+
+import argparse
+import os
+import random
+import sys
+import time
+from array import array
+from itertools import islice
+
+import audit
+import db
+import ids
+import loans
+import metrics
+import passwords
+import services
+from migrations import migrate
+
+PASSWORD = "bench-password"
+
+BATCH = 100000
+
+START = 1672531200  # 2023-01-01 00:00:00 UTC
+SPAN = 2 * 365 * 86400
+
+FIRST_NAMES = ["Abel", "Abebe", "Almaz", "Bethlehem", "Dawit", "Eleni", "Fikru", "Genet", "Hana", "Kebede",
+               "Liya", "Meron", "Nahom", "Rahel", "Samuel", "Selam", "Tigist", "Yared", "Yonas", "Zewdu"]
+LAST_NAMES = ["Alemu", "Bekele", "Desta", "Gebre", "Haile", "Kassa", "Mekonnen", "Negash", "Tadesse", "Tesfaye",
+              "Wolde", "Yilma", "Ayele", "Berhane", "Getachew", "Lemma", "Mulugeta", "Shiferaw", "Tekle", "Worku"]
+CITIES = ["Addis Ababa", "Adama", "Bahir Dar", "Dire Dawa", "Gondar", "Hawassa", "Jimma", "Mekele"]
+
+SALARIES = {"HR": (9000, 20000), "Accountant": (10000, 25000), "Manager": (20000, 45000),
+            "Finance": (12000, 30000), "Security": (5000, 9000), "Cleaner": (3000, 6000)}
+
+# Tables the generator loads in bulk; their indexes are rebuilt afterwards
+TABLES = ("branch", "employee", "employee_branch", "employee_actions", "customer", "accounts", "loan",
+          "transactions")
+
+
+def plan(rows):
+    # Row counts per table for about `rows` rows in total, most of them
+    # transactions (~20 per account), as in a real ledger
+    customers = max(100, rows // 27)
+    accounts = customers * 6 // 5
+    counts = {
+        "customer": customers,
+        "accounts": accounts,
+        "loan": accounts // 10,
+        "employee": max(10, customers // 200),
+    }
+    counts["branch"] = max(5, counts["employee"] // 40)
+    counts["employee_actions"] = counts["employee"] + counts["employee"] // 20
+    counts["transactions"] = max(0, rows - sum(counts.values()))
+    return counts
+
+
+def _timestamp(seconds, _days={}):
+    # transaction_date format; strftime only once per day, this runs per row
+    day, second = divmod(seconds, 86400)
+    date = _days.get(day)
+    if date is None:
+        _days.clear()
+        date = _days[day] = time.strftime("%Y-%m-%d", time.gmtime(seconds))
+    return f"{date} {second // 3600:02d}:{second // 60 % 60:02d}:{second % 60:02d}"
+
+
+def _date(seconds):
+    return time.strftime("%Y-%m-%d", time.gmtime(seconds))
+
+
+def _insert(conn, sql, rows):
+    # Streams rows in BATCH-sized executemany calls, committing between
+    # them so the WAL stays small however many rows there are
+    rows = iter(rows)
+    count = 0
+    while True:
+        batch = list(islice(rows, BATCH))
+        if not batch:
+            return count
+        conn.executemany(sql, batch)
+        conn.execute("COMMIT")
+        conn.execute("BEGIN")
+        count += len(batch)
+
+
+def _branches(conn, rng, count):
+    existing = conn.execute("SELECT COALESCE(MAX(branch_id), 0) FROM branch").fetchone()[0]
+    return _insert(conn, "INSERT INTO branch (branch_id, branch_name, city, address) VALUES (?, ?, ?, ?)",
+                   ((branch_id, f"Branch {branch_id}", rng.choice(CITIES), f"{rng.randint(1, 99)} Main Road")
+                    for branch_id in range(existing + 1, count + 1)))
+
+
+def _employees(conn, rng, count, branches, start, span):
+    emp_ids = ids.reserve_in(conn, "employee", count)
+    password_hash = passwords.hash_password(PASSWORD)
+    departments = dict(conn.execute("SELECT job_title, dep_id FROM salary_band ORDER BY job_title").fetchall())
+    titles = list(departments)
+    fired = set(rng.sample(emp_ids, len(emp_ids) // 20))
+    employees = []
+    for emp_id in emp_ids:
+        title = rng.choice(titles)
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        employees.append((emp_id, name, rng.choice("MF"), departments[title], rng.randint(1, branches),
+                          None if emp_id in fired else title, float(rng.randint(*SALARIES[title])),
+                          f"{rng.randint(1960, 2002)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                          900000000 + emp_id, rng.choice(CITIES), f"{rng.randint(1, 999)} Street",
+                          f"user{emp_id}@timebank.com", f"user{emp_id}", password_hash))
+
+    _insert(conn, """
+    INSERT INTO employee (emp_id, emp_name, gender, dep_id, branch_id, job_title, salary, dbo, phone, city, address, email, username, passwords)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, employees)
+    _insert(conn, "INSERT INTO employee_branch (emp_id, branch_id) VALUES (?, ?)",
+            ((row[0], row[4]) for row in employees))
+
+    # Hired at random times, some fired later; in date order
+    actions = []
+    for row in employees:
+        hired = start + rng.randrange(span)
+        actions.append((hired, 1002, "Hire", f"Hired {row[1]} as {row[5] or rng.choice(titles)}"))
+        if row[0] in fired:
+            actions.append((hired + rng.randrange(start + span - hired), 1002, "Fire",
+                            f"Fired {row[1]} (ID: {row[0]})"))
+    actions.sort()
+    _insert(conn, "INSERT INTO employee_actions (emp_id, action_type, action_date, details) VALUES (?, ?, ?, ?)",
+            ((emp_id, action, _timestamp(at), details) for at, emp_id, action, details in actions))
+    return len(employees), len(actions)
+
+
+def _customers(conn, rng, count):
+    cust_ids = ids.reserve_in(conn, "customer", count)
+
+    def rows():
+        for cust_id in cust_ids:
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            yield (cust_id, f"{first} {last}",
+                   f"{rng.randint(1950, 2005)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                   rng.randint(910000000, 999999999), rng.choice(CITIES), f"{rng.randint(1, 999)} Street",
+                   f"{first.lower()}.{last.lower()}{cust_id}@example.com")
+
+    _insert(conn, """
+    INSERT INTO customer (cust_id, cust_name, dob, phone, city, address, email)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, rows())
+    return cust_ids
+
+
+def _transactions(conn, rng, count, account_nos, start, span):
+    # Returns the resulting balance of every account (same order)
+    balances = array("d", bytes(8 * len(account_nos)))
+    accounts = len(account_nos)
+    # random() rather than randrange(): this loop runs once per row
+    draw = rng.random
+
+    def rows():
+        produced = 0
+        while produced < count:
+            at = _timestamp(start + produced * span // count)
+            index = int(draw() * accounts)
+            account_no = account_nos[index]
+            status = "Completed"
+            roll = draw()
+            if roll < 0.01:
+                status = "Pending"
+            elif roll < 0.02:
+                status = "Failed"
+
+            kind = draw()
+            amount = float(int(draw() * 2000) + 1)
+            if kind < 0.1 and produced + 2 <= count:
+                target = int(draw() * accounts)
+                if target != index and balances[index] >= amount:
+                    if status == "Completed":
+                        balances[index] -= amount
+                        balances[target] += amount
+                    yield account_no, "Transfer", -amount, at, f"Transfer to {account_nos[target]}", status
+                    yield account_nos[target], "Transfer", amount, at, f"Transfer from {account_no}", status
+                    produced += 2
+                    continue
+            if kind < 0.45 and balances[index] >= amount:
+                if status == "Completed":
+                    balances[index] -= amount
+                yield account_no, "Withdrawal", amount, at, "Cash withdrawal", status
+            else:
+                if status == "Completed":
+                    balances[index] += amount
+                yield account_no, "Deposit", amount, at, "Cash deposit", status
+            produced += 1
+
+    _insert(conn, """
+    INSERT INTO transactions (account_no, transaction_type, transaction_amount, transaction_date, transaction_description, transaction_status)
+    VALUES (?, ?, ?, ?, ?, ?)
+    """, rows())
+    return balances
+
+
+def _accounts(conn, rng, cust_ids, count):
+    # Every customer has an account, some a second one
+    owners = list(cust_ids) + [rng.choice(cust_ids) for _ in range(count - len(cust_ids))]
+    account_nos = [ids.with_check_digit(n) for n in ids.reserve_in(conn, "account", len(owners))]
+    return owners, account_nos
+
+
+def _loans(conn, rng, count, owners, account_nos, start, span):
+    def rows():
+        for index in sorted(rng.sample(range(len(account_nos)), count)):
+            amount = float(rng.randrange(10000, 500000, 1000))
+            rate = rng.choice((0.08, 0.1, 0.12, 0.15))
+            term = rng.choice((12, 24, 36, 60))
+            started = _date(start + rng.randrange(span))
+            yield (owners[index], account_nos[index], amount, rate, started, started, f"+{term} months", term,
+                   loans.monthly_payment(amount, rate, term), amount, started)
+
+    return _insert(conn, """
+    INSERT INTO loan (cust_id, account_no, loan_amount, interest_rate, start_date, end_date, status,
+                      term_months, monthly_payment, outstanding_principal, next_due_date)
+    VALUES (?, ?, ?, ?, ?, date(?, ?), 'Active', ?, ?, ?, date(?, '+1 months'))
+    """, rows())
+
+
+def generate(path, rows=100000, seed=0, on_progress=None, start=START, span=SPAN):
+    # Creates a new database at path; returns {table: rows generated}.
+    # on_progress(step) is called as each table starts. History runs from
+    # start (Unix seconds) over span seconds.
+    if os.path.exists(path):
+        raise FileExistsError(path)
+    progress = on_progress or (lambda step: None)
+    counts = plan(rows)
+    rng = random.Random(seed)
+
+    pool = db.ConnectionPool(path, max_idle=1)
+    try:
+        migrate(pool)
+        with pool.connection() as conn:
+            # A throwaway file being filled from scratch: no need to sync
+            conn.execute("PRAGMA synchronous = OFF")
+            placeholders = ", ".join("?" * len(TABLES))
+            indexes = conn.execute(f"""
+            SELECT name, sql FROM sqlite_master
+            WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ({placeholders})
+            """, TABLES).fetchall()
+            triggers = conn.execute("""
+            SELECT name, sql FROM sqlite_master WHERE type = 'trigger'
+            AND tbl_name IN ('customer', 'accounts', 'employee')
+            """).fetchall()
+
+            conn.execute("BEGIN")
+            for name, _ in indexes:
+                conn.execute(f"DROP INDEX {name}")
+            for name, _ in triggers:
+                conn.execute(f"DROP TRIGGER {name}")
+
+            progress("branches")
+            _branches(conn, rng, counts["branch"])
+            progress("employees")
+            counts["employee"], counts["employee_actions"] = _employees(conn, rng, counts["employee"],
+                                                                        counts["branch"], start, span)
+            progress("customers")
+            cust_ids = _customers(conn, rng, counts["customer"])
+            owners, account_nos = _accounts(conn, rng, cust_ids, counts["accounts"])
+            progress("transactions")
+            balances = _transactions(conn, rng, counts["transactions"], account_nos, start, span)
+            progress("accounts")
+            _insert(conn, """
+            INSERT INTO accounts (account_no, cust_id, balance, opened_date, account_type, interest_rate, branch_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, ((account_no, owner, round(balance, 2), _timestamp(start - rng.randrange(5 * 365 * 86400)),
+                   rng.choice(services.ACCOUNT_TYPES), rng.choice((0.0, 0.02, 0.05)),
+                   rng.randint(1, counts["branch"]))
+                  for account_no, owner, balance in zip(account_nos, owners, balances)))
+            progress("loans")
+            _loans(conn, rng, counts["loan"], owners, account_nos, start, span)
+
+            progress("indexes")
+            for _, sql in indexes:
+                conn.execute(sql)
+            for _, sql in triggers:
+                conn.execute(sql)
+            conn.execute("INSERT INTO customer_fts (customer_fts) VALUES ('rebuild')")
+            metrics.rebuild(conn)
+            conn.execute("COMMIT")
+            conn.execute("ANALYZE")
+
+        progress("audit log")
+        audit.copy_pending(pool, batch_size=1000000)
+    finally:
+        audit.get_writer(pool).close()
+        pool.close_all()
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic time_bank database.")
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=int, default=100000, help="about this many rows in total")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    counts = generate(args.path, args.rows, args.seed,
+                      on_progress=lambda step: print(f"{step}...", file=sys.stderr, flush=True))
+    elapsed = time.perf_counter() - start
+    for table, count in counts.items():
+        print(f"{table}: {count:,}")
+    total = sum(counts.values())
+    print(f"{total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s), "
+          f"{os.path.getsize(args.path) / 1e6:.0f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+# The hot paths in one run, against a database from benchmarks.datagen, with
+# the results written as JSON so runs of different versions can be compared:
+#
+#   python -m benchmarks.suite [--rows N] [--seed S] [--db CACHE] [--out results.json]
+#   python -m benchmarks.suite --compare baseline.json [--threshold 0.1] ...
+#
+# --db keeps the generated database for later runs (generated there if it
+# does not exist yet). Every run works on a fresh copy of it, so postings
+# from one run never change what the next one measures. With --compare the
+# p50 of each benchmark is checked against the baseline file and the exit
+# status is 1 if any got slower by more than the threshold.
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import closing
+
+import audit
+import db
+import ledger
+import services
+from benchmarks import datagen
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PAGE_SIZE = 256
+
+# The Manager dashboard's recent-transactions model: newest first, keyset pages
+RECENT_TRANSACTIONS_SQL = """
+SELECT t.transaction_date, t.account_no, t.transaction_type, t.transaction_amount,
+       t.transaction_description, t.transaction_status, t.transaction_date, t.transaction_id
+FROM transactions t
+{where}
+ORDER BY t.transaction_date DESC, t.transaction_id DESC
+LIMIT {limit}
+"""
+
+RECENT_ACTIONS_SQL = f"""
+SELECT a.action_date, a.emp_id, a.action_type, e.emp_name, a.details, a.action_date, a.action_id
+FROM employee_actions a JOIN employee e ON a.emp_id = e.emp_id
+ORDER BY a.action_date DESC, a.action_id DESC
+LIMIT {PAGE_SIZE}
+"""
+
+
+def measure(fn, count, warmup=3):
+    # Latencies in seconds of count calls to fn(i), after warmup calls
+    for i in range(warmup):
+        fn(i)
+    latencies = []
+    for i in range(count):
+        start = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def summarize(latencies):
+    latencies = sorted(latencies)
+    total = sum(latencies)
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    return {"n": len(latencies), "mean_ms": total / len(latencies) * 1000, "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95), "p99_ms": percentile(0.99), "max_ms": latencies[-1] * 1000,
+            "ops_per_s": len(latencies) / total if total else None}
+
+
+def _sample(conn, sql, count, rng):
+    rows = [row[0] for row in conn.execute(sql)]
+    return [rng.choice(rows) for _ in range(count)]
+
+
+def run_benchmarks(pool, seed=0, only=None):
+    rng = random.Random(seed)
+    with pool.connection() as conn:
+        username = conn.execute("SELECT username FROM employee WHERE username LIKE 'user%' "
+                                "AND job_title IS NOT NULL ORDER BY emp_id LIMIT 1").fetchone()[0]
+        account_nos = _sample(conn, "SELECT account_no FROM accounts", 2000, rng)
+        rich = _sample(conn, "SELECT account_no FROM accounts WHERE balance > 1000", 2000, rng)
+    terms = [rng.choice((rng.choice(datagen.FIRST_NAMES), rng.choice(datagen.LAST_NAMES)[:3],
+                         rng.choice(datagen.CITIES).split()[0], str(rng.randint(91, 99))))
+             for _ in range(200)]
+
+    def recent_transactions(i):
+        with pool.connection() as conn:
+            rows = conn.execute(RECENT_TRANSACTIONS_SQL.format(where="", limit=PAGE_SIZE)).fetchall()
+            # Scrolling: the next pages continue from the last key
+            for _ in range(3):
+                rows = conn.execute(RECENT_TRANSACTIONS_SQL.format(
+                    where="WHERE (t.transaction_date, t.transaction_id) < (?, ?)", limit=PAGE_SIZE),
+                    rows[-1][-2:]).fetchall()
+
+    def recent_actions(i):
+        with pool.connection() as conn:
+            conn.execute(RECENT_ACTIONS_SQL).fetchall()
+
+    benchmarks = {
+        "login": lambda: measure(lambda i: services.authenticate(username, datagen.PASSWORD), 10, warmup=1),
+        "account_search": lambda: measure(lambda i: services.search_accounts(terms[i % len(terms)]), 200),
+        "account_lookup": lambda: measure(lambda i: services.find_account(str(account_nos[i])), 1000),
+        "posting": lambda: measure(lambda i: ledger.post(account_nos[i], "Deposit", 10.0, pool=pool), 1000),
+        "withdrawal": lambda: measure(lambda i: ledger.post(rich[i], "Withdrawal", 1.0, pool=pool), 1000),
+        "transfer": lambda: measure(
+            lambda i: ledger.transfer(rich[i], account_nos[i], 1.0, pool=pool) if rich[i] != account_nos[i] else None,
+            500),
+        "metrics_refresh": lambda: measure(lambda i: services.load_metrics(), 1000),
+        "recent_transactions": lambda: measure(recent_transactions, 100),
+        "recent_actions": lambda: measure(recent_actions, 200),
+    }
+
+    results = {}
+    for name, run in benchmarks.items():
+        if only and name not in only:
+            continue
+        results[name] = summarize(run())
+        print(f"{name:20s} p50 {results[name]['p50_ms']:8.3f} ms  p99 {results[name]['p99_ms']:8.3f} ms",
+              file=sys.stderr)
+    return results
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, results, threshold):
+    # [(name, old p50, new p50, ratio)] of benchmarks slower than threshold
+    regressions = []
+    for name, result in results.items():
+        old = baseline.get("results", {}).get(name)
+        if old is None:
+            continue
+        ratio = result["p50_ms"] / old["p50_ms"] if old["p50_ms"] else float("inf")
+        flag = "REGRESSION" if ratio > 1 + threshold else ""
+        print(f"{name:20s} {old['p50_ms']:8.3f} -> {result['p50_ms']:8.3f} ms  {ratio:6.2f}x  {flag}")
+        if flag:
+            regressions.append((name, old["p50_ms"], result["p50_ms"], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the benchmark suite and write the results as JSON.")
+    parser.add_argument("--rows", type=int, default=1000000, help="size of the generated database")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db", help="generated database to reuse (created if missing)")
+    parser.add_argument("--out", help="write the JSON results here (default: stdout)")
+    parser.add_argument("--only", nargs="+", help="run only these benchmarks")
+    parser.add_argument("--compare", help="baseline JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed p50 slowdown (default 0.1 = 10%%)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = args.db or os.path.join(tmp, "generated.db")
+        if not os.path.exists(source):
+            print(f"Generating {args.rows:,} rows (seed {args.seed})...", file=sys.stderr)
+            datagen.generate(source, args.rows, args.seed)
+
+        path = os.path.join(tmp, "bench.db")
+        with closing(sqlite3.connect(source)) as original, closing(sqlite3.connect(path)) as copy:
+            original.backup(copy)
+            counts = {table: copy.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                      for table in datagen.plan(0)}
+
+        pool = db.configure(path)
+        try:
+            results = run_benchmarks(pool, args.seed, args.only)
+        finally:
+            audit.get_writer(pool).close()
+            pool.close_all()
+
+    report = {
+        "meta": {
+            "revision": _git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "rows": args.rows if not args.db else sum(counts.values()),
+            "seed": args.seed,
+            "tables": counts,
+        },
+        "results": results,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(baseline, results, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
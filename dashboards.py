@@ -0,0 +1,1141 @@
+# The HR, Accountant and Manager dashboards. Imported by
+# login.LoginWindow.open_dashboard on the first login, not at startup.
+
+from datetime import datetime
+from functools import partial
+from html import escape
+from PyQt5.QtWidgets import (QMainWindow, QWidget, QLabel, QLineEdit, QPushButton,
+                             QVBoxLayout, QHBoxLayout, QMessageBox, QTableView,
+                             QComboBox, QDateEdit, QFormLayout, QTabWidget, QHeaderView,
+                             QGroupBox, QTextEdit, QFileDialog)
+from PyQt5.QtCore import Qt, QDate
+from PyQt5.QtGui import QPixmap, QIcon
+
+import ledger
+import pages
+import partitions
+import services
+import sqlstats
+import statements
+from login import LoginWindow, SQL_STATS_FILE
+from models import LazySqlTableModel, format_amount
+from workers import QueryExecutor
+
+# Statements listed on the Diagnostics tab, most total time first
+DIAGNOSTICS_STATEMENTS = 15
+
+
+class DashboardTemplate(QMainWindow):
+    def __init__(self, emp_id, emp_name, title):
+        super().__init__()
+        self.emp_id = emp_id
+        self.emp_name = emp_name
+        self.setWindowTitle(f"Time International Bank - {title}")
+        self.setMinimumSize(1000, 700)
+
+        # Database work runs off the GUI thread, results come back as signals
+        self.queries = QueryExecutor(parent=self)
+
+        # Set window icon
+        self.setWindowIcon(QIcon(":bank.png"))
+
+        # Central widget
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+
+        # Main layout
+        main_layout = QVBoxLayout()
+        central_widget.setLayout(main_layout)
+
+        # Header
+        header = QWidget()
+        header.setStyleSheet("background-color: #2c3e50; padding: 15px;")
+        header_layout = QHBoxLayout()
+        header.setLayout(header_layout)
+
+        # Bank logo and name
+        logo_label = QLabel()
+        logo_label.setPixmap(QPixmap(":bank.png").scaled(40, 40, Qt.KeepAspectRatio))
+        header_layout.addWidget(logo_label)
+
+        bank_name = QLabel("Time International Bank")
+        bank_name.setStyleSheet("font-size: 20px; font-weight: bold; color: white;")
+        header_layout.addWidget(bank_name)
+
+        header_layout.addStretch()
+
+        # User info
+        user_info = QLabel(f"{self.emp_name} (ID: {self.emp_id})")
+        user_info.setStyleSheet("font-size: 14px; color: white;")
+        header_layout.addWidget(user_info)
+
+        # Logout button
+        logout_button = QPushButton("Logout")
+        logout_button.setStyleSheet("""
+            QPushButton {
+                background-color: #e74c3c;
+                color: white;
+                border: none;
+                padding: 5px 10px;
+                border-radius: 3px;
+            }
+            QPushButton:hover {
+                background-color: #c0392b;
+            }
+        """)
+        logout_button.clicked.connect(self.logout)
+        header_layout.addWidget(logout_button)
+
+        main_layout.addWidget(header)
+
+        # Content area
+        self.content_area = QWidget()
+        main_layout.addWidget(self.content_area)
+
+        # Footer
+        footer = QLabel("© 2023 Time International Bank. All rights reserved.")
+        footer.setAlignment(Qt.AlignCenter)
+        footer.setStyleSheet("font-size: 10px; color: #7f8c8d; padding: 10px;")
+        main_layout.addWidget(footer)
+
+    def logout(self):
+        self.queries.cancel_all()
+        self.login_window = LoginWindow()
+        self.login_window.show()
+        self.close()
+
+    def populate_branch_combo(self, combo, any_label=None):
+        # Fills combo with the branches (item data: branch_id), after an item
+        # with no branch (data None) when any_label is given
+        def show_branches(branches):
+            combo.clear()
+            if any_label is not None:
+                combo.addItem(any_label, None)
+            for branch_id, branch_name in branches:
+                combo.addItem(branch_name, branch_id)
+
+        self.queries.submit("branches", services.load_branches, on_result=show_branches,
+                            on_error=lambda e: QMessageBox.warning(self, "Error", f"Failed to load branches: {str(e)}"))
+
+    def add_tabs(self, layout, tabs):
+        # tabs: [(title, build)]. Each page starts empty and build(page) fills it
+        # (and starts its queries) the first time the tab is shown, so only the
+        # first tab is built before the dashboard first paints.
+        tab_widget = QTabWidget()
+        pending = {}
+
+        def build(index):
+            page = tab_widget.widget(index)
+            build_page = pending.pop(page, None)
+            if build_page is not None:
+                build_page(page)
+
+        for title, build_page in tabs:
+            page = QWidget()
+            pending[page] = build_page
+            tab_widget.addTab(page, title)
+
+        tab_widget.currentChanged.connect(build)
+        build(tab_widget.currentIndex())
+        layout.addWidget(tab_widget)
+        return tab_widget
+
+
+class HRDashboard(DashboardTemplate):
+    def __init__(self, emp_id, emp_name):
+        super().__init__(emp_id, emp_name, "HR Dashboard")
+
+        # Content layout
+        content_layout = QVBoxLayout()
+        self.content_area.setLayout(content_layout)
+
+        # Built with the Employee List tab
+        self.employee_model = None
+
+        # Filled with the Hire Employee tab: {job_title: (dep_id, salary)}, {dep_id: dep_name}
+        self.salary_bands = {}
+        self.departments = {}
+
+        # Each tab is built the first time it is shown
+        self.add_tabs(content_layout, [("Hire Employee", self.build_hire_tab),
+                                       ("Fire Employee", self.build_fire_tab),
+                                       ("Employee List", self.build_list_tab)])
+
+    def build_hire_tab(self, hire_tab):
+        hire_layout = QVBoxLayout()
+        hire_tab.setLayout(hire_layout)
+
+        # Hire form
+        hire_form = QGroupBox("Hire New Employee")
+        hire_form_layout = QFormLayout()
+        hire_form.setLayout(hire_form_layout)
+
+        self.emp_name_input = QLineEdit()
+        self.emp_name_input.setPlaceholderText("Full Name")
+        hire_form_layout.addRow("Full Name:", self.emp_name_input)
+
+        self.gender_combo = QComboBox()
+        self.gender_combo.addItems(list(services.GENDERS))
+        hire_form_layout.addRow("Gender:", self.gender_combo)
+
+        self.branch_combo = QComboBox()
+        self.populate_branch_combo(self.branch_combo)
+        hire_form_layout.addRow("Branch:", self.branch_combo)
+
+        self.job_title_combo = QComboBox()
+        self.job_title_combo.currentTextChanged.connect(self.update_salary)
+        hire_form_layout.addRow("Job Title:", self.job_title_combo)
+
+        self.department_input = QLineEdit()
+        self.department_input.setReadOnly(True)
+        hire_form_layout.addRow("Department:", self.department_input)
+
+        self.salary_input = QLineEdit()
+        self.salary_input.setReadOnly(True)
+        hire_form_layout.addRow("Salary:", self.salary_input)
+        self.populate_job_titles()
+
+        self.dob_input = QDateEdit()
+        self.dob_input.setCalendarPopup(True)
+        self.dob_input.setDate(QDate.currentDate().addYears(-20))
+        hire_form_layout.addRow("Date of Birth:", self.dob_input)
+
+        self.phone_input = QLineEdit()
+        self.phone_input.setPlaceholderText("Phone Number")
+        hire_form_layout.addRow("Phone:", self.phone_input)
+
+        self.city_input = QLineEdit()
+        self.city_input.setPlaceholderText("City")
+        hire_form_layout.addRow("City:", self.city_input)
+
+        self.address_input = QLineEdit()
+        self.address_input.setPlaceholderText("Address")
+        hire_form_layout.addRow("Address:", self.address_input)
+
+        self.email_input = QLineEdit()
+        self.email_input.setPlaceholderText("Email")
+        hire_form_layout.addRow("Email:", self.email_input)
+
+        hire_button = QPushButton("Hire Employee")
+        hire_button.setStyleSheet("""
+            QPushButton {
+                background-color: #27ae60;
+                color: white;
+                border: none;
+                padding: 10px;
+                border-radius: 5px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background-color: #219653;
+            }
+        """)
+        hire_button.clicked.connect(self.hire_employee)
+        hire_form_layout.addRow(hire_button)
+
+        hire_layout.addWidget(hire_form)
+
+    def build_fire_tab(self, fire_tab):
+        fire_layout = QVBoxLayout()
+        fire_tab.setLayout(fire_layout)
+
+        # Fire form
+        fire_form = QGroupBox("Fire Employee")
+        fire_form_layout = QFormLayout()
+        fire_form.setLayout(fire_form_layout)
+
+        self.emp_id_input = QLineEdit()
+        self.emp_id_input.setPlaceholderText("Employee ID")
+        fire_form_layout.addRow("Employee ID:", self.emp_id_input)
+
+        fire_button = QPushButton("Fire Employee")
+        fire_button.setStyleSheet("""
+            QPushButton {
+                background-color: #e74c3c;
+                color: white;
+                border: none;
+                padding: 10px;
+                border-radius: 5px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background-color: #c0392b;
+            }
+        """)
+        fire_button.clicked.connect(self.fire_employee)
+        fire_form_layout.addRow(fire_button)
+
+        fire_layout.addWidget(fire_form)
+
+    def build_list_tab(self, list_tab):
+        list_layout = QVBoxLayout()
+        list_tab.setLayout(list_layout)
+
+        self.employee_model = LazySqlTableModel(
+            ["ID", "Name", "Job Title", "Salary", "Branch", "Phone", "Email", "Status"], pages.EMPLOYEES,
+            formatters={3: format_amount}, executor=self.queries, parent=self)
+        self.employee_model.error.connect(
+            lambda error: QMessageBox.warning(self, "Error", f"Failed to load employees: {error}"))
+
+        self.employee_table = QTableView()
+        self.employee_table.setModel(self.employee_model)
+        self.employee_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.employee_table.setSelectionBehavior(QTableView.SelectRows)
+        self.employee_table.setEditTriggers(QTableView.NoEditTriggers)
+
+        list_layout.addWidget(self.employee_table)
+
+        refresh_button = QPushButton("Refresh List")
+        refresh_button.setStyleSheet("""
+            QPushButton {
+                background-color: #3498db;
+                color: white;
+                border: none;
+                padding: 8px;
+                border-radius: 5px;
+            }
+            QPushButton:hover {
+                background-color: #2980b9;
+            }
+        """)
+        refresh_button.clicked.connect(self.populate_employee_table)
+        list_layout.addWidget(refresh_button)
+
+    def populate_job_titles(self):
+        # Job titles with their department and salary come from the salary
+        # bands (reference data, served from memory)
+        def show_job_titles(result):
+            self.salary_bands, self.departments = result
+            self.job_title_combo.clear()
+            self.job_title_combo.addItems(list(self.salary_bands))
+
+        self.queries.submit("salary_bands", lambda: (services.load_salary_bands(), services.load_departments()),
+                            on_result=show_job_titles,
+                            on_error=lambda e: QMessageBox.warning(self, "Error",
+                                                                   f"Failed to load salary bands: {str(e)}"))
+
+    def update_salary(self, job_title):
+        dep_id, salary = self.salary_bands.get(job_title, (None, None))
+        self.department_input.setText(self.departments.get(dep_id, ""))
+        self.salary_input.setText(f"{salary:,.2f}" if salary is not None else "")
+
+    def hire_employee(self):
+        # Get all input values
+        emp_name = self.emp_name_input.text()
+        gender = self.gender_combo.currentText()
+        branch_id = self.branch_combo.currentData()
+        job_title = self.job_title_combo.currentText()
+        salary = self.salary_bands.get(job_title, (None, None))[1]
+        dob = self.dob_input.date().toString("yyyy-MM-dd")
+        phone = self.phone_input.text()
+        city = self.city_input.text()
+        address = self.address_input.text()
+        email = self.email_input.text()
+
+        if not emp_name or not phone or not city or not address or not email or salary is None:
+            QMessageBox.warning(self, "Error", "Please fill all required fields")
+            return
+
+        self.queries.submit(None, services.hire_employee,
+                            (self.emp_id, emp_name, gender, branch_id, job_title, salary, dob, phone, city, address,
+                             email),
+                            on_result=self.employee_hired,
+                            on_error=lambda e: QMessageBox.warning(self, "Error", f"Failed to hire employee: {str(e)}"))
+
+    def employee_hired(self, result):
+        emp_id, username, password = result
+
+        # Show success message with credentials
+        QMessageBox.information(
+            self, "Employee Hired",
+            f"Employee hired successfully!\n\nID: {emp_id}\nUsername: {username}\nPassword: {password}\n\nPlease provide these credentials to the employee."
+        )
+
+        # Clear form
+        self.emp_name_input.clear()
+        self.phone_input.clear()
+        self.city_input.clear()
+        self.address_input.clear()
+        self.email_input.clear()
+
+        # Refresh employee table
+        self.populate_employee_table()
+
+    def fire_employee(self):
+        emp_id = self.emp_id_input.text()
+
+        if not emp_id:
+            QMessageBox.warning(self, "Error", "Please enter an employee ID")
+            return
+
+        try:
+            emp_id = int(emp_id)
+        except ValueError:
+            QMessageBox.warning(self, "Error", "Employee ID must be a number")
+            return
+
+        # Confirm firing
+        reply = QMessageBox.question(
+            self, "Confirm Fire",
+            f"Are you sure you want to fire employee ID {emp_id}?",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+        )
+
+        if reply == QMessageBox.No:
+            return
+
+        self.queries.submit(None, services.fire_employee, (self.emp_id, emp_id),
+                            on_result=lambda emp_name: self.employee_fired(emp_id, emp_name),
+                            on_error=lambda e: QMessageBox.warning(self, "Error", f"Failed to fire employee: {str(e)}"))
+
+    def employee_fired(self, emp_id, emp_name):
+        if not emp_name:
+            QMessageBox.warning(self, "Error", "Employee not found")
+            return
+
+        QMessageBox.information(self, "Success", f"Employee {emp_name} (ID: {emp_id}) has been fired")
+
+        # Clear input and refresh table
+        self.emp_id_input.clear()
+        self.populate_employee_table()
+
+    def populate_employee_table(self):
+        # Rows are paged in by the view as it scrolls; nothing to do before the
+        # Employee List tab has been shown
+        if self.employee_model is not None:
+            self.employee_model.refresh()
+
+
+class AccountantDashboard(DashboardTemplate):
+    def __init__(self, emp_id, emp_name):
+        super().__init__(emp_id, emp_name, "Accountant Dashboard")
+
+        # Content layout
+        content_layout = QVBoxLayout()
+        self.content_area.setLayout(content_layout)
+
+        # Each tab is built the first time it is shown
+        self.add_tabs(content_layout, [("Create Account", self.build_create_account_tab),
+                                       ("Transactions", self.build_transaction_tab),
+                                       ("Account Info", self.build_info_tab)])
+
+    def build_create_account_tab(self, create_account_tab):
+        create_account_layout = QVBoxLayout()
+        create_account_tab.setLayout(create_account_layout)
+
+        # Create account form
+        create_account_form = QGroupBox("Create New Account")
+        form_layout = QFormLayout()
+        create_account_form.setLayout(form_layout)
+
+        self.cust_name_input = QLineEdit()
+        self.cust_name_input.setPlaceholderText("Full Name")
+        form_layout.addRow("Customer Name:", self.cust_name_input)
+
+        self.cust_dob_input = QDateEdit()
+        self.cust_dob_input.setCalendarPopup(True)
+        self.cust_dob_input.setDate(QDate.currentDate().addYears(-20))
+        form_layout.addRow("Date of Birth:", self.cust_dob_input)
+
+        self.cust_phone_input = QLineEdit()
+        self.cust_phone_input.setPlaceholderText("Phone Number")
+        form_layout.addRow("Phone:", self.cust_phone_input)
+
+        self.cust_city_input = QLineEdit()
+        self.cust_city_input.setPlaceholderText("City")
+        form_layout.addRow("City:", self.cust_city_input)
+
+        self.cust_address_input = QLineEdit()
+        self.cust_address_input.setPlaceholderText("Address")
+        form_layout.addRow("Address:", self.cust_address_input)
+
+        self.cust_email_input = QLineEdit()
+        self.cust_email_input.setPlaceholderText("Email")
+        form_layout.addRow("Email:", self.cust_email_input)
+
+        self.account_type_combo = QComboBox()
+        self.account_type_combo.addItems(list(services.ACCOUNT_TYPES))
+        form_layout.addRow("Account Type:", self.account_type_combo)
+
+        self.account_branch_combo = QComboBox()
+        self.populate_branch_combo(self.account_branch_combo)
+        form_layout.addRow("Branch:", self.account_branch_combo)
+
+        self.initial_deposit_input = QLineEdit()
+        self.initial_deposit_input.setPlaceholderText("0.00")
+        form_layout.addRow("Initial Deposit:", self.initial_deposit_input)
+
+        create_button = QPushButton("Create Account")
+        create_button.setStyleSheet("""
+            QPushButton {
+                background-color: #27ae60;
+                color: white;
+                border: none;
+                padding: 10px;
+                border-radius: 5px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background-color: #219653;
+            }
+        """)
+        create_button.clicked.connect(self.create_account)
+        form_layout.addRow(create_button)
+
+        create_account_layout.addWidget(create_account_form)
+
+    def build_transaction_tab(self, transaction_tab):
+        transaction_layout = QVBoxLayout()
+        transaction_tab.setLayout(transaction_layout)
+
+        # Transaction form
+        transaction_form = QGroupBox("Account Transactions")
+        transaction_form_layout = QFormLayout()
+        transaction_form.setLayout(transaction_form_layout)
+
+        self.account_no_input = QLineEdit()
+        self.account_no_input.setPlaceholderText("Account Number")
+        transaction_form_layout.addRow("Account Number:", self.account_no_input)
+
+        self.transaction_type_combo = QComboBox()
+        self.transaction_type_combo.addItems(["Deposit", "Withdrawal", "Transfer"])
+        self.transaction_type_combo.currentTextChanged.connect(self.update_transfer_fields)
+        transaction_form_layout.addRow("Transaction Type:", self.transaction_type_combo)
+
+        self.to_account_input = QLineEdit()
+        self.to_account_input.setPlaceholderText("Destination Account Number")
+        self.to_account_input.setEnabled(False)
+        transaction_form_layout.addRow("To Account:", self.to_account_input)
+
+        self.amount_input = QLineEdit()
+        self.amount_input.setPlaceholderText("Amount")
+        transaction_form_layout.addRow("Amount:", self.amount_input)
+
+        self.description_input = QLineEdit()
+        self.description_input.setPlaceholderText("Description (optional)")
+        transaction_form_layout.addRow("Description:", self.description_input)
+
+        transaction_button = QPushButton("Process Transaction")
+        transaction_button.setStyleSheet("""
+            QPushButton {
+                background-color: #3498db;
+                color: white;
+                border: none;
+                padding: 10px;
+                border-radius: 5px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background-color: #2980b9;
+            }
+        """)
+        transaction_button.clicked.connect(self.process_transaction)
+        transaction_form_layout.addRow(transaction_button)
+
+        transaction_layout.addWidget(transaction_form)
+
+    def build_info_tab(self, info_tab):
+        info_layout = QVBoxLayout()
+        info_tab.setLayout(info_layout)
+
+        # Account info form
+        info_form = QGroupBox("Account Information")
+        info_form_layout = QFormLayout()
+        info_form.setLayout(info_form_layout)
+
+        self.search_account_input = QLineEdit()
+        self.search_account_input.setPlaceholderText("Account Number or Customer Name")
+        info_form_layout.addRow("Search:", self.search_account_input)
+
+        search_button = QPushButton("Search")
+        search_button.setStyleSheet("""
+            QPushButton {
+                background-color: #3498db;
+                color: white;
+                border: none;
+                padding: 8px;
+                border-radius: 5px;
+            }
+            QPushButton:hover {
+                background-color: #2980b9;
+            }
+        """)
+        search_button.clicked.connect(self.search_account)
+        self.search_account_input.returnPressed.connect(self.search_account)
+        info_form_layout.addRow(search_button)
+
+        # Ranked full-text matches, best first, paged in as the table scrolls
+        self.search_results_model = LazySqlTableModel(
+            ["Account No", "Customer Name", "Phone", "City", "Type", "Balance", "Status"], pages.SEARCH_RESULTS,
+            where="0", formatters={5: format_amount}, page_size=50, executor=self.queries, parent=self)
+        self.search_results_model.error.connect(
+            lambda error: QMessageBox.warning(self, "Error", f"Search failed: {error}"))
+        self.search_results_model.loaded.connect(self.search_results_loaded)
+        self.search_pending = False
+
+        self.search_results_table = QTableView()
+        self.search_results_table.setModel(self.search_results_model)
+        self.search_results_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.search_results_table.setEditTriggers(QTableView.NoEditTriggers)
+        self.search_results_table.setSelectionBehavior(QTableView.SelectRows)
+        self.search_results_table.clicked.connect(self.select_search_result)
+        self.search_results_table.hide()
+
+        info_form_layout.addRow(self.search_results_table)
+
+        self.account_info_text = QTextEdit()
+        self.account_info_text.setReadOnly(True)
+        info_form_layout.addRow(self.account_info_text)
+
+        # Empty until an account is found by search_account. Reads through the
+        # archived months too, a window of them at a time as the table scrolls.
+        self.transaction_history_model = LazySqlTableModel(
+            ["Date", "Type", "Amount", "Description", "Status"], pages.ACCOUNT_HISTORY, where="0",
+            formatters={2: format_amount}, prepare=partitions.history_window, executor=self.queries, parent=self)
+        self.transaction_history_model.error.connect(
+            lambda error: QMessageBox.warning(self, "Error", f"Failed to load transactions: {error}"))
+
+        self.transaction_history_table = QTableView()
+        self.transaction_history_table.setModel(self.transaction_history_model)
+        self.transaction_history_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.transaction_history_table.setEditTriggers(QTableView.NoEditTriggers)
+
+        info_form_layout.addRow(self.transaction_history_table)
+
+        # Statement export for the account shown above
+        self.current_account_no = None
+
+        statement_layout = QHBoxLayout()
+        self.statement_from_input = QDateEdit()
+        self.statement_from_input.setCalendarPopup(True)
+        self.statement_from_input.setDate(QDate.currentDate().addYears(-1))
+        statement_layout.addWidget(QLabel("From:"))
+        statement_layout.addWidget(self.statement_from_input)
+
+        self.statement_to_input = QDateEdit()
+        self.statement_to_input.setCalendarPopup(True)
+        self.statement_to_input.setDate(QDate.currentDate())
+        statement_layout.addWidget(QLabel("To:"))
+        statement_layout.addWidget(self.statement_to_input)
+
+        self.statement_button = QPushButton("Export Statement")
+        self.statement_button.setStyleSheet("""
+            QPushButton {
+                background-color: #3498db;
+                color: white;
+                border: none;
+                padding: 8px;
+                border-radius: 5px;
+            }
+            QPushButton:hover {
+                background-color: #2980b9;
+            }
+        """)
+        self.statement_button.clicked.connect(self.export_statement)
+        self.statement_button.setEnabled(False)
+        statement_layout.addWidget(self.statement_button)
+
+        info_form_layout.addRow(statement_layout)
+
+        info_layout.addWidget(info_form)
+
+    def create_account(self):
+        # Get customer details
+        cust_name = self.cust_name_input.text()
+        dob = self.cust_dob_input.date().toString("yyyy-MM-dd")
+        phone = self.cust_phone_input.text()
+        city = self.cust_city_input.text()
+        address = self.cust_address_input.text()
+        email = self.cust_email_input.text()
+        account_type = self.account_type_combo.currentText()
+        branch_id = self.account_branch_combo.currentData()
+
+        try:
+            initial_deposit = float(self.initial_deposit_input.text())
+        except ValueError:
+            initial_deposit = 0.0
+
+        if not cust_name or not phone or not city or not address or not email:
+            QMessageBox.warning(self, "Error", "Please fill all required customer fields")
+            return
+
+        self.queries.submit(None, services.create_account,
+                            (cust_name, dob, phone, city, address, email, account_type, initial_deposit, branch_id),
+                            on_result=lambda result: self.account_created(result, account_type, initial_deposit),
+                            on_error=lambda e: QMessageBox.warning(self, "Error", f"Failed to create account: {str(e)}"))
+
+    def account_created(self, result, account_type, initial_deposit):
+        cust_id, account_no = result
+
+        QMessageBox.information(
+            self, "Account Created",
+            f"Account created successfully!\n\nCustomer ID: {cust_id}\nAccount Number: {account_no}\nAccount Type: {account_type}\nInitial Balance: {initial_deposit:,.2f}"
+        )
+
+        # Clear form
+        self.cust_name_input.clear()
+        self.cust_phone_input.clear()
+        self.cust_city_input.clear()
+        self.cust_address_input.clear()
+        self.cust_email_input.clear()
+        self.initial_deposit_input.clear()
+
+    def update_transfer_fields(self, transaction_type):
+        self.to_account_input.setEnabled(transaction_type == "Transfer")
+
+    def process_transaction(self):
+        account_no = self.account_no_input.text()
+        transaction_type = self.transaction_type_combo.currentText()
+        description = self.description_input.text()
+
+        try:
+            amount = float(self.amount_input.text())
+        except ValueError:
+            QMessageBox.warning(self, "Error", "Please enter a valid amount")
+            return
+
+        if not account_no:
+            QMessageBox.warning(self, "Error", "Please enter an account number")
+            return
+
+        if amount <= 0:
+            QMessageBox.warning(self, "Error", "Amount must be greater than 0")
+            return
+
+        try:
+            account_no = int(account_no)
+        except ValueError:
+            QMessageBox.warning(self, "Error", "Account number must be a number")
+            return
+
+        if transaction_type == "Transfer":
+            self.process_transfer(account_no, amount, description)
+            return
+
+        # Check and update the balance atomically
+        self.queries.submit(None, ledger.post, (account_no, transaction_type, amount, description),
+                            on_result=lambda result: self.transaction_posted(result, account_no, transaction_type,
+                                                                             amount),
+                            on_error=lambda e: self.transaction_failed(e, "transaction"))
+
+    def transaction_failed(self, error, kind):
+        if isinstance(error, ledger.PostingError):
+            QMessageBox.warning(self, "Error", str(error))
+        else:
+            QMessageBox.warning(self, "Error", f"Failed to process {kind}: {str(error)}")
+
+    def transaction_posted(self, result, account_no, transaction_type, amount):
+        transaction_id, new_balance = result
+
+        QMessageBox.information(
+            self, "Transaction Successful",
+            f"Transaction processed successfully!\n\nAccount: {account_no}\nType: {transaction_type}\nAmount: {amount:,.2f}\nNew Balance: {new_balance:,.2f}"
+        )
+
+        # Clear form
+        self.amount_input.clear()
+        self.description_input.clear()
+
+    def process_transfer(self, from_account, amount, description):
+        to_account = self.to_account_input.text()
+
+        if not to_account:
+            QMessageBox.warning(self, "Error", "Please enter a destination account number")
+            return
+
+        try:
+            to_account = int(to_account)
+        except ValueError:
+            QMessageBox.warning(self, "Error", "Destination account number must be a number")
+            return
+
+        # Debit and credit both legs in one transaction
+        self.queries.submit(None, ledger.transfer, (from_account, to_account, amount, description),
+                            on_result=lambda result: self.transfer_posted(result, from_account, to_account, amount),
+                            on_error=lambda e: self.transaction_failed(e, "transfer"))
+
+    def transfer_posted(self, result, from_account, to_account, amount):
+        _, _, from_balance, to_balance = result
+
+        QMessageBox.information(
+            self, "Transfer Successful",
+            f"Transfer processed successfully!\n\nFrom: {from_account} (New Balance: {from_balance:,.2f})\nTo: {to_account} (New Balance: {to_balance:,.2f})\nAmount: {amount:,.2f}"
+        )
+
+        # Clear form
+        self.amount_input.clear()
+        self.to_account_input.clear()
+        self.description_input.clear()
+
+    def search_account(self):
+        search_term = self.search_account_input.text().strip()
+
+        if not search_term:
+            QMessageBox.warning(self, "Error", "Please enter search term")
+            return
+
+        # An account number opens that account directly; anything else (or a
+        # number that is not an account, e.g. a phone number) lists matches
+        if search_term.isdigit():
+            self.search_results_table.hide()
+            self.search_pending = False
+            # A newer search supersedes one still running
+            self.queries.submit("search", services.find_account, (search_term,),
+                                on_result=lambda account: self.show_account(account) if account
+                                else self.show_search_results(search_term),
+                                on_error=lambda e: QMessageBox.warning(self, "Error", f"Search failed: {str(e)}"))
+        else:
+            self.queries.cancel("search")
+            self.show_search_results(search_term)
+
+    def show_search_results(self, search_term):
+        # The first page is read off the GUI thread; search_results_loaded
+        # shows it when it is in
+        query = services.customer_match_query(search_term)
+        self.search_results_model.set_filter("customer_fts MATCH ?" if query else "0", (query,) if query else ())
+        self.search_pending = True
+        self.search_results_model.fetchMore()
+
+    def search_results_loaded(self, page):
+        # Later pages, and reloads of the first, come in as the table scrolls
+        if page != 0 or not self.search_pending:
+            return
+        self.search_pending = False
+
+        if self.search_results_model.rowCount() == 0:
+            self.search_results_table.hide()
+            QMessageBox.warning(self, "Not Found", "No matching account found")
+            return
+
+        self.search_results_table.show()
+        if self.search_results_model.rowCount() == 1:
+            self.select_search_result(self.search_results_model.index(0, 0))
+
+    def select_search_result(self, index):
+        record = self.search_results_model.record(index.row())
+        if record is None:
+            return
+        self.queries.submit("search", services.find_account, (str(record[0]),), on_result=self.show_account,
+                            on_error=lambda e: QMessageBox.warning(self, "Error", f"Search failed: {str(e)}"))
+
+    def show_account(self, account):
+        if not account:
+            QMessageBox.warning(self, "Not Found", "No matching account found")
+            return
+
+        account_no, cust_name, balance, account_type, opened_date, status = account
+
+        # Display account info
+        info_text = f"""
+        <b>Account Number:</b> {account_no}<br>
+        <b>Customer Name:</b> {cust_name}<br>
+        <b>Account Type:</b> {account_type}<br>
+        <b>Status:</b> {status}<br>
+        <b>Balance:</b> {balance:,.2f}<br>
+        <b>Opened Date:</b> {opened_date}<br>
+        """
+
+        self.account_info_text.setHtml(info_text)
+
+        # Load transaction history, newest first, paged in as the table scrolls
+        self.transaction_history_model.set_filter("t.account_no = ?", (account_no,), partitions.history_window)
+
+        self.current_account_no = account_no
+        self.statement_button.setEnabled(True)
+
+    def export_statement(self):
+        if self.current_account_no is None:
+            return
+
+        start_date = self.statement_from_input.date().toString("yyyy-MM-dd")
+        end_date = self.statement_to_input.date().toString("yyyy-MM-dd")
+        if start_date > end_date:
+            QMessageBox.warning(self, "Error", "Statement start date is after its end date")
+            return
+
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Export Statement", f"statement_{self.current_account_no}_{start_date}_{end_date}.csv",
+            "CSV files (*.csv);;Printable text (*.txt)")
+        if not path:
+            return
+
+        # Streams to the file on a worker thread, however long the history is
+        account_no = self.current_account_no
+        self.statement_button.setEnabled(False)
+        self.queries.submit(None, statements.export_statement, (account_no, path, start_date, end_date),
+                            on_result=lambda count: self.statement_exported(account_no, path, count),
+                            on_error=self.statement_failed)
+
+    def statement_exported(self, account_no, path, count):
+        self.statement_button.setEnabled(True)
+        QMessageBox.information(self, "Success", f"Statement for account {account_no} written to {path}\n"
+                                                 f"Transactions: {count:,}")
+
+    def statement_failed(self, error):
+        self.statement_button.setEnabled(True)
+        QMessageBox.warning(self, "Error", f"Failed to export statement: {str(error)}")
+
+
+class ManagerDashboard(DashboardTemplate):
+    def __init__(self, emp_id, emp_name):
+        super().__init__(emp_id, emp_name, "Manager Dashboard")
+
+        # Content layout
+        content_layout = QVBoxLayout()
+        self.content_area.setLayout(content_layout)
+
+        # Each tab is built, and its data loaded, the first time it is shown
+        self.add_tabs(content_layout, [("Bank Metrics", self.build_metrics_tab),
+                                       ("Transactions", self.build_transactions_tab),
+                                       ("Recent Employee Actions", self.build_actions_tab),
+                                       ("Diagnostics", self.build_diagnostics_tab)])
+
+    def build_metrics_tab(self, metrics_tab):
+        tab_layout = QVBoxLayout()
+        metrics_tab.setLayout(tab_layout)
+
+        metrics_group = QGroupBox("Bank Metrics")
+        metrics_layout = QVBoxLayout()
+        metrics_group.setLayout(metrics_layout)
+
+        self.metrics_text = QTextEdit()
+        self.metrics_text.setReadOnly(True)
+        metrics_layout.addWidget(self.metrics_text)
+
+        refresh_button = QPushButton("Refresh Metrics")
+        refresh_button.setStyleSheet("""
+            QPushButton {
+                background-color: #3498db;
+                color: white;
+                border: none;
+                padding: 8px;
+                border-radius: 5px;
+            }
+            QPushButton:hover {
+                background-color: #2980b9;
+            }
+        """)
+        refresh_button.clicked.connect(self.update_metrics)
+        metrics_layout.addWidget(refresh_button)
+
+        tab_layout.addWidget(metrics_group)
+        self.update_metrics()
+
+    def build_transactions_tab(self, transactions_tab):
+        tab_layout = QVBoxLayout()
+        transactions_tab.setLayout(tab_layout)
+
+        transactions_group = QGroupBox("Transactions")
+        transactions_layout = QVBoxLayout()
+        transactions_group.setLayout(transactions_layout)
+
+        # Filters; "Any"/"All" leaves one unset
+        filters_layout = QHBoxLayout()
+
+        self.browser_from_input = self.any_date_input()
+        filters_layout.addWidget(QLabel("From:"))
+        filters_layout.addWidget(self.browser_from_input)
+
+        self.browser_to_input = self.any_date_input()
+        filters_layout.addWidget(QLabel("To:"))
+        filters_layout.addWidget(self.browser_to_input)
+
+        self.browser_branch_combo = QComboBox()
+        self.populate_branch_combo(self.browser_branch_combo, "All branches")
+        filters_layout.addWidget(self.browser_branch_combo)
+
+        self.browser_type_combo = QComboBox()
+        self.browser_status_combo = QComboBox()
+        self.browser_amount_combo = QComboBox()
+        for combo, label, values in ((self.browser_type_combo, "All types", services.TRANSACTION_TYPES),
+                                     (self.browser_status_combo, "All statuses", services.TRANSACTION_STATUSES),
+                                     (self.browser_amount_combo, "All amounts", services.AMOUNT_BANDS)):
+            combo.addItem(label, None)
+            for value in values:
+                combo.addItem(value, value)
+            filters_layout.addWidget(combo)
+
+        filter_button = QPushButton("Apply")
+        filter_button.clicked.connect(self.filter_transactions)
+        filters_layout.addWidget(filter_button)
+
+        clear_button = QPushButton("Clear")
+        clear_button.clicked.connect(self.clear_transaction_filters)
+        filters_layout.addWidget(clear_button)
+
+        transactions_layout.addLayout(filters_layout)
+
+        # Newest first, paged in as the table scrolls (keyset on date, id)
+        self.transactions_model = LazySqlTableModel(
+            ["Date", "Account", "Type", "Amount", "Description", "Status"], pages.TRANSACTIONS,
+            formatters={3: format_amount}, prepare=self.transaction_months(None, None), executor=self.queries,
+            parent=self)
+        self.transactions_model.error.connect(
+            lambda error: QMessageBox.warning(self, "Error", f"Failed to load transactions: {error}"))
+
+        self.transactions_table = QTableView()
+        self.transactions_table.setModel(self.transactions_model)
+        self.transactions_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.transactions_table.setEditTriggers(QTableView.NoEditTriggers)
+
+        transactions_layout.addWidget(self.transactions_table)
+
+        tab_layout.addWidget(transactions_group)
+
+    @staticmethod
+    def any_date_input():
+        # Its minimum date shows as "Any" and means no bound
+        date_input = QDateEdit()
+        date_input.setCalendarPopup(True)
+        date_input.setMinimumDate(QDate(2000, 1, 1))
+        date_input.setSpecialValueText("Any")
+        date_input.setDate(date_input.minimumDate())
+        return date_input
+
+    @staticmethod
+    def transaction_months(start_date, end_date):
+        # Without dates the browser reads only the live database (the current
+        # month); a date range also reads the archived months it reaches
+        if start_date is None and end_date is None:
+            start_date = partitions.current_month() + "-01"
+        return partial(partitions.history_window, start_date=start_date, end_date=end_date)
+
+    def filter_transactions(self):
+        def bound(date_input):
+            if date_input.date() == date_input.minimumDate():
+                return None
+            return date_input.date().toString("yyyy-MM-dd")
+
+        start_date = bound(self.browser_from_input)
+        end_date = bound(self.browser_to_input)
+        if start_date and end_date and start_date > end_date:
+            QMessageBox.warning(self, "Error", "The start date is after the end date")
+            return
+
+        where, params = services.transaction_filter(
+            start_date, end_date, self.browser_branch_combo.currentData(), self.browser_type_combo.currentData(),
+            self.browser_status_combo.currentData(), self.browser_amount_combo.currentData())
+        self.transactions_model.set_filter(where, params, self.transaction_months(start_date, end_date))
+
+    def clear_transaction_filters(self):
+        for date_input in (self.browser_from_input, self.browser_to_input):
+            date_input.setDate(date_input.minimumDate())
+        for combo in (self.browser_branch_combo, self.browser_type_combo, self.browser_status_combo,
+                      self.browser_amount_combo):
+            combo.setCurrentIndex(0)
+        self.filter_transactions()
+
+    def build_actions_tab(self, actions_tab):
+        tab_layout = QVBoxLayout()
+        actions_tab.setLayout(tab_layout)
+
+        actions_group = QGroupBox("Recent Employee Actions")
+        actions_layout = QVBoxLayout()
+        actions_group.setLayout(actions_layout)
+
+        self.actions_model = LazySqlTableModel(
+            ["Date", "Employee ID", "Action", "Performed By", "Details"], pages.EMPLOYEE_ACTIONS,
+            executor=self.queries, parent=self)
+        self.actions_model.error.connect(
+            lambda error: QMessageBox.warning(self, "Error", f"Failed to load employee actions: {error}"))
+
+        self.actions_table = QTableView()
+        self.actions_table.setModel(self.actions_model)
+        self.actions_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.actions_table.setEditTriggers(QTableView.NoEditTriggers)
+
+        actions_layout.addWidget(self.actions_table)
+
+        tab_layout.addWidget(actions_group)
+
+    def build_diagnostics_tab(self, diagnostics_tab):
+        tab_layout = QVBoxLayout()
+        diagnostics_tab.setLayout(tab_layout)
+
+        # SQL statistics (sqlstats.py)
+        diagnostics_group = QGroupBox("Diagnostics")
+        diagnostics_layout = QVBoxLayout()
+        diagnostics_group.setLayout(diagnostics_layout)
+
+        self.diagnostics_text = QTextEdit()
+        self.diagnostics_text.setReadOnly(True)
+        diagnostics_layout.addWidget(self.diagnostics_text)
+
+        diagnostics_buttons = QHBoxLayout()
+        for label, slot in (("Refresh", self.update_diagnostics), ("Reset", self.reset_diagnostics),
+                            ("Export...", self.export_diagnostics)):
+            button = QPushButton(label)
+            button.clicked.connect(slot)
+            diagnostics_buttons.addWidget(button)
+        diagnostics_layout.addLayout(diagnostics_buttons)
+
+        tab_layout.addWidget(diagnostics_group)
+        self.update_diagnostics()
+
+    def update_metrics(self):
+        # Repeated clicks while a refresh is running join it
+        self.queries.submit("metrics", services.load_metrics, on_result=self.show_metrics,
+                            on_error=lambda e: QMessageBox.warning(self, "Error", f"Failed to load metrics: {str(e)}"))
+
+    def show_metrics(self, metrics):
+        total_employees, total_accounts, total_balance, dept_counts = metrics
+
+        # Format metrics text
+        metrics_text = f"""
+        <h3>Bank Overview</h3>
+        <p><b>Total Employees:</b> {total_employees:,}</p>
+        <p><b>Total Accounts:</b> {total_accounts:,}</p>
+        <p><b>Total Bank Balance:</b> {total_balance:,.2f}</p>
+
+        <h3>Employees by Department</h3>
+        """
+
+        for dept, count in dept_counts:
+            metrics_text += f"<p><b>{dept}:</b> {count:,}</p>"
+
+        self.metrics_text.setHtml(metrics_text)
+
+    def update_diagnostics(self):
+        if not sqlstats.enabled():
+            self.diagnostics_text.setHtml("<p>SQL statistics are disabled.</p>")
+            return
+
+        lock_seconds, lock_waits, lock_timeouts = sqlstats.lock_wait()
+        text = f"""
+        <h3>SQL Statements</h3>
+        <p>Recorded {sqlstats.duty():.0%} of the time (slow statements always). Write lock: {lock_waits:,} waits,
+        {lock_seconds * 1000:,.1f} ms in total, {lock_timeouts:,} timeouts.</p>
+        <table border="1" cellspacing="0" cellpadding="3">
+        <tr><th>Statement</th><th>Calls</th><th>Total ms</th><th>Mean ms</th><th>p95 ms</th>
+        <th>Rows</th><th>Errors</th></tr>
+        """
+        for stats in sqlstats.statements()[:DIAGNOSTICS_STATEMENTS]:
+            text += (f"<tr><td>{escape(stats.sql[:120])}</td><td>{stats.calls:,}</td>"
+                     f"<td>{stats.seconds * 1000:,.1f}</td><td>{stats.seconds / stats.calls * 1000:,.3f}</td>"
+                     f"<td>&le; {stats.percentile(0.95) * 1000:,.2f}</td><td>{stats.rows:,}</td>"
+                     f"<td>{stats.errors:,}</td></tr>")
+        text += "</table><h3>Slow Queries</h3>"
+
+        slow = sqlstats.slow_queries()
+        if not slow:
+            text += "<p>None.</p>"
+        for query in reversed(slow):
+            at = datetime.fromtimestamp(query.at).strftime("%Y-%m-%d %H:%M:%S")
+            text += (f"<p><b>{at}</b> {query.seconds * 1000:,.1f} ms, {query.rows:,} rows<br>"
+                     f"{escape(query.sql)}</p><pre>{escape(query.plan or '(no plan)')}</pre>")
+
+        self.diagnostics_text.setHtml(text)
+
+    def reset_diagnostics(self):
+        sqlstats.reset()
+        self.update_diagnostics()
+
+    def export_diagnostics(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export SQL Statistics", SQL_STATS_FILE,
+                                              "Prometheus text (*.prom);;All files (*)")
+        if not path:
+            return
+        try:
+            sqlstats.export(path)
+        except OSError as e:
+            QMessageBox.warning(self, "Error", f"Failed to export SQL statistics: {str(e)}")
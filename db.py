@@ -0,0 +1,151 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import sqlstats
+
+# Database setup
+DB_NAME = "time_bank.db"
+
+# Applied to every new connection. journal_mode is persistent in the file,
+# the others are per-connection settings.
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA mmap_size = 268435456",
+)
+
+
+class ConnectionPool:
+    def __init__(self, db_name=DB_NAME, max_idle=8, timeout=5.0, cached_statements=256):
+        self.db_name = db_name
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+
+        self._lock = threading.Lock()
+        self._idle = []
+        self._local = threading.local()
+        self._pid = os.getpid()
+        self._wal_applied = False
+
+    def _connect(self):
+        # isolation_level=None leaves transaction control to transaction(),
+        # check_same_thread=False lets an idle connection move between threads
+        # (a connection is only ever checked out by one thread at a time),
+        # uri=True lets archived partitions be attached read-only.
+        # With sqlstats enabled every statement is timed (see sqlstats.py).
+        factory = sqlstats.InstrumentedConnection if sqlstats.enabled() else sqlite3.Connection
+        conn = sqlite3.connect(self.db_name, timeout=self.timeout, isolation_level=None, factory=factory,
+                               check_same_thread=False, cached_statements=self.cached_statements, uri=True)
+        conn.execute(f"PRAGMA busy_timeout = {int(self.timeout * 1000)}")
+        if not self._wal_applied:
+            # Both persist in the file. auto_vacuum only takes effect on a new
+            # one, before anything is written to it (older files switch with
+            # `python -m partitions vacuum`); it lets archival hand the pages
+            # of archived months back to the file system (see partitions.py).
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("PRAGMA journal_mode = WAL")
+            self._wal_applied = True
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _acquire(self):
+        with self._lock:
+            # Connections must never be shared across a fork
+            if self._pid != os.getpid():
+                self._idle = []
+                self._pid = os.getpid()
+                self._local = threading.local()
+            if self._idle:
+                return self._idle.pop()
+        return self._connect()
+
+    def _release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if len(self._idle) < self.max_idle and self._pid == os.getpid():
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    @contextmanager
+    def connection(self):
+        # Nested use on the same thread shares the outer connection
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            yield conn
+            return
+
+        conn = self._acquire()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self._release(conn)
+
+    @contextmanager
+    def transaction(self, immediate=False):
+        with self.connection() as conn:
+            # Inside an open transaction, nest with a savepoint instead
+            if conn.in_transaction:
+                conn.execute("SAVEPOINT nested")
+                try:
+                    yield conn
+                except BaseException:
+                    conn.execute("ROLLBACK TO nested")
+                    conn.execute("RELEASE nested")
+                    raise
+                conn.execute("RELEASE nested")
+                return
+
+            conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_NAME)
+    return _pool
+
+
+def configure(db_name, **options):
+    # Point the shared pool at another database file (benchmarks, tools)
+    global _pool, DB_NAME
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close_all()
+        DB_NAME = db_name
+        _pool = ConnectionPool(db_name, **options)
+    return _pool
+
+
+def connection():
+    return get_pool().connection()
+
+
+def transaction(immediate=False):
+    return get_pool().transaction(immediate)
@@ -0,0 +1,194 @@
+import argparse
+import csv
+import gzip
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+from contextlib import closing
+
+import db
+import partitions
+
+# Exports ledger tables to compressed CSV or Parquet for reconciliation and
+# analytics. All tables are read inside one read transaction: in WAL mode
+# that is a consistent snapshot of the database which never blocks tellers'
+# writes (it only holds back checkpointing until it ends). Rows stream out
+# through fetchmany in batch_size batches, so memory stays bounded.
+#
+# Append-only tables (transactions, employee_actions) can be exported
+# incrementally: the highest key written so far is kept per table in
+# export_manifest.json in the output directory, and the next run exports only
+# rows above it. Other tables (accounts) are always exported in full.
+# Transactions of archived months are read from their partition files first
+# (see partitions.py), skipping months wholly below the last exported key.
+
+# table: (key column, incremental)
+TABLES = {
+    "transactions": ("transaction_id", True),
+    "accounts": ("account_no", False),
+    "employee_actions": ("action_id", True),
+}
+
+MANIFEST = "export_manifest.json"
+
+# path is None when there was nothing new to export
+ExportResult = namedtuple("ExportResult", ["table", "rows", "path", "last_key"])
+
+
+class CsvGzipWriter:
+    extension = ".csv.gz"
+
+    def __init__(self, path, columns):
+        self._file = gzip.open(path, "wt", newline="", encoding="utf-8", compresslevel=6)
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(columns)
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+    extension = ".parquet"
+
+    def __init__(self, path, columns):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)") from None
+        self._pa = pa
+        self._pq = pq
+        self._path = path
+        self._columns = columns
+        self._writer = None
+
+    def write(self, rows):
+        # The schema comes from the first batch
+        table = self._pa.Table.from_arrays([self._pa.array(values) for values in zip(*rows)], names=self._columns)
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self._path, table.schema, compression="zstd")
+        self._writer.write_table(table.cast(self._writer.schema))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+WRITERS = {"csv": CsvGzipWriter, "parquet": ParquetWriter}
+
+
+def load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST)) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(out_dir, manifest):
+    # Written to a temporary file and renamed, so a crash never leaves half a manifest
+    path = os.path.join(out_dir, MANIFEST)
+    with open(path + ".tmp", "w") as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def _batches(conn, table, sql, params, after, batch_size):
+    def read(source):
+        cursor = source.execute(sql, params)
+        rows = cursor.fetchmany(batch_size)
+        while rows:
+            yield rows
+            rows = cursor.fetchmany(batch_size)
+
+    if table == "transactions":
+        for partition in partitions.archived(conn):
+            if after is None or (partition.last_id or 0) > after:
+                with closing(partitions.connect(partition)) as archive:
+                    yield from read(archive)
+    yield from read(conn)
+
+
+def export_table(conn, table, out_dir, writer_class, after=None, batch_size=50000):
+    key, _ = TABLES[table]
+    sql = f"SELECT * FROM {table}"
+    params = ()
+    if after is not None:
+        sql += f" WHERE {key} > ?"
+        params = (after,)
+    columns = [description[0] for description in conn.execute(f"SELECT * FROM {table} LIMIT 0").description]
+    key_index = columns.index(key)
+
+    batches = _batches(conn, table, sql + f" ORDER BY {key}", params, after, batch_size)
+    rows = next(batches, None)
+    if not rows:
+        return ExportResult(table, 0, None, after)
+
+    name = f"{table}_{(after or 0) + 1}-" if after is not None else f"{table}_full-"
+    path = os.path.join(out_dir, name + time.strftime("%Y%m%d%H%M%S") + writer_class.extension)
+    # Written under a .partial name and renamed once complete
+    partial = path + ".partial"
+    writer = writer_class(partial, columns)
+    count = 0
+    try:
+        while rows:
+            writer.write(rows)
+            count += len(rows)
+            last_key = rows[-1][key_index]
+            rows = next(batches, None)
+        writer.close()
+    except BaseException:
+        writer.close()
+        os.remove(partial)
+        raise
+    os.replace(partial, path)
+    return ExportResult(table, count, path, last_key)
+
+
+def export(out_dir, tables=None, fmt="csv", incremental=True, batch_size=50000, pool=None):
+    # Returns [ExportResult, ...] in the order of tables
+    pool = pool or db.get_pool()
+    writer_class = WRITERS[fmt]
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = load_manifest(out_dir)
+    results = []
+
+    # One read transaction: every table comes from the same snapshot
+    with pool.transaction() as conn:
+        for table in tables or TABLES:
+            after = manifest.get(table) if incremental and TABLES[table][1] else None
+            result = export_table(conn, table, out_dir, writer_class, after, batch_size)
+            results.append(result)
+            if TABLES[table][1] and result.last_key is not None:
+                manifest[table] = result.last_key
+
+    save_manifest(out_dir, manifest)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export ledger tables from a consistent snapshot.")
+    parser.add_argument("out_dir")
+    parser.add_argument("--format", choices=sorted(WRITERS), default="csv")
+    parser.add_argument("--full", action="store_true", help="ignore the manifest and export every row")
+    parser.add_argument("--tables", nargs="+", choices=sorted(TABLES))
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = export(args.out_dir, args.tables, args.format, incremental=not args.full)
+    elapsed = time.perf_counter() - start
+
+    total = sum(result.rows for result in results)
+    for result in results:
+        print(f"{result.table}: {result.rows:,} rows" + (f" -> {result.path}" if result.path else ""))
+    print(f"{total:,} rows in {elapsed:.1f}s ({total / elapsed if elapsed else 0:,.0f} rows/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
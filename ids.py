@@ -0,0 +1,111 @@
+import os
+import threading
+
+import db
+
+# IDs come from the id_sequences table in blocks (hi/lo): one short write
+# transaction reserves block_size values, which are then handed out from
+# memory. Reservations are atomic across threads and processes, so no two
+# callers ever get the same value and inserts never need a retry loop. Values
+# left in a block when the process exits are simply skipped.
+#
+# Reserve IDs before opening the transaction that inserts them: the
+# reservation commits on its own connection, so it must not wait behind a
+# write lock held by the caller.
+
+
+def luhn_check_digit(number):
+    total = 0
+    for position, digit in enumerate(reversed(str(number))):
+        digit = int(digit)
+        if position % 2 == 0:
+            digit *= 2
+            if digit > 9:
+                digit -= 9
+        total += digit
+    return (10 - total % 10) % 10
+
+
+def with_check_digit(number):
+    return number * 10 + luhn_check_digit(number)
+
+
+def is_valid_account_no(account_no):
+    # Only meaningful for account numbers issued by the allocator
+    return account_no >= 10 and luhn_check_digit(account_no // 10) == account_no % 10
+
+
+def reserve_in(conn, name, count):
+    # Reserves count values of a sequence inside the caller's write
+    # transaction, for bulk loads that already hold the write lock; they
+    # are handed back if that transaction rolls back. Returns a range.
+    cursor = conn.execute("UPDATE id_sequences SET next_value = next_value + ? WHERE name = ?", (count, name))
+    if cursor.rowcount != 1:
+        raise KeyError(f"Unknown ID sequence: {name}")
+    end = conn.execute("SELECT next_value FROM id_sequences WHERE name = ?", (name,)).fetchone()[0]
+    return range(end - count, end)
+
+
+class IdAllocator:
+    def __init__(self, name, block_size=100, db_name=None):
+        self.name = name
+        self.block_size = block_size
+        self.db_name = db_name
+
+        self._lock = threading.Lock()
+        self._pool = None
+        self._next = 0
+        self._end = 0
+        self._pid = os.getpid()
+
+    def _reserve(self, count):
+        if self._pool is None:
+            # A private pool, so a reservation always commits on its own and is
+            # never rolled back together with the caller's transaction
+            self._pool = db.ConnectionPool(self.db_name or db.DB_NAME, max_idle=1)
+
+        with self._pool.transaction(immediate=True) as conn:
+            reserved = reserve_in(conn, self.name, count)
+        return reserved.start, reserved.stop
+
+    def next(self):
+        with self._lock:
+            # A forked child must not hand out the parent's block again
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._pool = None
+                self._next = self._end = 0
+            if self._next >= self._end:
+                self._next, self._end = self._reserve(self.block_size)
+            value = self._next
+            self._next += 1
+            return value
+
+    def reserve(self, count):
+        # A contiguous range of count fresh IDs, for bulk loads
+        with self._lock:
+            start, end = self._reserve(count)
+        return range(start, end)
+
+
+_allocators = {}
+_allocators_lock = threading.Lock()
+
+
+def allocator(name):
+    with _allocators_lock:
+        if name not in _allocators or _allocators[name].db_name != db.DB_NAME:
+            _allocators[name] = IdAllocator(name, db_name=db.DB_NAME)
+        return _allocators[name]
+
+
+def next_emp_id():
+    return allocator("employee").next()
+
+
+def next_cust_id():
+    return allocator("customer").next()
+
+
+def next_account_no():
+    return with_check_digit(allocator("account").next())
@@ -0,0 +1,273 @@
+import argparse
+import csv
+import math
+import os
+import sys
+import time
+from collections import namedtuple
+from datetime import date
+from itertools import islice
+
+import audit
+import db
+import ids
+import reference
+import services
+
+# Bulk onboarding of customers with one account each, from CSV or Parquet.
+# Rows stream through in chunks: each chunk is validated, given customer IDs
+# and account numbers from one id_sequences reservation each, and written
+# with one executemany per table. Chunks are grouped into transactions of
+# commit_rows rows, so tellers keep posting between them during a load. Each
+# account is opened at the row's branch_id, or the import's default one.
+#
+# Offline bulk mode (drop_indexes, --drop-indexes) is for loads into a
+# database nobody else is writing to, e.g. onboarding a new bank: it holds
+# the write lock from start to end. For each table the load is at least as
+# large as (customer and accounts, each against its own row count), the
+# secondary indexes are dropped first and rebuilt once at the end, which is
+# much cheaper than maintaining them row by row; the transactions indexes are
+# always maintained. The customer search index goes with the customer
+# indexes: its insert trigger is dropped and the loaded customers are indexed
+# in one statement afterwards. The drop, the load and the rebuild are a
+# single transaction, so a failed import never leaves the database without
+# its indexes.
+
+COLUMNS = ["cust_name", "dob", "phone", "city", "address", "email", "account_type", "initial_deposit", "branch_id"]
+REQUIRED = ["cust_name", "phone", "city", "address", "email"]
+
+# Tables whose secondary indexes may be dropped for a load
+INDEXED_TABLES = ("customer", "accounts")
+
+SEARCH_TRIGGER = "trg_customer_fts_insert"
+
+# failed: [(row_number, reason), ...], row 1 being the first data row
+ImportReport = namedtuple("ImportReport", ["rows", "loaded", "failed", "seconds", "indexes_rebuilt"])
+
+
+def read_csv(path, chunk_size=50000):
+    # Chunks of row dicts; the header names the columns, in any order
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        reader = csv.DictReader(file)
+        while True:
+            chunk = list(islice(reader, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+
+def read_parquet(path, chunk_size=50000):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Reading Parquet files needs pyarrow (pip install pyarrow)") from None
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+        yield batch.to_pylist()
+
+
+def reader_for(path, chunk_size=50000):
+    if path.lower().endswith((".parquet", ".pq")):
+        return read_parquet(path, chunk_size)
+    return read_csv(path, chunk_size)
+
+
+def validate(row, branch_ids=None, branch_id=None):
+    # Returns the row as a tuple in COLUMNS order; raises ValueError with the
+    # reason. branch_ids: the known branches; branch_id: the row's default.
+    values = {column: (str(row.get(column) or "")).strip() for column in COLUMNS}
+
+    missing = [column for column in REQUIRED if not values[column]]
+    if missing:
+        raise ValueError(f"Missing {', '.join(missing)}")
+
+    if values["dob"]:
+        try:
+            values["dob"] = date.fromisoformat(values["dob"]).isoformat()
+        except ValueError:
+            raise ValueError("Invalid dob (expected YYYY-MM-DD)") from None
+    else:
+        values["dob"] = None
+
+    account_type = values["account_type"] or "Savings"
+    if account_type not in services.ACCOUNT_TYPES:
+        raise ValueError(f"Invalid account_type: {account_type}")
+    values["account_type"] = account_type
+
+    try:
+        deposit = float(values["initial_deposit"] or 0)
+    except ValueError:
+        raise ValueError("Invalid initial_deposit") from None
+    if not math.isfinite(deposit) or deposit < 0:
+        raise ValueError("Invalid initial_deposit")
+    values["initial_deposit"] = deposit
+
+    if values["branch_id"]:
+        try:
+            values["branch_id"] = int(values["branch_id"])
+        except ValueError:
+            raise ValueError("Invalid branch_id") from None
+    else:
+        values["branch_id"] = branch_id
+    if values["branch_id"] is not None and branch_ids is not None and values["branch_id"] not in branch_ids:
+        raise ValueError(f"Unknown branch_id: {values['branch_id']}")
+
+    return tuple(values[column] for column in COLUMNS)
+
+
+def load_chunk(conn, rows, cust_ids, account_nos):
+    # rows: validated tuples; cust_ids/account_nos: one fresh ID per row
+    conn.executemany("""
+    INSERT INTO customer (cust_id, cust_name, dob, phone, city, address, email)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, ((cust_id,) + row[:6] for cust_id, row in zip(cust_ids, rows)))
+    conn.executemany("""
+    INSERT INTO accounts (account_no, cust_id, balance, account_type, branch_id)
+    VALUES (?, ?, ?, ?, ?)
+    """, ((account_no, cust_id, row[7], row[6], row[8]) for cust_id, account_no, row in zip(cust_ids, account_nos, rows)))
+    conn.executemany("""
+    INSERT INTO transactions (account_no, transaction_type, transaction_amount, transaction_description, transaction_status)
+    VALUES (?, 'Deposit', ?, 'Initial deposit', 'Completed')
+    """, ((account_no, row[7]) for account_no, row in zip(account_nos, rows) if row[7] > 0))
+
+
+def secondary_indexes(conn, tables):
+    # [(name, sql), ...] of the explicitly created indexes on tables
+    placeholders = ", ".join("?" * len(tables))
+    return conn.execute(f"""
+    SELECT name, sql FROM sqlite_master
+    WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ({placeholders})
+    ORDER BY name
+    """, tuple(tables)).fetchall()
+
+
+def tables_to_reindex(conn, path):
+    # The INDEXED_TABLES the load is at least as large as, each against its
+    # own row count; the load's rows are estimated from the file size at
+    # ~100 bytes per row (every row adds one customer and one account)
+    rows = os.path.getsize(path) // 100
+    return [table for table in INDEXED_TABLES
+            if rows >= conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]]
+
+
+def import_file(path, chunk_size=50000, commit_rows=500000, drop_indexes=False, branch_id=None, on_progress=None,
+                pool=None):
+    # drop_indexes: the offline bulk mode (see above). branch_id: for rows
+    # without one. on_progress(rows_read, rows_loaded) is called after every
+    # chunk.
+    pool = pool or db.get_pool()
+    start = time.perf_counter()
+    failed = []
+    rows_read = 0
+    loaded = 0
+
+    branch_ids = {branch for branch, _ in reference.branches(pool)}
+    if branch_id is not None and branch_id not in branch_ids:
+        raise ValueError(f"Unknown branch_id: {branch_id}")
+
+    with pool.connection() as conn:
+        reindexed = tables_to_reindex(conn, path) if drop_indexes else []
+
+        dropped = []
+        search_trigger = None
+        first_cust_id = last_cust_id = None
+        # One transaction for everything in offline bulk mode, otherwise one
+        # per commit_rows rows
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if reindexed:
+                dropped = secondary_indexes(conn, reindexed)
+                for name, _ in dropped:
+                    conn.execute(f"DROP INDEX {name}")
+            if "customer" in reindexed:
+                search_trigger = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?",
+                                              (SEARCH_TRIGGER,)).fetchone()
+                if search_trigger is not None:
+                    conn.execute(f"DROP TRIGGER {SEARCH_TRIGGER}")
+
+            pending = 0
+            for chunk in reader_for(path, chunk_size):
+                rows = []
+                for number, row in enumerate(chunk, rows_read + 1):
+                    try:
+                        rows.append(validate(row, branch_ids, branch_id))
+                    except ValueError as e:
+                        failed.append((number, str(e)))
+                rows_read += len(chunk)
+
+                if rows:
+                    # Reserved in this transaction: the allocators' own
+                    # connections would wait behind the write lock held here
+                    cust_ids = ids.reserve_in(conn, "customer", len(rows))
+                    account_nos = [ids.with_check_digit(n) for n in ids.reserve_in(conn, "account", len(rows))]
+                    load_chunk(conn, rows, cust_ids, account_nos)
+                    first_cust_id = cust_ids[0] if first_cust_id is None else first_cust_id
+                    last_cust_id = cust_ids[-1]
+                    loaded += len(rows)
+                    pending += len(rows)
+
+                if not drop_indexes and pending >= commit_rows:
+                    conn.execute("COMMIT")
+                    conn.execute("BEGIN IMMEDIATE")
+                    pending = 0
+
+                if on_progress is not None:
+                    on_progress(rows_read, loaded)
+
+            for _, sql in dropped:
+                conn.execute(sql)
+            if search_trigger is not None:
+                # The write lock was held throughout, so every customer in the
+                # reserved range is one of ours
+                if first_cust_id is not None:
+                    conn.execute("""
+                    INSERT INTO customer_fts (rowid, cust_name, email, phone, city)
+                    SELECT cust_id, cust_name, email, phone, city FROM customer
+                    WHERE cust_id BETWEEN ? AND ?
+                    """, (first_cust_id, last_cust_id))
+                conn.execute(search_trigger[0])
+                dropped.append(("customer_fts", None))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    audit.notify(pool)
+    return ImportReport(rows_read, loaded, failed, time.perf_counter() - start, [name for name, _ in dropped])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import customers and their accounts from CSV or Parquet.")
+    parser.add_argument("path")
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--rejects", help="write rejected rows (row number, reason) to this CSV file")
+    parser.add_argument("--branch-id", type=int, help="branch of the accounts whose row has no branch_id")
+    parser.add_argument("--drop-indexes", action="store_true",
+                        help="offline bulk mode: drop and rebuild indexes, holding the write lock throughout")
+    args = parser.parse_args(argv)
+
+    from migrations import initialize_database
+
+    initialize_database()
+
+    def progress(rows_read, loaded):
+        print(f"\r{rows_read:,} rows read, {loaded:,} loaded", end="", file=sys.stderr, flush=True)
+
+    report = import_file(args.path, args.chunk_size, drop_indexes=args.drop_indexes, branch_id=args.branch_id,
+                         on_progress=progress)
+    print(file=sys.stderr)
+
+    if args.rejects:
+        with open(args.rejects, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["row", "reason"])
+            writer.writerows(report.failed)
+
+    print(f"Loaded {report.loaded:,} of {report.rows:,} rows in {report.seconds:.1f}s "
+          f"({report.rows / report.seconds if report.seconds else 0:,.0f} rows/s), {len(report.failed):,} rejected")
+    if report.indexes_rebuilt:
+        print(f"Rebuilt indexes: {', '.join(report.indexes_rebuilt)}")
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,309 @@
+import math
+import random
+import sqlite3
+import time
+from collections import namedtuple
+from itertools import islice
+
+import audit
+import db
+
+TRANSACTION_TYPES = ("Deposit", "Withdrawal")
+
+# Transfer legs store a signed amount (negative on the debit leg), Deposit and
+# Withdrawal store the magnitude. This is the balance effect of any row.
+SIGNED_AMOUNT_SQL = ("CASE transaction_type WHEN 'Withdrawal' THEN -transaction_amount "
+                     "ELSE transaction_amount END")
+
+# posted: number of rows written; failed: [(row_index, reason), ...] in input order
+BatchReport = namedtuple("BatchReport", ["posted", "failed"])
+
+
+class PostingError(Exception):
+    # Business rule rejections (unknown account, inactive account, insufficient
+    # funds); the message is meant to be shown to the teller as-is.
+    pass
+
+
+def _is_busy(error):
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+def with_retry(operation, retries=8, backoff=0.005, max_backoff=0.5):
+    # busy_timeout already waits inside SQLite; this covers the cases where it
+    # gives up (long checkpoints, other processes holding the lock past it).
+    attempt = 0
+    while True:
+        try:
+            return operation()
+        except sqlite3.OperationalError as e:
+            if not _is_busy(e) or attempt >= retries:
+                raise
+            delay = min(max_backoff, backoff * (2 ** attempt))
+            time.sleep(delay * random.uniform(0.5, 1.5))
+            attempt += 1
+
+
+def check_amount(amount):
+    # inf and NaN pass a plain `amount <= 0` check
+    if not math.isfinite(amount) or amount <= 0:
+        raise PostingError("Amount must be greater than 0")
+
+
+def _delta(transaction_type, amount):
+    if transaction_type not in TRANSACTION_TYPES:
+        raise PostingError(f"Unsupported transaction type: {transaction_type}")
+    check_amount(amount)
+    return amount if transaction_type == "Deposit" else -amount
+
+
+def _rejection(conn, account_no):
+    # Only called after the conditional UPDATE matched nothing, to say why
+    account = conn.execute("SELECT account_status FROM accounts WHERE account_no = ?", (account_no,)).fetchone()
+    if not account:
+        return PostingError("Account not found")
+    if account[0] != "Active":
+        return PostingError(f"Account is {account[0]}")
+    return PostingError("Insufficient funds")
+
+
+def apply_posting(conn, account_no, transaction_type, amount, description=""):
+    # Check and update in one statement: the balance is never read into Python
+    # and written back, so concurrent postings cannot overwrite each other.
+    delta = _delta(transaction_type, amount)
+    cursor = conn.execute("""
+    UPDATE accounts SET balance = balance + ?
+    WHERE account_no = ? AND account_status = 'Active' AND balance + ? >= 0
+    """, (delta, account_no, delta))
+
+    if cursor.rowcount != 1:
+        raise _rejection(conn, account_no)
+
+    new_balance = conn.execute("SELECT balance FROM accounts WHERE account_no = ?", (account_no,)).fetchone()[0]
+
+    cursor = conn.execute("""
+    INSERT INTO transactions (account_no, transaction_type, transaction_amount, transaction_description, transaction_status)
+    VALUES (?, ?, ?, ?, ?)
+    """, (account_no, transaction_type, amount, description, "Completed"))
+
+    return cursor.lastrowid, new_balance
+
+
+def post(account_no, transaction_type, amount, description="", pool=None):
+    pool = pool or db.get_pool()
+
+    def attempt():
+        with pool.transaction(immediate=True) as conn:
+            return apply_posting(conn, account_no, transaction_type, amount, description)
+
+    result = with_retry(attempt)
+    audit.notify(pool)
+    return result
+
+
+def load_accounts(conn, account_nos):
+    # Status and current balance of every account in a batch, in one query
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS batch_accounts (account_no INTEGER PRIMARY KEY)")
+    conn.execute("DELETE FROM temp.batch_accounts")
+    conn.executemany("INSERT INTO temp.batch_accounts VALUES (?)",
+                     ((account_no,) for account_no in sorted(account_nos)))
+    return {account_no: [balance, status] for account_no, balance, status in conn.execute("""
+    SELECT a.account_no, a.balance, a.account_status
+    FROM temp.batch_accounts b
+    JOIN accounts a ON a.account_no = b.account_no
+    """)}
+
+
+def apply_deltas(conn, deltas):
+    # One UPDATE per account however many rows it has in the batch, in key
+    # order so consecutive updates hit neighbouring b-tree pages
+    conn.executemany("UPDATE accounts SET balance = balance + ? WHERE account_no = ?",
+                     ((deltas[account_no], account_no) for account_no in sorted(deltas)))
+
+
+def run_batches(rows, batch_size, pool, apply):
+    # apply(conn, batch, offset) -> (posted, failed) runs on every batch_size
+    # rows in its own write transaction, retried while the database is busy
+    pool = pool or db.get_pool()
+    rows = iter(rows)
+    posted = 0
+    failed = []
+    offset = 0
+
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+
+        def attempt():
+            with pool.transaction(immediate=True) as conn:
+                return apply(conn, batch, offset)
+
+        batch_posted, batch_failed = with_retry(attempt)
+        audit.notify(pool)
+        posted += batch_posted
+        failed.extend(batch_failed)
+        offset += len(batch)
+
+    failed.sort()
+    return BatchReport(posted, failed)
+
+
+def _validate_batch(conn, batch, offset):
+    failed = []
+    candidates = []
+    for index, row in enumerate(batch, offset):
+        account_no, transaction_type, amount = row[0], row[1], row[2]
+        try:
+            candidates.append((index, int(account_no), transaction_type, amount,
+                               row[3] if len(row) > 3 else "", _delta(transaction_type, amount)))
+        except (PostingError, TypeError, ValueError) as e:
+            failed.append((index, str(e) if isinstance(e, PostingError) else "Invalid row"))
+
+    accounts = load_accounts(conn, {row[1] for row in candidates})
+
+    # Rows are applied in input order, so a withdrawal may be covered by an
+    # earlier deposit in the same batch
+    accepted = []
+    for index, account_no, transaction_type, amount, description, delta in candidates:
+        account = accounts.get(account_no)
+        if account is None:
+            failed.append((index, "Account not found"))
+        elif account[1] != "Active":
+            failed.append((index, f"Account is {account[1]}"))
+        elif account[0] + delta < 0:
+            failed.append((index, "Insufficient funds"))
+        else:
+            account[0] += delta
+            accepted.append((account_no, transaction_type, amount, description, delta))
+
+    return accepted, failed
+
+
+def apply_batch(conn, batch, offset=0):
+    accepted, failed = _validate_batch(conn, batch, offset)
+
+    deltas = {}
+    for account_no, _, _, _, delta in accepted:
+        deltas[account_no] = deltas.get(account_no, 0) + delta
+    apply_deltas(conn, deltas)
+
+    conn.executemany("""
+    INSERT INTO transactions (account_no, transaction_type, transaction_amount, transaction_description, transaction_status)
+    VALUES (?, ?, ?, ?, 'Completed')
+    """, (row[:4] for row in accepted))
+
+    return len(accepted), failed
+
+
+def post_batch(rows, batch_size=10000, pool=None):
+    # rows: iterable of (account_no, transaction_type, amount[, description]).
+    # Each batch of batch_size rows is validated and written in one transaction;
+    # a rejected row never rolls back the others.
+    return run_batches(rows, batch_size, pool, apply_batch)
+
+
+def _check_transfer(from_account, to_account, amount):
+    if from_account == to_account:
+        raise PostingError("Cannot transfer to the same account")
+    check_amount(amount)
+
+
+def apply_transfer(conn, from_account, to_account, amount, description=""):
+    # Both legs are conditional UPDATEs in the caller's transaction. They are
+    # applied in account order so that any two transfers touch rows in the
+    # same order; BEGIN IMMEDIATE already takes the database write lock up
+    # front, so transfers queue on it rather than deadlocking.
+    _check_transfer(from_account, to_account, amount)
+
+    for account_no in sorted((from_account, to_account)):
+        if account_no == from_account:
+            cursor = conn.execute("""
+            UPDATE accounts SET balance = balance - ?
+            WHERE account_no = ? AND account_status = 'Active' AND balance - ? >= 0
+            """, (amount, account_no, amount))
+        else:
+            cursor = conn.execute("""
+            UPDATE accounts SET balance = balance + ?
+            WHERE account_no = ? AND account_status = 'Active'
+            """, (amount, account_no))
+
+        if cursor.rowcount != 1:
+            raise _rejection(conn, account_no)
+
+    legs = ((from_account, -amount, description or f"Transfer to {to_account}"),
+            (to_account, amount, description or f"Transfer from {from_account}"))
+    ids = []
+    for account_no, signed_amount, leg_description in legs:
+        cursor = conn.execute("""
+        INSERT INTO transactions (account_no, transaction_type, transaction_amount, transaction_description, transaction_status)
+        VALUES (?, 'Transfer', ?, ?, 'Completed')
+        """, (account_no, signed_amount, leg_description))
+        ids.append(cursor.lastrowid)
+
+    balances = dict(conn.execute("SELECT account_no, balance FROM accounts WHERE account_no IN (?, ?)",
+                                 (from_account, to_account)).fetchall())
+
+    return ids[0], ids[1], balances[from_account], balances[to_account]
+
+
+def transfer(from_account, to_account, amount, description="", pool=None):
+    # Returns (debit_transaction_id, credit_transaction_id, from_balance, to_balance)
+    pool = pool or db.get_pool()
+
+    def attempt():
+        with pool.transaction(immediate=True) as conn:
+            return apply_transfer(conn, from_account, to_account, amount, description)
+
+    result = with_retry(attempt)
+    audit.notify(pool)
+    return result
+
+
+def apply_transfer_batch(conn, batch, offset=0):
+    failed = []
+    candidates = []
+    for index, row in enumerate(batch, offset):
+        try:
+            from_account, to_account, amount = int(row[0]), int(row[1]), row[2]
+            _check_transfer(from_account, to_account, amount)
+            candidates.append((index, from_account, to_account, amount, row[3] if len(row) > 3 else ""))
+        except (PostingError, TypeError, ValueError) as e:
+            failed.append((index, str(e) if isinstance(e, PostingError) else "Invalid row"))
+
+    accounts = load_accounts(conn, {row[1] for row in candidates} | {row[2] for row in candidates})
+
+    deltas = {}
+    legs = []
+    for index, from_account, to_account, amount, description in candidates:
+        source = accounts.get(from_account)
+        target = accounts.get(to_account)
+        if source is None or target is None:
+            failed.append((index, "Account not found"))
+        elif source[1] != "Active" or target[1] != "Active":
+            failed.append((index, f"Account is {target[1] if source[1] == 'Active' else source[1]}"))
+        elif source[0] < amount:
+            failed.append((index, "Insufficient funds"))
+        else:
+            source[0] -= amount
+            target[0] += amount
+            deltas[from_account] = deltas.get(from_account, 0) - amount
+            deltas[to_account] = deltas.get(to_account, 0) + amount
+            legs.append((from_account, -amount, description or f"Transfer to {to_account}"))
+            legs.append((to_account, amount, description or f"Transfer from {from_account}"))
+
+    apply_deltas(conn, deltas)
+
+    conn.executemany("""
+    INSERT INTO transactions (account_no, transaction_type, transaction_amount, transaction_description, transaction_status)
+    VALUES (?, 'Transfer', ?, ?, 'Completed')
+    """, legs)
+
+    return len(legs) // 2, failed
+
+
+def transfer_batch(rows, batch_size=10000, pool=None):
+    # rows: iterable of (from_account, to_account, amount[, description]);
+    # same batching and failure report as post_batch.
+    return run_batches(rows, batch_size, pool, apply_transfer_batch)
@@ -0,0 +1,410 @@
+import calendar
+import math
+from collections import namedtuple
+from datetime import date
+
+try:
+    import numpy as np
+except ImportError:  # schedules fall back to the per-loan reference below
+    np = None
+
+import audit
+import db
+import ledger
+
+# Loans are disbursed into, and repaid from, a customer's account through the
+# ledger. Each loan is an annuity: interest_rate is an annual percentage,
+# charged monthly, and monthly_payment is fixed at origination.
+#
+# Interest accrues by period, not by payment: the first repayment on or after
+# each due date pays the interest of every period since the last one charged
+# (interest_periods), and further repayments in the same period go entirely
+# to principal. Interest a repayment does not cover is capitalised, i.e.
+# added to the outstanding principal, so arrears are never written off.
+#
+# The loan row carries running aggregates (outstanding_principal, totals paid,
+# number of repayments, interest_periods, next_due_date) that the repayment
+# engine updates in the same transaction as it inserts loan_repayment rows. Portfolio totals and
+# delinquency lists therefore read the loan table through its indexes and
+# never touch loan_repayment, however large it grows. rebuild_aggregates()
+# recomputes them from loan_repayment if they are ever in doubt.
+
+# Outstanding principal at or below this counts as repaid
+PAID_TOLERANCE = 0.005
+
+# What rounding monthly_payment to cents can leave over, per installment
+ROUNDING_TOLERANCE = 0.01
+
+ScheduleLine = namedtuple("ScheduleLine", ["installment", "payment", "interest", "principal", "balance"])
+
+# posted/failed as in ledger.BatchReport; paid: loan_ids that were paid off
+RepaymentReport = namedtuple("RepaymentReport", ["posted", "failed", "paid"])
+
+
+def monthly_payment(principal, annual_rate, term_months):
+    rate = annual_rate / 1200.0
+    if rate == 0:
+        return round(principal / term_months, 2)
+    return round(principal * rate / (1 - (1 + rate) ** -term_months), 2)
+
+
+def _balance_after(outstanding, rate, payment, k):
+    # Closed form of the balance after k payments, never below zero
+    if rate == 0:
+        return max(0.0, outstanding - payment * k)
+    growth = (1 + rate) ** k
+    return max(0.0, outstanding * growth - payment * (growth - 1) / rate)
+
+
+def amortization_schedule(principal, annual_rate, term_months):
+    # [ScheduleLine, ...] for one loan, amounts rounded to cents; the last
+    # installment clears whatever rounding left over
+    rate = annual_rate / 1200.0
+    payment = monthly_payment(principal, annual_rate, term_months)
+    lines = []
+    previous = principal
+    for k in range(1, term_months + 1):
+        balance = 0.0 if k == term_months else _balance_after(principal, rate, payment, k)
+        interest = previous * rate
+        lines.append(ScheduleLine(k, round(interest + previous - balance, 2), round(interest, 2),
+                                  round(previous - balance, 2), round(balance, 2)))
+        previous = balance
+    return lines
+
+
+def reference_cash_flows(loans, months):
+    # loans: [(outstanding_principal, annual_rate, monthly_payment), ...]
+    # Returns ([interest per month], [principal per month]) summed over the
+    # portfolio for the next `months` months. Plain Python reference.
+    interest = [0.0] * months
+    principal = [0.0] * months
+    for outstanding, annual_rate, payment in loans:
+        rate = annual_rate / 1200.0
+        previous = outstanding
+        for k in range(1, months + 1):
+            balance = _balance_after(outstanding, rate, payment, k)
+            interest[k - 1] += previous * rate
+            principal[k - 1] += previous - balance
+            previous = balance
+    return interest, principal
+
+
+def vectorized_cash_flows(loans, months):
+    # Same as reference_cash_flows on a (loans x months) balance matrix
+    if not loans:
+        return [0.0] * months, [0.0] * months
+    values = np.array(loans, dtype=np.float64)
+    outstanding, rate, payment = values[:, 0:1], values[:, 1:2] / 1200.0, values[:, 2:3]
+    k = np.arange(1, months + 1, dtype=np.float64)
+
+    growth = (1 + rate) ** k
+    with np.errstate(divide="ignore", invalid="ignore"):
+        annuity = np.where(rate == 0, payment * k, payment * (growth - 1) / np.where(rate == 0, 1, rate))
+    balances = np.maximum(0.0, np.where(rate == 0, outstanding, outstanding * growth) - annuity)
+    previous = np.hstack([outstanding, balances[:, :-1]])
+
+    return (previous * rate).sum(axis=0).tolist(), (previous - balances).sum(axis=0).tolist()
+
+
+compute_cash_flows = vectorized_cash_flows if np is not None else reference_cash_flows
+
+
+def projected_cash_flows(months=12, chunk_size=50000, pool=None):
+    # [(month, expected_interest, expected_principal), ...] for the active
+    # portfolio, month 1 being the next installment of every loan
+    pool = pool or db.get_pool()
+    interest = [0.0] * months
+    principal = [0.0] * months
+    after = 0
+
+    with pool.transaction() as conn:
+        while True:
+            rows = conn.execute("""
+            SELECT loan_id, outstanding_principal, interest_rate, monthly_payment FROM loan
+            WHERE loan_id > ? AND status = 'Active' AND outstanding_principal > 0
+            ORDER BY loan_id
+            LIMIT ?
+            """, (after, chunk_size)).fetchall()
+            if not rows:
+                break
+            chunk_interest, chunk_principal = compute_cash_flows([row[1:] for row in rows], months)
+            interest = [a + b for a, b in zip(interest, chunk_interest)]
+            principal = [a + b for a, b in zip(principal, chunk_principal)]
+            after = rows[-1][0]
+
+    return [(k, round(interest[k - 1], 2), round(principal[k - 1], 2)) for k in range(1, months + 1)]
+
+
+def originate_loan(account_no, amount, annual_rate, term_months, start_date=None, pool=None):
+    # Disburses amount into the account. Returns (loan_id, monthly_payment).
+    if not math.isfinite(amount) or amount <= 0:
+        raise ledger.PostingError("Loan amount must be greater than 0")
+    if (not math.isfinite(annual_rate) or annual_rate < 0
+            or not isinstance(term_months, int) or isinstance(term_months, bool) or term_months <= 0):
+        raise ledger.PostingError("Invalid loan terms")
+    pool = pool or db.get_pool()
+    start_date = str(start_date or date.today())
+    payment = monthly_payment(amount, annual_rate, term_months)
+
+    def attempt():
+        with pool.transaction(immediate=True) as conn:
+            account = conn.execute("SELECT cust_id FROM accounts WHERE account_no = ?", (account_no,)).fetchone()
+            if account is None:
+                raise ledger.PostingError("Account not found")
+
+            cursor = conn.execute("""
+            INSERT INTO loan (cust_id, account_no, loan_amount, interest_rate, start_date, end_date, status,
+                              term_months, monthly_payment, outstanding_principal, next_due_date)
+            VALUES (?, ?, ?, ?, date(?), date(?, ?), 'Active', ?, ?, ?, date(?, '+1 months'))
+            """, (account[0], account_no, amount, annual_rate, start_date, start_date, f"+{term_months} months",
+                  term_months, payment, amount, start_date))
+            loan_id = cursor.lastrowid
+
+            # Rejects inactive accounts, which rolls the loan back too
+            ledger.apply_posting(conn, account_no, "Deposit", amount, f"Loan {loan_id} disbursement")
+            return loan_id
+
+    loan_id = ledger.with_retry(attempt)
+    audit.notify(pool)
+    return loan_id, payment
+
+
+def _period(start_date, repayment_date):
+    # Installment period a repayment falls in: whole months from start_date,
+    # with anything before the first due date counting as period 1. A loan
+    # started on the 31st falls due on the last day of shorter months.
+    start, paid_on = date.fromisoformat(start_date[:10]), date.fromisoformat(repayment_date[:10])
+    due_day = min(start.day, calendar.monthrange(paid_on.year, paid_on.month)[1])
+    return max(1, (paid_on.year - start.year) * 12 + paid_on.month - start.month - (paid_on.day < due_day))
+
+
+def _interest_due(loan, period):
+    # Interest of the periods up to `period` not yet charged
+    periods = max(0, period - loan["interest_periods"])
+    return round(loan["outstanding_principal"] * loan["interest_rate"] / 1200.0 * periods, 2)
+
+
+def _split_repayment(loan, amount, period):
+    # (interest, principal, capitalised) of one repayment: interest due
+    # first, then principal up to what is outstanding. Anything beyond is not
+    # taken; interest due beyond the amount is capitalised.
+    due = _interest_due(loan, period)
+    interest = min(amount, due)
+    principal = min(amount - interest, loan["outstanding_principal"])
+    return interest, principal, round(due - interest, 2)
+
+
+def _apply_repayment(loan, interest, principal, capitalised, period):
+    loan["interest_periods"] = max(loan["interest_periods"], period)
+    loan["outstanding_principal"] += capitalised - principal
+    loan["principal_paid"] += principal
+    loan["interest_paid"] += interest
+    loan["total_paid"] += interest + principal
+    loan["repayments"] += 1
+
+
+def _due_offset(loan):
+    # Months from start_date to the first installment not yet covered
+    if loan["monthly_payment"] <= 0:
+        return 1
+    return int((loan["total_paid"] + PAID_TOLERANCE) // loan["monthly_payment"]) + 1
+
+
+def _settle(loan):
+    # A loan is repaid once its principal is, or once every installment has
+    # been paid and only the cents the rounded monthly_payment leaves over
+    # remain; those are written off rather than chased with another
+    # installment. Capitalised arrears are not.
+    leftover = loan["term_months"] * ROUNDING_TOLERANCE
+    if (loan["outstanding_principal"] <= PAID_TOLERANCE
+            or (_due_offset(loan) > loan["term_months"] and loan["outstanding_principal"] <= leftover)):
+        loan["outstanding_principal"] = 0.0
+        loan["status"] = "Paid"
+
+
+_AGGREGATE_COLUMNS = ["outstanding_principal", "principal_paid", "interest_paid", "total_paid", "repayments",
+                      "interest_periods"]
+
+
+def _load_loans(conn, loan_ids):
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS batch_loans (loan_id INTEGER PRIMARY KEY)")
+    conn.execute("DELETE FROM temp.batch_loans")
+    conn.executemany("INSERT INTO temp.batch_loans VALUES (?)", ((loan_id,) for loan_id in sorted(loan_ids)))
+    columns = (["loan_id", "account_no", "status", "start_date", "interest_rate", "term_months", "monthly_payment"]
+               + _AGGREGATE_COLUMNS)
+    return {row[0]: dict(zip(columns, row)) for row in conn.execute(f"""
+    SELECT {', '.join('l.' + column for column in columns)}
+    FROM temp.batch_loans b
+    JOIN loan l ON l.loan_id = b.loan_id
+    """)}
+
+
+def apply_repayment_batch(conn, batch, offset=0):
+    # Returns (posted, failed, paid) for one batch inside the caller's transaction
+    failed = []
+    candidates = []
+    for index, row in enumerate(batch, offset):
+        try:
+            loan_id, amount = int(row[0]), row[1]
+            ledger.check_amount(amount)
+            repayment_date = date.fromisoformat(str(row[2])[:10]) if len(row) > 2 else date.today()
+            candidates.append((index, loan_id, amount, str(repayment_date)))
+        except (ledger.PostingError, TypeError, ValueError) as e:
+            failed.append((index, str(e) if isinstance(e, ledger.PostingError) else "Invalid row"))
+
+    loans = _load_loans(conn, {row[1] for row in candidates})
+    accounts = ledger.load_accounts(conn, {loan["account_no"] for loan in loans.values()})
+
+    # Rows are applied in input order against running loan and account
+    # state, as in ledger.post_batch: a repayment after the one that clears a
+    # loan is rejected, and so is one its account cannot cover. An
+    # overpayment only debits what it pays off (interest plus outstanding
+    # principal).
+    repayments = []
+    withdrawals = []
+    deltas = {}
+    touched = {}
+    for index, loan_id, amount, repayment_date in candidates:
+        loan = loans.get(loan_id)
+        account = accounts.get(loan["account_no"]) if loan is not None else None
+        if loan is None:
+            failed.append((index, "Loan not found"))
+        elif loan["status"] != "Active":
+            failed.append((index, f"Loan is {loan['status']}"))
+        elif account is None:
+            failed.append((index, "Account not found"))
+        elif account[1] != "Active":
+            failed.append((index, f"Account is {account[1]}"))
+        else:
+            period = _period(loan["start_date"], repayment_date)
+            interest, principal, capitalised = _split_repayment(loan, amount, period)
+            applied = round(interest + principal, 2)
+            if account[0] < applied:
+                failed.append((index, "Insufficient funds"))
+                continue
+            account[0] -= applied
+            deltas[loan["account_no"]] = deltas.get(loan["account_no"], 0) - applied
+            _apply_repayment(loan, interest, principal, capitalised, period)
+            _settle(loan)
+            repayments.append((loan_id, repayment_date, applied))
+            withdrawals.append((loan["account_no"], applied, f"Loan {loan_id} repayment"))
+            touched[loan_id] = max(touched.get(loan_id, repayment_date), repayment_date)
+
+    ledger.apply_deltas(conn, deltas)
+    conn.executemany("""
+    INSERT INTO transactions (account_no, transaction_type, transaction_amount, transaction_description, transaction_status)
+    VALUES (?, 'Withdrawal', ?, ?, 'Completed')
+    """, withdrawals)
+    conn.executemany("INSERT INTO loan_repayment (loan_id, repayment_date, amount_paid) VALUES (?, ?, ?)",
+                     repayments)
+
+    # One grouped UPDATE per loan, in key order; Paid loans flip here too
+    conn.executemany(f"""
+    UPDATE loan SET {', '.join(column + ' = ?' for column in _AGGREGATE_COLUMNS)},
+        status = ?,
+        last_repayment_date = MAX(COALESCE(last_repayment_date, ''), ?),
+        next_due_date = CASE WHEN ? = 'Paid' THEN NULL ELSE date(start_date, ?) END
+    WHERE loan_id = ?
+    """, ([loans[loan_id][column] for column in _AGGREGATE_COLUMNS]
+          + [loans[loan_id]["status"], last_date, loans[loan_id]["status"], f"+{_due_offset(loans[loan_id])} months",
+             loan_id]
+          for loan_id, last_date in sorted(touched.items())))
+
+    paid = sorted(loan_id for loan_id in touched if loans[loan_id]["status"] == "Paid")
+    return len(repayments), failed, paid
+
+
+def post_repayments(rows, batch_size=10000, pool=None):
+    # rows: iterable of (loan_id, amount[, repayment_date]). Returns
+    # RepaymentReport; failed rows never roll back the rest of their batch.
+    paid = []
+
+    def apply(conn, batch, offset):
+        posted, failed, batch_paid = apply_repayment_batch(conn, batch, offset)
+        paid.extend(batch_paid)
+        return posted, failed
+
+    report = ledger.run_batches(rows, batch_size, pool, apply)
+    return RepaymentReport(report.posted, report.failed, sorted(set(paid)))
+
+
+def mark_defaults(as_of=None, grace_days=90, pool=None):
+    # Flips every Active loan whose oldest unpaid installment is more than
+    # grace_days overdue to Defaulted, in one statement. Returns the count.
+    pool = pool or db.get_pool()
+    as_of = str(as_of or date.today())
+
+    def attempt():
+        with pool.transaction(immediate=True) as conn:
+            return conn.execute("""
+            UPDATE loan SET status = 'Defaulted'
+            WHERE status = 'Active' AND next_due_date < date(?, ?)
+            """, (as_of, f"-{int(grace_days)} days")).rowcount
+
+    return ledger.with_retry(attempt)
+
+
+def portfolio_summary(pool=None):
+    # {status: (loans, outstanding_principal, total_paid)}
+    pool = pool or db.get_pool()
+    with pool.connection() as conn:
+        return {status: (count, outstanding or 0, paid or 0) for status, count, outstanding, paid in conn.execute("""
+        SELECT status, COUNT(*), SUM(outstanding_principal), SUM(total_paid)
+        FROM loan
+        GROUP BY status
+        """)}
+
+
+def delinquent_loans(as_of=None, min_days_overdue=1, limit=100, pool=None):
+    # [(loan_id, account_no, next_due_date, outstanding_principal), ...],
+    # most overdue first
+    pool = pool or db.get_pool()
+    as_of = str(as_of or date.today())
+    with pool.connection() as conn:
+        return conn.execute("""
+        SELECT loan_id, account_no, next_due_date, outstanding_principal
+        FROM loan
+        WHERE status = 'Active' AND next_due_date < date(?, ?)
+        ORDER BY next_due_date, loan_id
+        LIMIT ?
+        """, (as_of, f"-{int(min_days_overdue) - 1} days", limit)).fetchall()
+
+
+def rebuild_aggregates(conn):
+    # Recomputes every loan's aggregates by replaying loan_repayment in order,
+    # ignoring any repayment after the one that paid the loan off. Reads the
+    # whole table; meant for migrations and repairs, not routine use.
+    loans = {}
+    for loan_id, amount, rate, term, start_date, end_date in conn.execute("""
+    SELECT loan_id, loan_amount, interest_rate, term_months, start_date, end_date FROM loan
+    """).fetchall():
+        if term is None:
+            term = conn.execute("""
+            SELECT MAX(1, (strftime('%Y', ?) - strftime('%Y', ?)) * 12 + strftime('%m', ?) - strftime('%m', ?))
+            """, (end_date, start_date, end_date, start_date)).fetchone()[0]
+        loans[loan_id] = {"status": "Active", "start_date": start_date, "term_months": term, "interest_rate": rate,
+                          "monthly_payment": monthly_payment(amount, rate, term), "outstanding_principal": amount,
+                          "principal_paid": 0.0, "interest_paid": 0.0, "total_paid": 0.0, "repayments": 0,
+                          "interest_periods": 0, "last_repayment_date": None}
+
+    for loan_id, repayment_date, amount in conn.execute("""
+    SELECT loan_id, repayment_date, amount_paid FROM loan_repayment ORDER BY loan_id, repayment_date, repayment_id
+    """):
+        loan = loans.get(loan_id)
+        if loan is not None and loan["status"] == "Active":
+            period = _period(loan["start_date"], repayment_date)
+            _apply_repayment(loan, *_split_repayment(loan, amount, period), period)
+            _settle(loan)
+            loan["last_repayment_date"] = repayment_date
+
+    conn.executemany("""
+    UPDATE loan SET term_months = ?, monthly_payment = ?, outstanding_principal = ?, principal_paid = ?,
+        interest_paid = ?, total_paid = ?, repayments = ?, interest_periods = ?, last_repayment_date = ?,
+        status = CASE WHEN ? = 'Paid' THEN 'Paid' ELSE status END,
+        next_due_date = CASE WHEN status = 'Paid' OR ? = 'Paid' THEN NULL ELSE date(start_date, ?) END
+    WHERE loan_id = ?
+    """, ((loan["term_months"], loan["monthly_payment"], loan["outstanding_principal"], loan["principal_paid"],
+           loan["interest_paid"], loan["total_paid"], loan["repayments"], loan["interest_periods"],
+           loan["last_repayment_date"],
+           loan["status"], loan["status"], f"+{_due_offset(loan)} months", loan_id)
+          for loan_id, loan in sorted(loans.items())))
@@ -0,0 +1,165 @@
+# The login window, opened by app.start. Only what it shows is imported here:
+# the dashboards, with their models and report modules, are imported on the
+# first successful login (see LoginWindow.open_dashboard).
+
+from PyQt5.QtWidgets import (QMainWindow, QWidget, QLabel, QLineEdit, QPushButton, QVBoxLayout, QMessageBox,
+                             QFormLayout)
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QPixmap, QIcon
+
+import audit
+import services
+from migrations import initialize_database
+from workers import QueryExecutor
+
+# Written every 15 seconds for a Prometheus textfile collector
+SQL_STATS_FILE = "time_bank_sql.prom"
+
+_database_prepared = False
+
+
+def prepare_database():
+    # Schema checks and crash recovery, run off the GUI thread while the login
+    # window first paints. Once per process: the login window is created again
+    # on every logout.
+    global _database_prepared
+    if not _database_prepared:
+        initialize_database()
+        # Postings a crash left out of the audit trail
+        audit.recover()
+        _database_prepared = True
+
+
+class LoginWindow(QMainWindow):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("Time International Bank - Login")
+        self.setFixedSize(400, 300)
+
+        # Set window icon
+        self.setWindowIcon(QIcon(":bank.png"))
+
+        # Central widget
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+
+        # Layout
+        layout = QVBoxLayout()
+        central_widget.setLayout(layout)
+
+        # Title
+        title_label = QLabel("Time International Bank")
+        title_label.setAlignment(Qt.AlignCenter)
+        title_label.setStyleSheet("font-size: 24px; font-weight: bold; color: #2c3e50; margin-bottom: 30px;")
+        layout.addWidget(title_label)
+
+        # Logo (placeholder)
+        logo_label = QLabel()
+        logo_label.setPixmap(QPixmap(":bank.png").scaled(80, 80, Qt.KeepAspectRatio))
+        logo_label.setAlignment(Qt.AlignCenter)
+        layout.addWidget(logo_label)
+
+        # Form layout
+        form_layout = QFormLayout()
+        form_layout.setHorizontalSpacing(20)
+        form_layout.setVerticalSpacing(15)
+
+        # Username
+        self.username_input = QLineEdit()
+        self.username_input.setPlaceholderText("Enter your username")
+        self.username_input.setStyleSheet("padding: 8px; border-radius: 5px; border: 1px solid #ddd;")
+        form_layout.addRow("Username:", self.username_input)
+
+        # Password
+        self.password_input = QLineEdit()
+        self.password_input.setPlaceholderText("Enter your password")
+        self.password_input.setEchoMode(QLineEdit.Password)
+        self.password_input.setStyleSheet("padding: 8px; border-radius: 5px; border: 1px solid #ddd;")
+        form_layout.addRow("Password:", self.password_input)
+
+        layout.addLayout(form_layout)
+
+        # Login button
+        login_button = QPushButton("Login")
+        login_button.setStyleSheet("""
+            QPushButton {
+                background-color: #3498db;
+                color: white;
+                border: none;
+                padding: 10px;
+                border-radius: 5px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background-color: #2980b9;
+            }
+        """)
+        login_button.clicked.connect(self.authenticate)
+        layout.addWidget(login_button)
+
+        # Spacer
+        layout.addStretch()
+
+        # Footer
+        footer_label = QLabel("© 2023 Time International Bank. All rights reserved.")
+        footer_label.setAlignment(Qt.AlignCenter)
+        footer_label.setStyleSheet("font-size: 10px; color: #7f8c8d;")
+        layout.addWidget(footer_label)
+
+        # Initialize main window reference
+        self.main_window = None
+
+        # Database work runs off the GUI thread
+        self.queries = QueryExecutor(parent=self)
+
+        # A login submitted before the database is ready waits for it
+        self.database_ready = False
+        self.pending_login = None
+        self.queries.submit("startup", prepare_database, on_result=self.database_prepared,
+                            on_error=lambda e: QMessageBox.critical(self, "Error",
+                                                                    f"Failed to open the database: {str(e)}"))
+
+    def database_prepared(self, result):
+        self.database_ready = True
+        if self.pending_login is not None:
+            self.submit_login()
+
+    def authenticate(self):
+        username = self.username_input.text()
+        password = self.password_input.text()
+
+        if not username or not password:
+            QMessageBox.warning(self, "Error", "Please enter both username and password")
+            return
+
+        self.pending_login = (username, password)
+        if self.database_ready:
+            self.submit_login()
+
+    def submit_login(self):
+        credentials, self.pending_login = self.pending_login, None
+        self.queries.submit("login", services.authenticate, credentials,
+                            on_result=self.open_dashboard,
+                            on_error=lambda e: QMessageBox.warning(self, "Error", f"Login failed: {str(e)}"))
+
+    def open_dashboard(self, result):
+        if result:
+            emp_id, emp_name, dep_id, job_title = result
+
+            import dashboards
+
+            # Determine dashboard based on department
+            if dep_id == 107:  # HR
+                self.main_window = dashboards.HRDashboard(emp_id, emp_name)
+            elif dep_id == 101:  # Accountant
+                self.main_window = dashboards.AccountantDashboard(emp_id, emp_name)
+            elif dep_id == 102:  # Manager
+                self.main_window = dashboards.ManagerDashboard(emp_id, emp_name)
+            else:
+                QMessageBox.warning(self, "Access Denied", "Your role doesn't have access to any dashboard")
+                return
+
+            self.main_window.show()
+            self.hide()
+        else:
+            QMessageBox.warning(self, "Login Failed", "Invalid username or password")
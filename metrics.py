@@ -0,0 +1,78 @@
+import sys
+
+import db
+
+# Bank-wide figures for the manager dashboard are kept in bank_metrics and
+# department_metrics by triggers on employee and accounts (migration 4), so
+# every writer (tellers, batch posting, transfers, imports) keeps them current
+# and a refresh reads a handful of rows instead of scanning both tables.
+# reconcile() recomputes everything from scratch to detect and repair drift.
+
+
+def load(conn):
+    # Returns (total_employees, total_accounts, total_balance, [(dep_name, count), ...])
+    values = dict(conn.execute("SELECT name, value FROM bank_metrics").fetchall())
+    dept_counts = conn.execute("""
+    SELECT d.dep_name, SUM(m.active_employees)
+    FROM department_metrics m
+    JOIN department d ON m.dep_id = d.dep_id
+    WHERE m.active_employees > 0
+    GROUP BY d.dep_name
+    """).fetchall()
+    return (int(values.get("total_employees", 0)), int(values.get("total_accounts", 0)),
+            values.get("total_balance", 0) or 0, dept_counts)
+
+
+def recompute(conn):
+    # Full scans, the same queries the dashboard used to run on every refresh
+    totals = {
+        "total_employees": conn.execute("SELECT COUNT(*) FROM employee WHERE job_title IS NOT NULL").fetchone()[0],
+        "total_accounts": conn.execute("SELECT COUNT(*) FROM accounts").fetchone()[0],
+        "total_balance": conn.execute("SELECT COALESCE(SUM(balance), 0) FROM accounts").fetchone()[0],
+    }
+    departments = dict(conn.execute("""
+    SELECT dep_id, COUNT(*) FROM employee
+    WHERE job_title IS NOT NULL AND dep_id IS NOT NULL
+    GROUP BY dep_id
+    """).fetchall())
+    return totals, departments
+
+
+def rebuild(conn):
+    totals, departments = recompute(conn)
+    conn.executemany("INSERT OR REPLACE INTO bank_metrics (name, value) VALUES (?, ?)", totals.items())
+    conn.execute("DELETE FROM department_metrics")
+    conn.executemany("INSERT INTO department_metrics (dep_id, active_employees) VALUES (?, ?)", departments.items())
+
+
+def reconcile(fix=False, tolerance=0.005, pool=None):
+    # Returns [(metric, stored, actual), ...] for every figure that drifted
+    pool = pool or db.get_pool()
+    with pool.transaction(immediate=fix) as conn:
+        totals, departments = recompute(conn)
+        stored = dict(conn.execute("SELECT name, value FROM bank_metrics").fetchall())
+        stored_departments = dict(conn.execute("SELECT dep_id, active_employees FROM department_metrics").fetchall())
+
+        drift = [(name, stored.get(name), actual) for name, actual in totals.items()
+                 if stored.get(name) is None or abs(stored[name] - actual) > tolerance]
+        for dep_id in sorted(set(departments) | set(stored_departments)):
+            if departments.get(dep_id, 0) != stored_departments.get(dep_id, 0):
+                drift.append((f"department {dep_id}", stored_departments.get(dep_id, 0), departments.get(dep_id, 0)))
+
+        if fix and drift:
+            rebuild(conn)
+
+    return drift
+
+
+if __name__ == "__main__":
+    # python metrics.py [--fix]
+    from migrations import initialize_database
+
+    initialize_database()
+    fix = "--fix" in sys.argv[1:]
+    drift = reconcile(fix=fix)
+    for name, stored, actual in drift:
+        print(f"{name}: stored {stored}, actual {actual}")
+    print(f"{len(drift)} metrics drifted{', repaired' if fix and drift else ''}")
+    sys.exit(1 if drift and not fix else 0)
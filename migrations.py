@@ -0,0 +1,556 @@
+import db
+import loans
+import metrics
+import passwords
+
+# Schema versions are tracked in PRAGMA user_version. Each migration runs in its
+# own BEGIN IMMEDIATE transaction together with the version bump, so a failed
+# step leaves the database at the previous version and concurrent app instances
+# starting at the same time apply every step exactly once.
+
+
+def _initial_schema(conn):
+    # Databases created before versioning already have the tables (and data)
+    fresh = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'employee'").fetchone() is None
+
+    # Create tables
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS branch(
+        branch_id INTEGER PRIMARY KEY NOT NULL,
+        branch_name TEXT,
+        city TEXT,
+        address TEXT
+    )
+    """)
+
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS department(
+        dep_id INTEGER PRIMARY KEY NOT NULL,
+        dep_name TEXT
+    )
+    """)
+
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS customer(
+        cust_id INTEGER PRIMARY KEY NOT NULL,
+        cust_name TEXT,
+        dob TEXT,
+        phone INTEGER,
+        city TEXT,
+        address TEXT,
+        email TEXT
+    )
+    """)
+
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS employee(
+        emp_id INTEGER PRIMARY KEY NOT NULL,
+        emp_name TEXT,
+        gender TEXT CHECK(gender IN ('M', 'F')),
+        dep_id INTEGER,
+        branch_id INTEGER,
+        job_title TEXT,
+        salary REAL,
+        dbo TEXT,
+        phone INTEGER,
+        city TEXT,
+        address TEXT,
+        email TEXT,
+        username TEXT UNIQUE NOT NULL,
+        passwords TEXT NOT NULL,
+        FOREIGN KEY (dep_id) REFERENCES department(dep_id),
+        FOREIGN KEY (branch_id) REFERENCES branch(branch_id)
+    )
+    """)
+
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS accounts (
+        account_no INTEGER PRIMARY KEY,
+        cust_id INTEGER,
+        balance REAL,
+        opened_date TEXT DEFAULT CURRENT_TIMESTAMP,
+        account_type TEXT,
+        account_status TEXT CHECK(account_status IN ('Active', 'Inactive', 'Closed')) DEFAULT 'Active',
+        interest_rate REAL DEFAULT 0.00,
+        minimum_balance REAL DEFAULT 0.00,
+        currency TEXT DEFAULT 'ETB',
+        FOREIGN KEY (cust_id) REFERENCES customer(cust_id)
+    )
+    """)
+
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS transactions (
+        transaction_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        account_no INTEGER NOT NULL, 
+        transaction_type TEXT CHECK(transaction_type IN ('Deposit', 'Withdrawal', 'Transfer')) NOT NULL,
+        transaction_amount REAL NOT NULL, 
+        transaction_date TEXT DEFAULT CURRENT_TIMESTAMP, 
+        transaction_description TEXT,
+        transaction_status TEXT CHECK(transaction_status IN ('Pending', 'Completed', 'Failed')) DEFAULT 'Pending', 
+        FOREIGN KEY (account_no) REFERENCES accounts (account_no)
+    )
+    """)
+
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS employee_branch (
+        emp_id INTEGER NOT NULL,
+        branch_id INTEGER NOT NULL,
+        PRIMARY KEY (emp_id, branch_id),
+        FOREIGN KEY (emp_id) REFERENCES employee (emp_id),
+        FOREIGN KEY (branch_id) REFERENCES branch (branch_id)
+    )
+    """)
+
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS loan (
+        loan_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        cust_id INTEGER NOT NULL,
+        account_no INTEGER NOT NULL,
+        loan_amount REAL NOT NULL,
+        interest_rate REAL NOT NULL,
+        start_date TEXT NOT NULL,
+        end_date TEXT NOT NULL,
+        status TEXT CHECK(status IN ('Active', 'Paid', 'Defaulted')) DEFAULT 'Active',
+        FOREIGN KEY (cust_id) REFERENCES customer (cust_id),
+        FOREIGN KEY (account_no) REFERENCES accounts (account_no)
+    )
+    """)
+
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS loan_repayment (
+        repayment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        loan_id INTEGER NOT NULL,
+        repayment_date TEXT NOT NULL,
+        amount_paid REAL NOT NULL,
+        FOREIGN KEY (loan_id) REFERENCES loan (loan_id)
+    )
+    """)
+
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS transaction_log (
+        log_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        transaction_id INTEGER NOT NULL,
+        account_no INTEGER NOT NULL,
+        transaction_type TEXT CHECK(transaction_type IN ('Deposit', 'Withdrawal', 'Transfer')) NOT NULL,
+        transaction_amount REAL NOT NULL,
+        transaction_date TEXT NOT NULL,
+        transaction_description TEXT,
+        transaction_status TEXT CHECK(transaction_status IN ('Pending', 'Completed', 'Failed')) DEFAULT 'Pending',
+        log_timestamp TEXT DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (transaction_id) REFERENCES transactions (transaction_id),
+        FOREIGN KEY (account_no) REFERENCES accounts (account_no)
+    )
+    """)
+
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS employee_actions (
+        action_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        emp_id INTEGER NOT NULL,
+        action_type TEXT CHECK(action_type IN ('Hire', 'Fire')) NOT NULL,
+        action_date TEXT DEFAULT CURRENT_TIMESTAMP,
+        details TEXT,
+        FOREIGN KEY (emp_id) REFERENCES employee (emp_id)
+    )
+    """)
+
+    if fresh:
+        # Insert initial data
+        branches = [
+            (1, 'Main Branch', 'Addis Ababa', '22 Bole Road'),
+            (2, 'North Branch', 'Mekele', '15 Hawzen Street'),
+            (3, 'East Branch', 'Dire Dawa', '8 Kebele Avenue'),
+            (4, 'South Branch', 'Hawassa', '3 Lake View Road'),
+            (5, 'West Branch', 'Bahir Dar', '12 Tana Circle')
+        ]
+        conn.executemany("INSERT INTO branch VALUES (?, ?, ?, ?)", branches)
+
+        departments = [
+            (101, 'Accountant'),
+            (102, 'Manager'),
+            (103, 'Finance'),
+            (104, 'Security'),
+            (105, 'Cleaner'),
+            (107, 'HR')
+        ]
+        conn.executemany("INSERT INTO department VALUES (?, ?)", departments)
+
+        # Create initial admin accounts
+        initial_employees = [
+            (1001, 'Admin Manager', 'M', 102, 1, 'Manager', 30000, '1980-01-01', 911223344, 'Addis Ababa',
+             '22 Bole Road', 'manager@timebank.com', 'manager', '123456'),
+            (1002, 'Admin HR', 'F', 107, 1, 'HR', 15000, '1985-05-15', 922334455, 'Addis Ababa', '22 Bole Road',
+             'hr@timebank.com', 'hr', '123456'),
+            (1003, 'Admin Accountant', 'M', 101, 1, 'Accountant', 20000, '1982-03-10', 933445566, 'Addis Ababa',
+             '22 Bole Road', 'accountant@timebank.com', 'accountant', '123456')
+        ]
+        conn.executemany("""
+        INSERT INTO employee (emp_id, emp_name, gender, dep_id, branch_id, job_title, salary, dbo, phone, city, address, email, username, passwords)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, initial_employees)
+
+
+def _hot_lookup_indexes(conn):
+    # Superseded by the composite indexes below on databases that have them
+    conn.execute("DROP INDEX IF EXISTS idx_account_no")
+    conn.execute("DROP INDEX IF EXISTS idx_transaction_date")
+    conn.execute("DROP INDEX IF EXISTS idx_cust_id")
+
+    # Account history: WHERE account_no = ? ORDER BY transaction_date DESC
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_account_date ON transactions (account_no, transaction_date)")
+
+    # Recent transactions: ORDER BY transaction_date DESC LIMIT 10
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (transaction_date)")
+
+    # Recent employee actions: ORDER BY action_date DESC LIMIT 10
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_employee_actions_date ON employee_actions (action_date)")
+
+    # Customer name prefix search (LIKE 'term%' with case_sensitive_like off needs NOCASE)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_customer_name ON customer (cust_name COLLATE NOCASE)")
+
+    # Customer -> accounts join
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_accounts_cust_id ON accounts (cust_id)")
+
+
+def _id_sequences(conn):
+    # Sequences start above every ID already in use. Customer IDs and account
+    # numbers move to wider ranges than the old random 5-digit ones; account
+    # numbers also get a Luhn check digit appended (see ids.py).
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS id_sequences (
+        name TEXT PRIMARY KEY NOT NULL,
+        next_value INTEGER NOT NULL
+    )
+    """)
+    conn.execute("""
+    INSERT OR IGNORE INTO id_sequences (name, next_value)
+    SELECT 'employee', MAX(COALESCE(MAX(emp_id) + 1, 0), 1000) FROM employee
+    UNION ALL
+    SELECT 'customer', MAX(COALESCE(MAX(cust_id) + 1, 0), 100000) FROM customer
+    UNION ALL
+    SELECT 'account', MAX(COALESCE(MAX(account_no) / 10 + 1, 0), 100000000) FROM accounts
+    """)
+
+
+def _metrics_summary(conn):
+    # Kept current by the triggers below; see metrics.py
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS bank_metrics (
+        name TEXT PRIMARY KEY NOT NULL,
+        value REAL NOT NULL DEFAULT 0
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS department_metrics (
+        dep_id INTEGER PRIMARY KEY NOT NULL,
+        active_employees INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+
+    # Active employees are those with a job title (firing sets it to NULL);
+    # those without a department count in total_employees only. dep_id is
+    # department_metrics' rowid, so inserting a NULL one would allocate a
+    # phantom department instead.
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_employee_metrics_insert AFTER INSERT ON employee
+    WHEN NEW.job_title IS NOT NULL
+    BEGIN
+        UPDATE bank_metrics SET value = value + 1 WHERE name = 'total_employees';
+        INSERT INTO department_metrics (dep_id, active_employees)
+        SELECT NEW.dep_id, 1 WHERE NEW.dep_id IS NOT NULL
+        ON CONFLICT (dep_id) DO UPDATE SET active_employees = active_employees + 1;
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_employee_metrics_update AFTER UPDATE OF job_title, dep_id ON employee
+    BEGIN
+        UPDATE bank_metrics
+        SET value = value + (NEW.job_title IS NOT NULL) - (OLD.job_title IS NOT NULL)
+        WHERE name = 'total_employees';
+        UPDATE department_metrics SET active_employees = active_employees - 1
+        WHERE dep_id = OLD.dep_id AND OLD.job_title IS NOT NULL AND OLD.dep_id IS NOT NULL;
+        INSERT INTO department_metrics (dep_id, active_employees)
+        SELECT NEW.dep_id, 1 WHERE NEW.job_title IS NOT NULL AND NEW.dep_id IS NOT NULL
+        ON CONFLICT (dep_id) DO UPDATE SET active_employees = active_employees + 1;
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_employee_metrics_delete AFTER DELETE ON employee
+    WHEN OLD.job_title IS NOT NULL
+    BEGIN
+        UPDATE bank_metrics SET value = value - 1 WHERE name = 'total_employees';
+        UPDATE department_metrics SET active_employees = active_employees - 1
+        WHERE dep_id = OLD.dep_id AND OLD.dep_id IS NOT NULL;
+    END
+    """)
+
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_accounts_metrics_insert AFTER INSERT ON accounts
+    BEGIN
+        UPDATE bank_metrics SET value = value + 1 WHERE name = 'total_accounts';
+        UPDATE bank_metrics SET value = value + COALESCE(NEW.balance, 0) WHERE name = 'total_balance';
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_accounts_metrics_update AFTER UPDATE OF balance ON accounts
+    WHEN COALESCE(NEW.balance, 0) != COALESCE(OLD.balance, 0)
+    BEGIN
+        UPDATE bank_metrics SET value = value + COALESCE(NEW.balance, 0) - COALESCE(OLD.balance, 0)
+        WHERE name = 'total_balance';
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_accounts_metrics_delete AFTER DELETE ON accounts
+    BEGIN
+        UPDATE bank_metrics SET value = value - 1 WHERE name = 'total_accounts';
+        UPDATE bank_metrics SET value = value - COALESCE(OLD.balance, 0) WHERE name = 'total_balance';
+    END
+    """)
+
+    # Seed from the data already there
+    metrics.rebuild(conn)
+
+
+def _customer_search(conn):
+    # External-content FTS5 index over the searchable customer columns: the
+    # text lives only in customer, the index is kept in sync by the triggers
+    # below. prefix='2 3 4 5 6' adds prefix indexes so "term*" queries of up to
+    # six characters read one doclist instead of merging every token that
+    # starts with term (emails and phone numbers make those numerous).
+    conn.execute("""
+    CREATE VIRTUAL TABLE IF NOT EXISTS customer_fts USING fts5(
+        cust_name, email, phone, city,
+        content='customer', content_rowid='cust_id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6'
+    )
+    """)
+
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_customer_fts_insert AFTER INSERT ON customer
+    BEGIN
+        INSERT INTO customer_fts (rowid, cust_name, email, phone, city)
+        VALUES (NEW.cust_id, NEW.cust_name, NEW.email, NEW.phone, NEW.city);
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_customer_fts_delete AFTER DELETE ON customer
+    BEGIN
+        INSERT INTO customer_fts (customer_fts, rowid, cust_name, email, phone, city)
+        VALUES ('delete', OLD.cust_id, OLD.cust_name, OLD.email, OLD.phone, OLD.city);
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_customer_fts_update AFTER UPDATE OF cust_name, email, phone, city ON customer
+    BEGIN
+        INSERT INTO customer_fts (customer_fts, rowid, cust_name, email, phone, city)
+        VALUES ('delete', OLD.cust_id, OLD.cust_name, OLD.email, OLD.phone, OLD.city);
+        INSERT INTO customer_fts (rowid, cust_name, email, phone, city)
+        VALUES (NEW.cust_id, NEW.cust_name, NEW.email, NEW.phone, NEW.city);
+    END
+    """)
+
+    # Name matches rank above email/phone matches, city matches lowest
+    conn.execute("INSERT INTO customer_fts (customer_fts, rank) VALUES ('rank', 'bm25(10.0, 2.0, 2.0, 1.0)')")
+
+    # Index the customers already there
+    conn.execute("INSERT INTO customer_fts (customer_fts) VALUES ('rebuild')")
+
+
+def _transaction_log(conn):
+    # One log row per transaction (see audit.py); the unique index is also what
+    # the high-water mark and recovery checks look up
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_transaction_log_transaction ON transaction_log (transaction_id)")
+
+    # Append-only
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_transaction_log_no_update BEFORE UPDATE ON transaction_log
+    BEGIN
+        SELECT RAISE(ABORT, 'transaction_log is append-only');
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_transaction_log_no_delete BEFORE DELETE ON transaction_log
+    BEGIN
+        SELECT RAISE(ABORT, 'transaction_log is append-only');
+    END
+    """)
+
+    # Backfill transactions posted before the log was written
+    conn.execute("""
+    INSERT INTO transaction_log (transaction_id, account_no, transaction_type, transaction_amount,
+                                 transaction_date, transaction_description, transaction_status)
+    SELECT transaction_id, account_no, transaction_type, transaction_amount,
+           COALESCE(transaction_date, CURRENT_TIMESTAMP), transaction_description, transaction_status
+    FROM transactions
+    WHERE transaction_id NOT IN (SELECT transaction_id FROM transaction_log)
+    ORDER BY transaction_id
+    """)
+
+
+def _interest_runs(conn):
+    # One row per accrual run; last_account_no is the resume point (see interest.py)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS interest_runs (
+        run_date TEXT NOT NULL,
+        period TEXT NOT NULL,
+        last_account_no INTEGER NOT NULL DEFAULT 0,
+        accounts INTEGER NOT NULL DEFAULT 0,
+        total_interest REAL NOT NULL DEFAULT 0,
+        completed INTEGER NOT NULL DEFAULT 0,
+        started_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        finished_at TEXT,
+        PRIMARY KEY (run_date, period)
+    )
+    """)
+
+
+def _loan_aggregates(conn):
+    # Running per-loan aggregates maintained by the repayment engine (see loans.py)
+    for column in ("term_months INTEGER", "monthly_payment REAL", "outstanding_principal REAL",
+                   "principal_paid REAL NOT NULL DEFAULT 0", "interest_paid REAL NOT NULL DEFAULT 0",
+                   "total_paid REAL NOT NULL DEFAULT 0", "repayments INTEGER NOT NULL DEFAULT 0",
+                   "interest_periods INTEGER NOT NULL DEFAULT 0", "last_repayment_date TEXT", "next_due_date TEXT"):
+        conn.execute(f"ALTER TABLE loan ADD COLUMN {column}")
+
+    # Portfolio totals: GROUP BY status read from the index alone
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_loan_status ON loan (status, outstanding_principal, total_paid)")
+
+    # Delinquency and default sweeps: active loans, oldest due first
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_loan_status_due ON loan (status, next_due_date)")
+
+    # Loans of an account, repayments of a loan
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_loan_account ON loan (account_no)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_loan_repayment_loan_date ON loan_repayment (loan_id, repayment_date)")
+
+    # Fill them in for loans already there
+    loans.rebuild_aggregates(conn)
+
+
+def _password_hashes(conn):
+    # Replaces plaintext passwords with KDF hashes (see passwords.py). One KDF
+    # run per employee under the write lock, once.
+    employees = conn.execute("SELECT emp_id, passwords FROM employee").fetchall()
+    conn.executemany("UPDATE employee SET passwords = ? WHERE emp_id = ?",
+                     ((passwords.hash_password(password), emp_id)
+                      for emp_id, password in employees if not passwords.is_hashed(password)))
+
+
+def _transaction_browser(conn):
+    # Home branch of an account, for the Manager's transaction browser (NULL
+    # for accounts opened before branches were recorded)
+    conn.execute("ALTER TABLE accounts ADD COLUMN branch_id INTEGER REFERENCES branch (branch_id)")
+
+    # The browser pages by (transaction_date, transaction_id) on
+    # idx_transactions_date and filters as it goes, which stays fast while a
+    # filter keeps a fair share of the rows. The rare ones get small partial
+    # indexes in the same order instead: Pending/Failed transactions, and
+    # amounts of 10,000 and over (services.transaction_filter writes the
+    # matching WHERE terms), which everyday postings never touch.
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_transactions_exceptions ON transactions (transaction_status, transaction_date)
+    WHERE transaction_status != 'Completed'
+    """)
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_transactions_large ON transactions (transaction_date)
+    WHERE abs(transaction_amount) >= 10000
+    """)
+
+
+def _transaction_partitions(conn):
+    # Closed months archived out of the hot file, one partition file each (see
+    # partitions.py); file is relative to the database's directory
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS transaction_partitions (
+        month TEXT PRIMARY KEY NOT NULL,
+        file TEXT NOT NULL,
+        rows INTEGER NOT NULL,
+        first_id INTEGER,
+        last_id INTEGER,
+        archived_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+
+
+def _reference_data(conn):
+    # Salary band of each job title, which also decides the department a hire
+    # joins. Seeded with the figures the HR dashboard used to hard-code.
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS salary_band (
+        job_title TEXT PRIMARY KEY NOT NULL,
+        dep_id INTEGER NOT NULL REFERENCES department (dep_id),
+        salary REAL NOT NULL
+    )
+    """)
+    conn.executemany("INSERT OR IGNORE INTO salary_band (job_title, dep_id, salary) VALUES (?, ?, ?)", [
+        ("HR", 107, 15000),
+        ("Accountant", 101, 20000),
+        ("Manager", 102, 30000),
+        ("Finance", 103, 15000),
+        ("Security", 104, 5000),
+        ("Cleaner", 105, 5000),
+    ])
+
+    # Bumped by the triggers below on every change to a reference table, from
+    # any connection or process, so reference.ReferenceCache knows when to
+    # reload (PRAGMA data_version would change on every posting too)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS reference_versions (
+        name TEXT PRIMARY KEY NOT NULL,
+        version INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+    for table in ("branch", "department", "salary_band"):
+        conn.execute("INSERT OR IGNORE INTO reference_versions (name) VALUES (?)", (table,))
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{event.lower()} AFTER {event} ON {table}
+            BEGIN
+                UPDATE reference_versions SET version = version + 1 WHERE name = '{table}';
+            END
+            """)
+
+
+MIGRATIONS = [
+    (1, "initial schema", _initial_schema),
+    (2, "hot lookup indexes", _hot_lookup_indexes),
+    (3, "id sequences", _id_sequences),
+    (4, "metrics summary", _metrics_summary),
+    (5, "customer search", _customer_search),
+    (6, "transaction log", _transaction_log),
+    (7, "interest runs", _interest_runs),
+    (8, "loan aggregates", _loan_aggregates),
+    (9, "password hashes", _password_hashes),
+    (10, "transaction browser", _transaction_browser),
+    (11, "transaction partitions", _transaction_partitions),
+    (12, "reference data", _reference_data),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(pool=None):
+    pool = pool or db.get_pool()
+    applied = []
+
+    with pool.connection() as conn:
+        if schema_version(conn) >= SCHEMA_VERSION:
+            return applied
+
+        for version, name, migration in MIGRATIONS:
+            with pool.transaction(immediate=True):
+                # Re-check under the write lock, another process may have got here first
+                if schema_version(conn) >= version:
+                    continue
+                migration(conn)
+                conn.execute(f"PRAGMA user_version = {version}")
+            applied.append((version, name))
+
+    return applied
+
+
+def initialize_database():
+    # Safe to call on every start: creates a new database or upgrades an old one
+    return migrate()
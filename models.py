@@ -0,0 +1,202 @@
+import sqlite3
+from collections import OrderedDict
+from functools import partial
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, pyqtSignal
+
+import db
+import pages
+
+
+def format_amount(value):
+    return f"{value:,.2f}" if value is not None else ""
+
+
+def _read_page(pool, query, after_key, where, params, limit, prepare):
+    # Runs on a worker thread when the model has an executor: only its
+    # arguments, never the model, are touched here
+    with (pool or db.get_pool()).connection() as conn:
+        return pages.read_page(conn, query, after_key, where, params, limit, prepare)
+
+
+class LazySqlTableModel(QAbstractTableModel):
+    # Read-only table model that pages rows in from SQLite on demand.
+    #
+    # Pages are read with one of the keyset queries in pages.py (a
+    # pages.PageQuery), narrowed by `where`. The view grows the model through
+    # canFetchMore/fetchMore as the user scrolls, only `max_cached_pages`
+    # pages of rows are kept, and evicted pages are reloaded from their
+    # starting key when scrolled back into view. Cells are only formatted
+    # when the view asks for them, i.e. when they are visible.
+    #
+    # prepare(conn, after_key), if given, runs on the connection before each
+    # page is read (see pages.read_page), e.g. partitions.history_window to
+    # attach the archived months the page reaches.
+    #
+    # With an executor (workers.QueryExecutor) pages are read on its threads,
+    # so neither the queries nor the ATTACHes of prepare ever block the GUI:
+    # fetchMore returns at once and the rows are inserted when they arrive,
+    # and a row of an evicted page shows empty until its reload arrives. A
+    # result that a set_filter or refresh made out of date is dropped.
+    # Without one pages are read on the calling thread.
+    #
+    # `loaded` is emitted with the page number whenever a page's rows are in.
+    # Query errors cannot propagate out of Qt's virtual calls, so they are
+    # reported through the `error` signal and the page is treated as empty.
+
+    loaded = pyqtSignal(int)
+    error = pyqtSignal(str)
+
+    def __init__(self, headers, query, where=None, params=(), formatters=None, page_size=256, max_cached_pages=16,
+                 pool=None, prepare=None, executor=None, parent=None):
+        super().__init__(parent)
+        self.headers = headers
+        self.formatters = formatters or {}
+        self.page_size = page_size
+        self.max_cached_pages = max_cached_pages
+        self.pool = pool
+        self.executor = executor
+
+        self._key_width = len(query.key)
+        self._query = query
+        self._where = where
+        self._params = tuple(params)
+        self._prepare = prepare
+        # Bumped on every reset; results of older generations are dropped
+        self._generation = 0
+
+        self._reset_state()
+
+    def _reset_state(self):
+        self._pages = OrderedDict()
+        # _page_starts[i] is the key of the last row before page i (None for page 0)
+        self._page_starts = [None]
+        self._row_count = 0
+        self._exhausted = False
+        # Pages requested from the executor and not back yet
+        self._loading = set()
+        self._generation += 1
+
+    def set_filter(self, where=None, params=(), prepare=None):
+        self.beginResetModel()
+        self._where = where
+        self._params = tuple(params)
+        self._prepare = prepare
+        self._reset_state()
+        self.endResetModel()
+
+    def refresh(self):
+        self.beginResetModel()
+        self._reset_state()
+        self.endResetModel()
+
+    def _page_args(self, page):
+        return (self.pool, self._query, self._page_starts[page], self._where, self._params, self.page_size,
+                self._prepare)
+
+    def _load_page(self, page):
+        # Reads a page: on the executor, applied later by _page_read, or here
+        if self.executor is not None:
+            if page not in self._loading:
+                self._loading.add(page)
+                generation = self._generation
+                self.executor.submit((id(self), page), _read_page, self._page_args(page),
+                                     on_result=partial(self._page_read, generation, page),
+                                     on_error=partial(self._page_failed, generation, page))
+            return
+
+        try:
+            rows = _read_page(*self._page_args(page))
+        except (sqlite3.Error, ValueError) as e:
+            self._page_failed(self._generation, page, e)
+            return
+        self._page_read(self._generation, page, rows)
+
+    def _page_read(self, generation, page, rows):
+        if generation != self._generation:
+            return
+        self._loading.discard(page)
+        self._pages[page] = rows
+        self._pages.move_to_end(page)
+        while len(self._pages) > self.max_cached_pages:
+            self._pages.popitem(last=False)
+
+        first = page * self.page_size
+        if first < self._row_count:
+            # An evicted page reloaded; its rows are already in the model
+            last = min(self._row_count, first + self.page_size) - 1
+            self.dataChanged.emit(self.index(first, 0), self.index(last, len(self.headers) - 1))
+        else:
+            # The next page fetchMore asked for
+            if len(rows) < self.page_size:
+                self._exhausted = True
+            else:
+                self._page_starts.append(rows[-1][-self._key_width:])
+            if rows:
+                self.beginInsertRows(QModelIndex(), self._row_count, self._row_count + len(rows) - 1)
+                self._row_count += len(rows)
+                self.endInsertRows()
+        self.loaded.emit(page)
+
+    def _page_failed(self, generation, page, e):
+        if generation != self._generation:
+            return
+        self._loading.discard(page)
+        self._exhausted = True
+        self.error.emit(str(e))
+
+    def _row(self, row):
+        page = row // self.page_size
+        rows = self._pages.get(page)
+        if rows is None:
+            self._load_page(page)
+            rows = self._pages.get(page)
+            if rows is None:
+                return None
+        else:
+            self._pages.move_to_end(page)
+        offset = row % self.page_size
+        return rows[offset] if offset < len(rows) else None
+
+    def record(self, row):
+        # The raw column values of a loaded row (key columns appended), or
+        # None, also while its page is being reloaded
+        if not 0 <= row < self._row_count:
+            return None
+        return self._row(row)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        if role != Qt.DisplayRole:
+            return None
+
+        row = self._row(index.row())
+        if row is None:
+            return None
+
+        value = row[index.column()]
+        formatter = self.formatters.get(index.column())
+        return formatter(value) if formatter else str(value)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        # Not while the next page is on its way
+        return not parent.isValid() and not self._exhausted and len(self._page_starts) - 1 not in self._loading
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        self._load_page(len(self._page_starts) - 1)
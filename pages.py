@@ -0,0 +1,88 @@
+from collections import namedtuple
+
+import partitions
+
+# The keyset page queries behind the dashboards' tables (LazySqlTableModel in
+# models.py), kept free of Qt so that page loads can run on worker threads
+# and the query plans can be checked without a display (tests/).
+#
+# Rows are ordered by `key`, a list of column expressions that together are
+# unique (e.g. date then id), and every page is fetched with keyset
+# pagination: WHERE (key) > (last key of the previous page), or < when
+# descending, so a page deep into a table costs what the first one does.
+
+PageQuery = namedtuple("PageQuery", ["columns", "from_clause", "key", "descending"])
+
+EMPLOYEES = PageQuery(
+    ["e.emp_id", "e.emp_name", "e.job_title", "e.salary", "b.branch_name", "e.phone", "e.email",
+     "CASE WHEN e.job_title IS NULL THEN 'Fired' ELSE 'Active' END"],
+    "employee e LEFT JOIN branch b ON e.branch_id = b.branch_id",
+    ["e.emp_id"], False)
+
+# Ranked full-text matches, best first
+SEARCH_RESULTS = PageQuery(
+    ["a.account_no", "c.cust_name", "c.phone", "c.city", "a.account_type", "a.balance", "a.account_status"],
+    "customer_fts f JOIN customer c ON c.cust_id = f.rowid JOIN accounts a ON a.cust_id = c.cust_id",
+    ["f.rank", "a.account_no"], False)
+
+# One account's transactions, archived months included, newest first
+ACCOUNT_HISTORY = PageQuery(
+    ["t.transaction_date", "t.transaction_type", "t.transaction_amount", "t.transaction_description",
+     "t.transaction_status"],
+    f"temp.{partitions.HISTORY_VIEW} t",
+    ["t.transaction_date", "t.transaction_id"], True)
+
+# The Manager's transaction browser, filtered by services.transaction_filter
+TRANSACTIONS = PageQuery(
+    ["t.transaction_date", "t.account_no", "t.transaction_type", "t.transaction_amount",
+     "t.transaction_description", "t.transaction_status"],
+    f"temp.{partitions.HISTORY_VIEW} t",
+    ["t.transaction_date", "t.transaction_id"], True)
+
+EMPLOYEE_ACTIONS = PageQuery(
+    ["a.action_date", "a.emp_id", "a.action_type", "e.emp_name", "a.details"],
+    "employee_actions a JOIN employee e ON a.emp_id = e.emp_id",
+    ["a.action_date", "a.action_id"], True)
+
+
+def page_sql(query, where=None, keyed=False, limit=256):
+    # SELECT of one page: the query's columns then its key columns. With
+    # keyed, the key of the last row before the page is bound first, then
+    # the where clause's own parameters.
+    #
+    # The key bound goes first: given two bounds on the same column (a
+    # filter's date range and the key), SQLite ranges the index on the
+    # first, so otherwise every page re-reads the ones before it
+    conditions = []
+    if keyed:
+        placeholders = ", ".join("?" * len(query.key))
+        conditions.append(f"({', '.join(query.key)}) {'<' if query.descending else '>'} ({placeholders})")
+    if where:
+        conditions.append(f"({where})")
+
+    direction = " DESC" if query.descending else ""
+    sql = f"SELECT {', '.join(list(query.columns) + list(query.key))} FROM {query.from_clause}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY " + ", ".join(column + direction for column in query.key)
+    sql += f" LIMIT {limit}"
+    return sql
+
+
+def read_page(conn, query, after_key=None, where=None, params=(), limit=256, prepare=None):
+    # Up to `limit` rows after after_key (None for the first page).
+    #
+    # prepare(conn, after_key), if given, runs on the connection before the
+    # page is read, e.g. partitions.history_window to attach the archived
+    # months the page reaches. It may return a key the rows it made readable
+    # stop at: a page that comes up short of it is then continued below that
+    # key, with prepare called again.
+    rows = []
+    while True:
+        stop_key = prepare(conn, after_key) if prepare is not None else None
+        bound = tuple(after_key) if after_key is not None else ()
+        rows += conn.execute(page_sql(query, where, after_key is not None, limit - len(rows)),
+                             bound + tuple(params)).fetchall()
+        if len(rows) >= limit or stop_key is None:
+            return rows
+        after_key = stop_key
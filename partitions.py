@@ -0,0 +1,424 @@
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+from collections import namedtuple
+from contextlib import closing, contextmanager
+from datetime import datetime, timezone
+from urllib.request import pathname2url
+
+import db
+
+# Time-partitioned transaction storage.
+#
+# The live database (the hot file) keeps the transactions of the current
+# month. Each closed month is archived into a partition file of its own next
+# to it, <database>.YYYY-MM.db, holding the same table and indexes, recorded
+# in transaction_partitions and deleted from the hot file. The hot file's
+# indexes, backups and checkpoints so stay the size of about a month however
+# long the history, and everything that reads `transactions` unqualified
+# (postings, the dashboards' recent transactions, account lookups) touches
+# only the current partition.
+#
+# Archiving a month needs no transaction across two files (which WAL mode
+# does not make atomic): the month is copied into a .partial file from a read
+# snapshot of the hot file, synced and renamed into place, and only then
+# registered and deleted from the hot file in one transaction, after checking
+# that exactly the copied rows are deleted. A crash before that commit leaves
+# an unregistered file that the next run overwrites, so a row is always in
+# exactly one place for readers. The freed pages are then handed back to the
+# file system a batch at a time (incremental auto-vacuum, which a database
+# created before it needs one vacuum() to switch on). Postings are dated when
+# they commit, so closed months get no new rows; one that does (a restore
+# replaying an old posting) stays in the hot file, where every reader still
+# finds it. Only one archiver should run at a time.
+#
+# Registered partitions never change, so they are opened on demand:
+# connect() opens one read-only (statements, exports and audits stream
+# through the months one at a time), and history_window() ATTACHes the
+# months a newest-first page reaches to a connection and defines
+# temp.transaction_history, a UNION ALL view over them and the hot file. For
+# ORDER BY ... LIMIT SQLite merges the arms in index order, so a keyset page
+# over the view costs about what it does over a single table. At most
+# MAX_ATTACHED months are attached at once; the window moves along with the
+# pages however many months a range covers (pages.read_page).
+#
+# ArchiveService runs archive() daily inside the API server (api.py
+# --archive-interval); without one, schedule `python -m partitions archive`
+# or run it with --every.
+
+# Partition files attached to one connection at a time. SQLite allows 10
+# attached databases by default; one is left for callers' own ATTACHes.
+MAX_ATTACHED = 9
+
+HISTORY_VIEW = "transaction_history"
+
+COLUMNS = ("transaction_id, account_no, transaction_type, transaction_amount, transaction_date, "
+           "transaction_description, transaction_status")
+
+# path is absolute; first_id and last_id bound the month's transaction_ids
+Partition = namedtuple("Partition", ["month", "path", "rows", "first_id", "last_id", "archived_at"])
+
+_SCHEMA_PREFIX = "archive_"
+
+
+def current_month():
+    # UTC, like the CURRENT_TIMESTAMP transactions are dated with
+    return datetime.now(timezone.utc).strftime("%Y-%m")
+
+
+def next_month(month):
+    year, number = map(int, month.split("-"))
+    return f"{year + number // 12:04d}-{number % 12 + 1:02d}"
+
+
+def partition_path(db_name, month):
+    return f"{os.path.splitext(db_name)[0]}.{month}.db"
+
+
+def _database_dir(conn):
+    for _, name, path in conn.execute("PRAGMA database_list"):
+        if name == "main":
+            return os.path.dirname(path)
+    return ""
+
+
+def _uri(path):
+    return f"file:{pathname2url(os.path.abspath(path))}?mode=ro"
+
+
+def _schema(partition):
+    return _SCHEMA_PREFIX + partition.month.replace("-", "_")
+
+
+def archived(conn, start_date=None, end_date=None):
+    # Registered partitions, oldest first; with start_date/end_date
+    # ('YYYY-MM-DD', inclusive) only the months they reach
+    directory = _database_dir(conn)
+    rows = conn.execute("""
+    SELECT month, file, rows, first_id, last_id, archived_at FROM transaction_partitions
+    WHERE month >= ? AND month <= ?
+    ORDER BY month
+    """, (str(start_date)[:7] if start_date else "", str(end_date)[:7] if end_date else "9999-12"))
+    return [Partition(month, os.path.join(directory, file), count, first_id, last_id, archived_at)
+            for month, file, count, first_id, last_id, archived_at in rows]
+
+
+def connect(partition):
+    # A read-only connection to one partition file
+    return sqlite3.connect(_uri(partition.path), uri=True, isolation_level=None, check_same_thread=False)
+
+
+def attach(conn, partitions):
+    # Attaches partitions (read-only) to a pooled connection where they are
+    # not already, detaching other archived months to make room. Returns
+    # their schema names. Raises ValueError if they cannot all be attached.
+    if len(partitions) > MAX_ATTACHED:
+        raise ValueError(f"The range covers {len(partitions)} archived months, at most {MAX_ATTACHED} "
+                         f"can be read together; narrow the date range")
+    wanted = {_schema(partition): partition for partition in partitions}
+    attached = {name for _, name, _ in conn.execute("PRAGMA database_list") if name.startswith(_SCHEMA_PREFIX)}
+    excess = len(attached | wanted.keys()) - MAX_ATTACHED
+    for name in sorted(attached - wanted.keys()):
+        if excess <= 0:
+            break
+        try:
+            conn.execute(f"DETACH DATABASE {name}")
+            excess -= 1
+        except sqlite3.OperationalError:
+            # Read by the open transaction; it stays until that ends
+            continue
+    for name, partition in wanted.items():
+        if name not in attached:
+            conn.execute(f"ATTACH DATABASE ? AS {name}", (_uri(partition.path),))
+    return list(wanted)
+
+
+@contextmanager
+def attached(conn, partition):
+    # One partition attached for the duration; conn must not be inside a
+    # transaction that reads it when the block ends
+    name = attach(conn, [partition])[0]
+    try:
+        yield name
+    finally:
+        conn.execute(f"DETACH DATABASE {name}")
+
+
+def _define_view(conn, partitions):
+    names = attach(conn, partitions)
+    arms = [f"SELECT {COLUMNS} FROM main.transactions"] + [f"SELECT {COLUMNS} FROM {name}.transactions"
+                                                          for name in names]
+    sql = f"CREATE TEMP VIEW {HISTORY_VIEW} AS " + " UNION ALL ".join(arms)
+    current = conn.execute("SELECT sql FROM sqlite_temp_master WHERE type = 'view' AND name = ?",
+                           (HISTORY_VIEW,)).fetchone()
+    if current is None or current[0] != sql:
+        conn.execute(f"DROP VIEW IF EXISTS temp.{HISTORY_VIEW}")
+        conn.execute(sql)
+
+
+def history_window(conn, after_key=None, start_date=None, end_date=None):
+    # For newest-first keyset pages over temp.transaction_history, whatever
+    # the number of months: defines the view over the hot file and the newest
+    # MAX_ATTACHED archived months of start_date..end_date that are not newer
+    # than after_key, a (transaction_date, transaction_id) key. Returns the
+    # key the window stops at, the start of its oldest month, when older
+    # months remain (read on by calling again with it), else None. Cheap when
+    # nothing changed since the last call on the connection, so it can run
+    # before every page.
+    if after_key is not None and (end_date is None or str(after_key[0]) < str(end_date)):
+        end_date = after_key[0]
+    partitions = archived(conn, start_date, end_date)
+    window = partitions[-MAX_ATTACHED:]
+    _define_view(conn, window)
+    if len(window) < len(partitions):
+        return f"{window[0].month}-01", 0
+    return None
+
+
+def copy_files(paths, target_dir):
+    # Copies partition files into target_dir, skipping those already there
+    # (a registered partition never changes). Returns the number copied.
+    copied = 0
+    for path in paths:
+        target = os.path.join(target_dir, os.path.basename(path))
+        if os.path.exists(target):
+            continue
+        shutil.copyfile(path, target + ".partial")
+        os.replace(target + ".partial", target)
+        copied += 1
+    return copied
+
+
+def registered_files(conn):
+    # File names registered in a database opened directly (a snapshot being
+    # restored); none before the partitions migration
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'transaction_partitions'").fetchone() is None:
+        return []
+    return [row[0] for row in conn.execute("SELECT file FROM transaction_partitions ORDER BY month")]
+
+
+def _sync_directory(path):
+    # Makes a rename durable; directories cannot be opened on Windows
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _build(pool, month, path):
+    # Writes the month's transactions to a new partition file at path;
+    # returns (rows, first_id, last_id) as of the snapshot they were read in
+    start, end = f"{month}-01", f"{next_month(month)}-01"
+    partial = path + ".partial"
+    if os.path.exists(partial):
+        os.remove(partial)
+
+    with pool.connection() as conn:
+        ddl = conn.execute("""
+        SELECT type, sql FROM sqlite_master
+        WHERE tbl_name = 'transactions' AND type IN ('table', 'index') AND sql IS NOT NULL
+        """).fetchall()
+        with closing(sqlite3.connect(partial, isolation_level=None)) as archive:
+            for kind, sql in ddl:
+                if kind == "table":
+                    archive.execute(sql)
+
+        conn.execute("ATTACH DATABASE ? AS archive_build", (partial,))
+        try:
+            # A scratch file until renamed: no journal, synced once at the end
+            conn.execute("PRAGMA archive_build.journal_mode = OFF")
+            conn.execute("PRAGMA archive_build.synchronous = OFF")
+            with pool.transaction():
+                conn.execute(f"""
+                INSERT INTO archive_build.transactions ({COLUMNS})
+                SELECT {COLUMNS} FROM main.transactions
+                WHERE transaction_date >= ? AND transaction_date < ?
+                ORDER BY transaction_id
+                """, (start, end))
+                summary = conn.execute("""
+                SELECT COUNT(*), MIN(transaction_id), MAX(transaction_id) FROM archive_build.transactions
+                """).fetchone()
+        finally:
+            conn.execute("DETACH DATABASE archive_build")
+
+    with closing(sqlite3.connect(partial, isolation_level=None)) as archive:
+        archive.execute("PRAGMA synchronous = FULL")
+        archive.execute("BEGIN")
+        for kind, sql in ddl:
+            if kind == "index":
+                archive.execute(sql)
+        archive.execute("ANALYZE")
+        archive.execute("COMMIT")
+    os.replace(partial, path)
+    _sync_directory(path)
+    return summary
+
+
+def archive_month(month, pool=None):
+    # Moves one closed month out of the hot file; returns its Partition
+    pool = pool or db.get_pool()
+    if month >= current_month():
+        raise ValueError(f"{month} is not a closed month")
+    path = partition_path(pool.db_name, month)
+    rows, first_id, last_id = _build(pool, month, path)
+
+    with pool.transaction(immediate=True) as conn:
+        conn.execute("""
+        INSERT INTO transaction_partitions (month, file, rows, first_id, last_id)
+        VALUES (?, ?, ?, ?, ?)
+        """, (month, os.path.basename(path), rows, first_id, last_id))
+        deleted = conn.execute("""
+        DELETE FROM transactions
+        WHERE transaction_date >= ? AND transaction_date < ? AND transaction_id <= ?
+        """, (f"{month}-01", f"{next_month(month)}-01", last_id)).rowcount
+        if deleted != rows:
+            raise RuntimeError(f"{month}: {rows} transactions archived but {deleted} would be deleted")
+    with pool.connection() as conn:
+        return archived(conn, f"{month}-01", f"{month}-01")[0]
+
+
+def release_space(pool=None, step_pages=2048, pause=0.5):
+    # Truncates free pages off the hot file, step_pages per write transaction
+    # with pauses in between (see audit.copy_pending). Returns the number of
+    # pages released; none unless the file uses incremental auto-vacuum.
+    pool = pool or db.get_pool()
+    released = 0
+    with pool.connection() as conn:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return 0
+        while True:
+            start = time.perf_counter()
+            with pool.transaction(immediate=True):
+                free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                conn.execute(f"PRAGMA incremental_vacuum({step_pages})").fetchall()
+            released += min(free, step_pages)
+            if free <= step_pages:
+                return released
+            if pause:
+                time.sleep((time.perf_counter() - start) * pause)
+
+
+def vacuum(pool=None):
+    # One full VACUUM that also switches the hot file to incremental
+    # auto-vacuum. Blocks every writer while it runs.
+    pool = pool or db.get_pool()
+    with pool.connection() as conn:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+
+
+def archive(before=None, pool=None, on_progress=None):
+    # Archives every month before `before` ('YYYY-MM', default the current
+    # month) still in the hot file, oldest first, then releases the space
+    # they took. Returns the new Partitions. on_progress(partition, seconds)
+    # is called after each month.
+    import audit  # audit imports this module
+
+    pool = pool or db.get_pool()
+    before = before or current_month()
+    # Every row must be in the audit trail before it leaves the hot file
+    audit.copy_pending(pool)
+
+    done = []
+    month = ""
+    while True:
+        # The next month with rows still in the hot file, off the date index
+        with pool.connection() as conn:
+            first = conn.execute("""
+            SELECT MIN(transaction_date) FROM transactions WHERE transaction_date >= ? AND transaction_date < ?
+            """, (f"{month}-01" if month else "", f"{before}-01")).fetchone()[0]
+            if first is None:
+                break
+            month = first[:7]
+            registered = conn.execute("SELECT 1 FROM transaction_partitions WHERE month = ?", (month,)).fetchone()
+        if not registered:
+            start = time.perf_counter()
+            done.append(archive_month(month, pool))
+            if on_progress is not None:
+                on_progress(done[-1], time.perf_counter() - start)
+        month = next_month(month)
+
+    if done:
+        release_space(pool)
+    return done
+
+
+class ArchiveService:
+    # Archives closed months every `interval` seconds on a background thread
+    # until closed. The last failure, if any, is kept in `error`.
+
+    def __init__(self, interval=86400.0, pool=None):
+        self.interval = interval
+        self.pool = pool
+
+        self._stop = threading.Event()
+        self._thread = None
+        self.last = []
+        self.error = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="archive", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.last = archive(pool=self.pool)
+                self.error = None
+            except Exception as e:
+                self.error = e
+            self._stop.wait(self.interval)
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive closed months of transactions into partition files.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    move = commands.add_parser("archive", help="archive the closed months still in the live database")
+    move.add_argument("--before", help="archive months before this one, YYYY-MM (default: the current month)")
+    move.add_argument("--every", type=float, help="keep running, archiving every EVERY seconds")
+
+    commands.add_parser("list", help="list the archived months")
+    commands.add_parser("vacuum", help="compact the live database and switch it to incremental auto-vacuum "
+                                       "(blocks postings while it runs)")
+    args = parser.parse_args(argv)
+
+    if args.command == "vacuum":
+        vacuum()
+        return 0
+    if args.command == "list":
+        with db.connection() as conn:
+            for partition in archived(conn):
+                print(f"{partition.month}  {partition.rows:>10,} transactions  {partition.path}")
+        return 0
+
+    def report(partition, seconds):
+        print(f"{partition.month}: {partition.rows:,} transactions -> {partition.path} in {seconds:.1f}s")
+
+    while True:
+        archive(args.before, on_progress=report)
+        if args.every is None:
+            return 0
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    from migrations import initialize_database
+    initialize_database()
+    sys.exit(main())
@@ -0,0 +1,161 @@
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+# Employee passwords are stored as self-describing KDF hashes:
+#
+#   scrypt$<n>$<r>$<p>$<salt>$<hash>
+#   pbkdf2_sha256$<iterations>$<salt>$<hash>
+#
+# (salt and hash base64). New hashes use SCHEME with the parameters below;
+# hashes made with other parameters still verify, and needs_rehash() tells the
+# caller to store a fresh one after the next successful login, so raising the
+# cost applies gradually. The KDF takes tens of milliseconds on purpose, so
+# callers must not run it on the GUI thread (hashlib releases the GIL while
+# it runs, so it does not hold up other threads either).
+
+SCHEME = "scrypt" if hasattr(hashlib, "scrypt") else "pbkdf2_sha256"
+
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+PBKDF2_ITERATIONS = 600000
+
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+
+class TooManyAttempts(Exception):
+    # Login refused without checking the password; the message is meant for
+    # the user as-is.
+    pass
+
+
+def _b64encode(data):
+    return base64.b64encode(data).decode("ascii")
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r, dklen=HASH_BYTES)
+
+
+def _pbkdf2(password, salt, iterations):
+    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations, dklen=HASH_BYTES)
+
+
+def hash_password(password):
+    salt = os.urandom(SALT_BYTES)
+    if SCHEME == "scrypt":
+        digest = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+        return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64encode(salt)}${_b64encode(digest)}"
+    digest = _pbkdf2(password, salt, PBKDF2_ITERATIONS)
+    return f"pbkdf2_sha256${PBKDF2_ITERATIONS}${_b64encode(salt)}${_b64encode(digest)}"
+
+
+def is_hashed(stored):
+    return stored.startswith(("scrypt$", "pbkdf2_sha256$"))
+
+
+def verify_password(password, stored):
+    # Constant-time comparison of the derived key; False for anything that
+    # is not a well-formed hash, including a leftover plaintext password
+    try:
+        scheme, *fields = stored.split("$")
+        if scheme == "scrypt":
+            n, r, p, salt, expected = fields
+            digest = _scrypt(password, base64.b64decode(salt), int(n), int(r), int(p))
+        elif scheme == "pbkdf2_sha256":
+            iterations, salt, expected = fields
+            digest = _pbkdf2(password, base64.b64decode(salt), int(iterations))
+        else:
+            return False
+        return hmac.compare_digest(digest, base64.b64decode(expected))
+    except (ValueError, TypeError):
+        return False
+
+
+def needs_rehash(stored):
+    if SCHEME == "scrypt":
+        return not stored.startswith(f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}$")
+    return not stored.startswith(f"pbkdf2_sha256${PBKDF2_ITERATIONS}$")
+
+
+_dummy_hash = None
+
+
+def dummy_hash():
+    # Verified against when the username does not exist, so an unknown user
+    # costs the same KDF run as a wrong password and timing does not reveal
+    # which usernames are valid. Computed once.
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = hash_password(_b64encode(os.urandom(SALT_BYTES)))
+    return _dummy_hash
+
+
+class FailureCache:
+    # In-memory record of recent failed logins per key (the username as typed).
+    # After max_failures failures in a row the key is locked for lockout
+    # seconds, doubling with every further failure up to max_lockout, and
+    # check() refuses it before any KDF runs, so guessing cannot burn CPU. A
+    # success clears the key. At most max_entries keys are tracked, least
+    # recently failed dropped first, so spraying usernames cannot grow it
+    # without bound. Spraying cannot burn CPU either: once max_global_failures
+    # logins have failed within global_window seconds, whatever the username,
+    # check() refuses every key until the oldest of them is that old.
+
+    def __init__(self, max_failures=5, lockout=30.0, max_lockout=900.0, max_entries=10000,
+                 max_global_failures=50, global_window=60.0, clock=time.monotonic):
+        self.max_failures = max_failures
+        self.lockout = lockout
+        self.max_lockout = max_lockout
+        self.max_entries = max_entries
+        self.global_window = global_window
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        # key: [failures, locked_until]
+        self._entries = OrderedDict()
+        # Times of the latest failures, any key
+        self._recent = deque(maxlen=max_global_failures)
+
+    def check(self, key):
+        # Raises TooManyAttempts while key is locked out, or while the global
+        # failure budget is spent
+        with self._lock:
+            now = self.clock()
+            entry = self._entries.get(key)
+            remaining = entry[1] - now if entry else 0
+            if len(self._recent) == self._recent.maxlen:
+                remaining = max(remaining, self._recent[0] + self.global_window - now)
+        if remaining > 0:
+            raise TooManyAttempts(f"Too many failed attempts, try again in {int(remaining) + 1} seconds")
+
+    def failed(self, key):
+        with self._lock:
+            self._recent.append(self.clock())
+            entry = self._entries.pop(key, None) or [0, 0.0]
+            entry[0] += 1
+            excess = entry[0] - self.max_failures
+            if excess >= 0:
+                entry[1] = self.clock() + min(self.max_lockout, self.lockout * 2 ** excess)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def succeeded(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._recent.clear()
+
+
+failures = FailureCache()
@@ -0,0 +1,78 @@
+import threading
+import time
+
+import db
+
+# Branches, departments and salary bands change a few times a year but are
+# read by every dashboard, the API and every hire. ReferenceCache loads them
+# once per database and serves them from memory. Triggers from migration 12
+# bump a counter in reference_versions on any change to one of the tables,
+# whoever makes it (this process, another one, plain SQL), so a read checks
+# that one small table at most every check_interval seconds and reloads only
+# the tables whose counter moved. Values are tuples; callers get copies.
+
+_QUERIES = {
+    "branch": "SELECT branch_id, branch_name FROM branch ORDER BY branch_id",
+    "department": "SELECT dep_id, dep_name FROM department ORDER BY dep_id",
+    "salary_band": "SELECT job_title, dep_id, salary FROM salary_band ORDER BY job_title",
+}
+
+
+class ReferenceCache:
+    def __init__(self, pool, check_interval=1.0, clock=time.monotonic):
+        self.pool = pool
+        self.check_interval = check_interval
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        # name: rows, and the version they were loaded at
+        self._rows = {}
+        self._versions = {}
+        self._checked = None
+
+    def _refresh(self):
+        # Versions and rows from one snapshot, so a change committed in
+        # between is picked up by the next check rather than missed
+        with self.pool.transaction() as conn:
+            versions = dict(conn.execute("SELECT name, version FROM reference_versions").fetchall())
+            for name, sql in _QUERIES.items():
+                if name not in self._rows or versions.get(name) != self._versions.get(name):
+                    self._rows[name] = tuple(conn.execute(sql).fetchall())
+            self._versions = versions
+
+    def get(self, name):
+        with self._lock:
+            now = self.clock()
+            if self._checked is None or now - self._checked >= self.check_interval:
+                self._refresh()
+                self._checked = now
+            return self._rows[name]
+
+
+# One cache per pool, i.e. per database file
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(pool=None):
+    pool = pool or db.get_pool()
+    with _caches_lock:
+        cache = _caches.get(pool)
+        if cache is None:
+            cache = _caches[pool] = ReferenceCache(pool)
+        return cache
+
+
+def branches(pool=None):
+    # [(branch_id, branch_name), ...]
+    return list(get_cache(pool).get("branch"))
+
+
+def departments(pool=None):
+    # {dep_id: dep_name}
+    return dict(get_cache(pool).get("department"))
+
+
+def salary_bands(pool=None):
+    # {job_title: (dep_id, salary)}
+    return {job_title: (dep_id, salary) for job_title, dep_id, salary in get_cache(pool).get("salary_band")}
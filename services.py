@@ -0,0 +1,319 @@
+import re
+import secrets
+
+import audit
+import db
+import ids
+import ledger
+import metrics
+import passwords
+import reference
+
+# Teller and back-office operations without any Qt dependency, so they can run
+# on worker threads (see workers.QueryExecutor) or be driven by other clients.
+# Input validation that belongs to a form stays in the dashboards; database
+# errors propagate to the caller.
+
+ACCOUNT_TYPES = ("Savings", "Checking", "Business")
+
+GENDERS = ("M", "F")
+
+TRANSACTION_TYPES = ("Deposit", "Withdrawal", "Transfer")
+TRANSACTION_STATUSES = ("Completed", "Pending", "Failed")
+
+# Transaction browser amount bands: label -> (low, high), high exclusive, on
+# the absolute amount (outgoing transfer legs are negative)
+AMOUNT_BANDS = {
+    "Under 100": (None, 100),
+    "100 - 999.99": (100, 1000),
+    "1,000 - 9,999.99": (1000, 10000),
+    "10,000 and over": (10000, None),
+}
+
+# The WHERE clauses of the partial indexes from migration 10; a query only
+# uses one if it repeats the clause word for word
+_EXCEPTIONS_INDEX_TERM = "t.transaction_status != 'Completed'"
+_LARGE_AMOUNT = 10000
+_LARGE_INDEX_TERM = f"abs(t.transaction_amount) >= {_LARGE_AMOUNT}"
+
+
+def authenticate(username, password):
+    # (emp_id, emp_name, dep_id, job_title), or None. Raises
+    # passwords.TooManyAttempts while the username is locked out after
+    # repeated failures. Runs the KDF, so keep it off the GUI thread.
+    passwords.failures.check(username)
+
+    # The connection goes back to the pool before the KDF runs
+    with db.connection() as conn:
+        employee = conn.execute("""
+        SELECT emp_id, emp_name, dep_id, job_title, passwords FROM employee
+        WHERE username = ?
+        """, (username,)).fetchone()
+
+    # An unknown username costs the same KDF run as a wrong password
+    stored = employee[4] if employee else passwords.dummy_hash()
+    if not passwords.verify_password(password, stored) or employee is None:
+        passwords.failures.failed(username)
+        return None
+    passwords.failures.succeeded(username)
+
+    if passwords.needs_rehash(stored):
+        # Hashed with older parameters: store one with the current ones
+        rehashed = passwords.hash_password(password)
+        with db.transaction() as conn:
+            conn.execute("UPDATE employee SET passwords = ? WHERE emp_id = ? AND passwords = ?",
+                         (rehashed, employee[0], stored))
+
+    return employee[:4]
+
+
+def load_branches():
+    # Reference data is served from memory (see reference.py)
+    return reference.branches()
+
+
+def load_departments():
+    return reference.departments()
+
+
+def load_salary_bands():
+    return reference.salary_bands()
+
+
+def new_credentials(emp_name):
+    # (emp_id, username, password, password_hash) for a new employee. The ID
+    # and the KDF both stay outside the write transaction that inserts them.
+
+    # Allocate employee ID (unique, so the username built from it is too)
+    emp_id = ids.next_emp_id()
+
+    # Generate username and random password
+    username = f"{emp_name.split()[0].lower()}{emp_id}"
+    password = str(100000 + secrets.randbelow(900000))
+    return emp_id, username, password, passwords.hash_password(password)
+
+
+def apply_hire(conn, hired_by, emp_id, username, password_hash, emp_name, gender, branch_id, job_title, salary,
+               dob, phone, city, address, email):
+    # Insert employee, into the department of the job title's salary band
+    cursor = conn.execute("""
+    INSERT INTO employee (emp_id, emp_name, gender, dep_id, branch_id, job_title, salary, dbo, phone, city, address, email, username, passwords)
+    SELECT ?, ?, ?, dep_id, ?, job_title, ?, ?, ?, ?, ?, ?, ?, ? FROM salary_band WHERE job_title = ?
+    """, (emp_id, emp_name, gender, branch_id, salary, dob, phone, city, address, email, username, password_hash,
+          job_title))
+    if cursor.rowcount != 1:
+        raise ValueError(f"Unknown job title: {job_title}")
+
+    # Insert into employee_branch
+    conn.execute("INSERT INTO employee_branch (emp_id, branch_id) VALUES (?, ?)", (emp_id, branch_id))
+
+    # Log the action
+    conn.execute("""
+    INSERT INTO employee_actions (emp_id, action_type, details)
+    VALUES (?, ?, ?)
+    """, (hired_by, "Hire", f"Hired {emp_name} as {job_title}"))
+
+
+def hire_employee(hired_by, emp_name, gender, branch_id, job_title, salary, dob, phone, city, address, email):
+    # Returns (emp_id, username, password)
+    emp_id, username, password, password_hash = new_credentials(emp_name)
+
+    with db.transaction() as conn:
+        apply_hire(conn, hired_by, emp_id, username, password_hash, emp_name, gender, branch_id, job_title, salary,
+                   dob, phone, city, address, email)
+
+    return emp_id, username, password
+
+
+def apply_fire(conn, fired_by, emp_id):
+    # Get employee name before firing
+    result = conn.execute("SELECT emp_name FROM employee WHERE emp_id = ?", (emp_id,)).fetchone()
+    if not result:
+        return None
+
+    emp_name = result[0]
+
+    # Fire employee (set job_title to NULL)
+    conn.execute("UPDATE employee SET job_title = NULL WHERE emp_id = ?", (emp_id,))
+
+    # Log the action
+    conn.execute("""
+    INSERT INTO employee_actions (emp_id, action_type, details)
+    VALUES (?, ?, ?)
+    """, (fired_by, "Fire", f"Fired {emp_name} (ID: {emp_id})"))
+
+    return emp_name
+
+
+def fire_employee(fired_by, emp_id):
+    # Returns the fired employee's name, or None if there is no such employee
+    with db.transaction() as conn:
+        return apply_fire(conn, fired_by, emp_id)
+
+
+def apply_account_opening(conn, cust_id, account_no, cust_name, dob, phone, city, address, email, account_type,
+                          initial_deposit=0.0, branch_id=None):
+    # Insert customer
+    conn.execute("""
+    INSERT INTO customer (cust_id, cust_name, dob, phone, city, address, email)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (cust_id, cust_name, dob, phone, city, address, email))
+
+    # Insert account
+    conn.execute("""
+    INSERT INTO accounts (account_no, cust_id, balance, account_type, branch_id)
+    VALUES (?, ?, ?, ?, ?)
+    """, (account_no, cust_id, initial_deposit, account_type, branch_id))
+
+    # If initial deposit > 0, create transaction
+    if initial_deposit > 0:
+        conn.execute("""
+        INSERT INTO transactions (account_no, transaction_type, transaction_amount, transaction_description, transaction_status)
+        VALUES (?, ?, ?, ?, ?)
+        """, (account_no, "Deposit", initial_deposit, "Initial deposit", "Completed"))
+
+
+def create_account(cust_name, dob, phone, city, address, email, account_type, initial_deposit=0.0,
+                   branch_id=None):
+    # Returns (cust_id, account_no)
+    if initial_deposit != 0:
+        # Rejects inf, NaN and negative deposits before any id is allocated
+        ledger.check_amount(initial_deposit)
+    cust_id = ids.next_cust_id()
+    account_no = ids.next_account_no()
+
+    with db.transaction() as conn:
+        apply_account_opening(conn, cust_id, account_no, cust_name, dob, phone, city, address, email, account_type,
+                              initial_deposit, branch_id)
+
+    if initial_deposit > 0:
+        audit.notify()
+
+    return cust_id, account_no
+
+
+# Columns shown for each match; account rows, best-ranked customer first
+SEARCH_COLUMNS = """
+a.account_no, c.cust_name, c.phone, c.city, a.account_type, a.balance, a.account_status
+"""
+
+
+def customer_match_query(search_term):
+    # FTS5 query matching every word of search_term as a prefix ("abe*"),
+    # quoted so punctuation in emails or phone numbers is not parsed as
+    # query syntax. None if the term has no searchable words.
+    words = re.findall(r"\w+", search_term)
+    if not words:
+        return None
+
+    terms = []
+    for word in words:
+        # phone is an INTEGER column, so stored numbers have lost their leading zeros
+        stripped = word.lstrip("0")
+        if word.isdigit() and stripped and stripped != word:
+            terms.append(f'("{word}"* OR "{stripped}"*)')
+        else:
+            terms.append(f'"{word}"*')
+    return " ".join(terms)
+
+
+def search_accounts(search_term, limit=20, offset=0):
+    # [(account_no, cust_name, phone, city, account_type, balance, status), ...]
+    # for customers whose name, email, phone or city match, best match first.
+    # Pages are by customer, each followed by all of its accounts.
+    query = customer_match_query(search_term)
+    if query is None:
+        return []
+
+    with db.connection() as conn:
+        return conn.execute(f"""
+        SELECT {SEARCH_COLUMNS}
+        FROM (
+            SELECT rowid AS cust_id, rank FROM customer_fts
+            WHERE customer_fts MATCH ?
+            ORDER BY rank
+            LIMIT ? OFFSET ?
+        ) m
+        JOIN customer c ON c.cust_id = m.cust_id
+        JOIN accounts a ON a.cust_id = c.cust_id
+        ORDER BY m.rank, a.account_no
+        """, (query, limit, offset)).fetchall()
+
+
+def find_account(search_term):
+    # (account_no, cust_name, balance, account_type, opened_date, status), or None
+    with db.connection() as conn:
+        # Try to search by account number first
+        if search_term.isdigit():
+            account = conn.execute("""
+            SELECT a.account_no, c.cust_name, a.balance, a.account_type, a.opened_date, a.account_status
+            FROM accounts a
+            JOIN customer c ON a.cust_id = c.cust_id
+            WHERE a.account_no = ?
+            """, (int(search_term),)).fetchone()
+            if account:
+                return account
+
+        # Otherwise the best-ranked full-text match (name, email, phone or city)
+        query = customer_match_query(search_term)
+        if query is None:
+            return None
+        return conn.execute("""
+        SELECT a.account_no, c.cust_name, a.balance, a.account_type, a.opened_date, a.account_status
+        FROM customer_fts f
+        JOIN customer c ON c.cust_id = f.rowid
+        JOIN accounts a ON a.cust_id = c.cust_id
+        WHERE customer_fts MATCH ?
+        ORDER BY f.rank, a.account_no
+        LIMIT 1
+        """, (query,)).fetchone()
+
+
+def transaction_filter(start_date=None, end_date=None, branch_id=None, transaction_type=None, status=None,
+                       amount_band=None):
+    # (where, params) over `transactions t` for the Manager's transaction
+    # browser; None for a filter that is not set. Dates are 'YYYY-MM-DD' and
+    # inclusive, amount_band is a key of AMOUNT_BANDS, branch_id is the
+    # account's home branch. Pages stay in (transaction_date, transaction_id)
+    # order on one of the date-ordered indexes whatever is combined, so
+    # keyset pages cost the same at any depth.
+    conditions = []
+    params = []
+    if start_date is not None:
+        conditions.append("t.transaction_date >= ?")
+        params.append(start_date)
+    if end_date is not None:
+        conditions.append("t.transaction_date < date(?, '+1 day')")
+        params.append(end_date)
+    if branch_id is not None:
+        # One primary-key lookup per row scanned, no join for the planner to reorder
+        conditions.append("(SELECT a.branch_id FROM accounts a WHERE a.account_no = t.account_no) = ?")
+        params.append(branch_id)
+    if transaction_type is not None:
+        conditions.append("t.transaction_type = ?")
+        params.append(transaction_type)
+    if status is not None:
+        if status != "Completed":
+            # Lets idx_transactions_exceptions be used
+            conditions.append(_EXCEPTIONS_INDEX_TERM)
+        conditions.append("t.transaction_status = ?")
+        params.append(status)
+    if amount_band is not None:
+        low, high = AMOUNT_BANDS[amount_band]
+        if low is not None and low >= _LARGE_AMOUNT:
+            # Lets idx_transactions_large be used
+            conditions.append(_LARGE_INDEX_TERM)
+        if low is not None:
+            conditions.append("abs(t.transaction_amount) >= ?")
+            params.append(low)
+        if high is not None:
+            conditions.append("abs(t.transaction_amount) < ?")
+            params.append(high)
+    return " AND ".join(conditions) or None, tuple(params)
+
+
+def load_metrics():
+    # Returns (total_employees, total_accounts, total_balance, [(dep_name, count), ...])
+    # from the trigger-maintained summary tables, not full scans
+    with db.connection() as conn:
+        return metrics.load(conn)
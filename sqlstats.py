@@ -0,0 +1,425 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from bisect import bisect_left as _bisect
+from collections import OrderedDict, deque, namedtuple
+from time import perf_counter
+
+# Per-statement SQL statistics for every pooled connection: call counts,
+# latency histograms, rows and errors, time spent waiting for the write lock,
+# and a log of slow statements with their EXPLAIN QUERY PLAN. enable() must
+# run before the pool opens its first connection (db.ConnectionPool creates
+# instrumented connections only while it is enabled); when it is off,
+# connections are plain sqlite3 ones and cost nothing.
+#
+# Every statement is timed and checked against the slow threshold, so no
+# slow statement goes unlogged. Adding it to the per-statement aggregates
+# (normalizing the text, taking the stats lock) costs more than the timing,
+# so that part is sampled in windows: for `duty` of every `period` seconds
+# statements are recorded, the rest of the time only timed. duty=1 records
+# every statement (benchmarks/bench_sqlstats.py measures both). Counts and
+# totals are of the recorded windows only.
+#
+# A statement's latency is its execute() plus every fetch on its cursor,
+# `for row in cursor` included, recorded once its rows are exhausted, or
+# when the cursor is closed, reused or dropped. A slow statement's EXPLAIN
+# QUERY PLAN is taken on the thread running it while it still holds the
+# connection: at execute() when that alone is slow, else when its last row
+# is fetched or its cursor closed. A cursor dropped with rows unread may be
+# collected after its connection went back to the pool, so its slow
+# statement is logged without a plan. Statements are grouped by their text
+# with whitespace collapsed and literals replaced by ?; the raw texts seen
+# are kept in an LRU of MAX_TEXTS, as literals inlined into SQL make them
+# unbounded.
+#
+# Lock wait is the time spent in BEGIN IMMEDIATE/EXCLUSIVE (where WAL writers
+# queue for the write lock); a statement that gives up with "database is
+# locked" counts as a lock timeout.
+
+DUTY = 0.05
+PERIOD = 2.0
+
+# Raw statement texts whose normalized form is remembered
+MAX_TEXTS = 1024
+
+# Upper bounds in seconds of the latency histogram buckets (plus +Inf)
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# at: time.time() when it finished
+SlowQuery = namedtuple("SlowQuery", ["sql", "seconds", "rows", "plan", "at"])
+
+# Statements EXPLAIN QUERY PLAN can describe
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+_LOCKING = ("BEGIN IMMEDIATE", "BEGIN EXCLUSIVE")
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACE = re.compile(r"\s+")
+
+
+def _log():
+    # logging is imported on first use: it takes longer to import than the
+    # rest of this module, and app startup only needs it once a query is slow
+    import logging
+    return logging.getLogger("timebank.sql")
+
+
+class StatementStats:
+    __slots__ = ("sql", "calls", "seconds", "rows", "errors", "buckets")
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.calls = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.errors = 0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+    def copy(self):
+        copy = StatementStats(self.sql)
+        copy.calls, copy.seconds, copy.rows, copy.errors = self.calls, self.seconds, self.rows, self.errors
+        copy.buckets = list(self.buckets)
+        return copy
+
+    def percentile(self, p):
+        # Upper bound of the bucket holding the p-th latency (inf past the last)
+        rank = p * self.calls
+        seen = 0
+        for bound, count in zip(BUCKETS + (float("inf"),), self.buckets):
+            seen += count
+            if seen >= rank and count:
+                return bound
+        return 0.0
+
+
+_enabled = False
+_slow_threshold = 0.1
+_duty = DUTY
+_recording = True
+# Bumped by enable()/disable() so an old window thread stops
+_generation = 0
+_lock = threading.Lock()
+# Raw statement text -> (stats, locking), least recently used first; texts
+# differing only in literals share one stats
+_by_text = OrderedDict()
+_by_key = {}
+_slow = deque(maxlen=100)
+# [seconds, waits, timeouts]
+_lock_wait = [0.0, 0, 0]
+
+
+def enable(slow_threshold=0.1, duty=DUTY, period=PERIOD):
+    # Statements slower than slow_threshold seconds are logged with their plan
+    global _enabled, _slow_threshold, _duty, _generation, _recording
+    _slow_threshold = slow_threshold
+    _duty = min(max(duty, 0.0), 1.0)
+    _enabled = True
+    _generation += 1
+    _recording = True
+    if _duty < 1.0:
+        threading.Thread(target=_windows, args=(_generation, period), name="sqlstats-windows",
+                         daemon=True).start()
+
+
+def disable():
+    # Connections already open stay instrumented but stop recording
+    global _enabled, _generation, _recording
+    _enabled = False
+    _generation += 1
+    _recording = False
+
+
+def enabled():
+    return _enabled
+
+
+def duty():
+    # Fraction of the time statements are recorded
+    return _duty
+
+
+def _windows(generation, period):
+    global _recording
+    while generation == _generation:
+        _recording = True
+        time.sleep(period * _duty)
+        if generation != _generation:
+            break
+        _recording = False
+        time.sleep(period * (1 - _duty))
+
+
+def reset():
+    with _lock:
+        _by_text.clear()
+        _by_key.clear()
+        _slow.clear()
+        _lock_wait[:] = [0.0, 0, 0]
+
+
+def normalize(sql):
+    return _SPACE.sub(" ", _LITERALS.sub("?", sql)).strip()
+
+
+def _entry_for(sql):
+    # (stats, whether it waits for the write lock); called with _lock held
+    key = normalize(sql)
+    stats = _by_key.get(key)
+    if stats is None:
+        stats = _by_key[key] = StatementStats(key)
+    entry = _by_text[sql] = (stats, key.upper().startswith(_LOCKING))
+    if len(_by_text) > MAX_TEXTS:
+        _by_text.popitem(last=False)
+    return entry
+
+
+def _observe(sql, seconds, rows, error=None):
+    with _lock:
+        entry = _by_text.get(sql)
+        if entry is None:
+            entry = _entry_for(sql)
+        else:
+            _by_text.move_to_end(sql)
+        stats, locking = entry
+        stats.calls += 1
+        stats.seconds += seconds
+        stats.rows += rows
+        stats.buckets[_bisect(BUCKETS, seconds)] += 1
+        if locking:
+            _lock_wait[0] += seconds
+            _lock_wait[1] += 1
+        if error is not None:
+            stats.errors += 1
+            if "locked" in str(error).lower():
+                _lock_wait[0] += seconds
+                _lock_wait[2] += 1
+
+
+def _explain(connection, sql, parameters):
+    if parameters is None or not sql.lstrip()[:7].upper().startswith(_EXPLAINABLE):
+        return None
+    try:
+        rows = sqlite3.Connection.execute(connection, "EXPLAIN QUERY PLAN " + sql, parameters).fetchall()
+    except sqlite3.Error:
+        return None
+    return "\n".join(row[-1] for row in rows)
+
+
+def _slow_query(sql, seconds, rows, plan):
+    entry = SlowQuery(normalize(sql), seconds, rows, plan, time.time())
+    with _lock:
+        _slow.append(entry)
+    _log().warning("Slow query (%.1f ms, %d rows): %s\n%s", seconds * 1000, rows, entry.sql, plan or "(no plan)")
+
+
+_cursor = sqlite3.Connection.cursor
+_execute = sqlite3.Cursor.execute
+_executemany = sqlite3.Cursor.executemany
+_fetchone = sqlite3.Cursor.fetchone
+_fetchmany = sqlite3.Cursor.fetchmany
+_fetchall = sqlite3.Cursor.fetchall
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    # _pending: [sql, seconds, rows, parameters, plan] of the statement last
+    # run, recorded by _finish() once its rows have been fetched
+    _pending = None
+
+    def _finish(self, explain=True):
+        # explain: the calling thread is the one running the statement, so
+        # its connection may be used for the plan
+        pending = self._pending
+        if pending is None:
+            return
+        self._pending = None
+        if _recording:
+            _observe(pending[0], pending[1], pending[2])
+        if pending[1] >= _slow_threshold and _enabled:
+            sql, seconds, rows, parameters, plan = pending
+            if plan is None and explain:
+                plan = _explain(self.connection, sql, parameters)
+            _slow_query(sql, seconds, rows, plan)
+
+    def _run(self, method, sql, parameters, explain_parameters):
+        if self._pending is not None:
+            self._finish()
+        start = perf_counter()
+        try:
+            method(self, sql, parameters)
+        except sqlite3.Error as e:
+            if _recording:
+                _observe(sql, perf_counter() - start, 0, e)
+            raise
+        seconds = perf_counter() - start
+        rows = self.rowcount
+        plan = _explain(self.connection, sql, explain_parameters) if seconds >= _slow_threshold and _enabled else None
+        self._pending = [sql, seconds, rows if rows > 0 else 0, explain_parameters, plan]
+        if self.description is None:
+            # No rows to fetch: complete now
+            self._finish()
+        return self
+
+    def execute(self, sql, parameters=()):
+        return self._run(_execute, sql, parameters, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._run(_executemany, sql, seq_of_parameters, None)
+
+    def fetchone(self):
+        start = perf_counter()
+        row = _fetchone(self)
+        pending = self._pending
+        if pending is not None:
+            pending[1] += perf_counter() - start
+            if row is not None:
+                pending[2] += 1
+            else:
+                self._finish()
+        return row
+
+    def __next__(self):
+        # `for row in cursor`; a Python call per row, only on instrumented
+        # connections
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        start = perf_counter()
+        rows = _fetchmany(self, size)
+        pending = self._pending
+        if pending is not None:
+            pending[1] += perf_counter() - start
+            pending[2] += len(rows)
+            if len(rows) < size:
+                self._finish()
+        return rows
+
+    def fetchall(self):
+        start = perf_counter()
+        rows = _fetchall(self)
+        pending = self._pending
+        if pending is not None:
+            pending[1] += perf_counter() - start
+            pending[2] += len(rows)
+            self._finish()
+        return rows
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        # Possibly on another thread, after the connection was handed on
+        if self._pending is not None:
+            self._finish(explain=False)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    def cursor(self, factory=InstrumentedCursor):
+        return _cursor(self, factory)
+
+    def execute(self, sql, parameters=()):
+        return _cursor(self, InstrumentedCursor)._run(_execute, sql, parameters, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return _cursor(self, InstrumentedCursor)._run(_executemany, sql, seq_of_parameters, None)
+
+    def commit(self):
+        if not _recording:
+            return super().commit()
+        start = perf_counter()
+        super().commit()
+        _observe("COMMIT", perf_counter() - start, 0)
+
+
+def statements():
+    # [StatementStats, ...] copies, most total time first
+    with _lock:
+        copies = [stats.copy() for stats in _by_key.values()]
+    return sorted(copies, key=lambda stats: stats.seconds, reverse=True)
+
+
+def slow_queries():
+    with _lock:
+        return list(_slow)
+
+
+def lock_wait():
+    # (seconds, waits, timeouts)
+    with _lock:
+        return tuple(_lock_wait)
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")[:300]
+
+
+def prometheus_text():
+    # Prometheus text exposition format
+    lines = [
+        "# HELP timebank_sql_statement_duration_seconds Latency of each SQL statement, fetches included.",
+        "# TYPE timebank_sql_statement_duration_seconds histogram",
+    ]
+    all_stats = statements()
+    for stats in all_stats:
+        label = f'statement="{_label(stats.sql)}"'
+        cumulative = 0
+        for bound, count in zip(BUCKETS, stats.buckets):
+            cumulative += count
+            lines.append(f'timebank_sql_statement_duration_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+        lines.append(f'timebank_sql_statement_duration_seconds_bucket{{{label},le="+Inf"}} {stats.calls}')
+        lines.append(f"timebank_sql_statement_duration_seconds_sum{{{label}}} {stats.seconds:.6f}")
+        lines.append(f"timebank_sql_statement_duration_seconds_count{{{label}}} {stats.calls}")
+
+    for name, help_text, field in (("rows", "Rows returned or changed.", "rows"),
+                                   ("errors", "Statements that raised.", "errors")):
+        lines.append(f"# HELP timebank_sql_{name}_total {help_text}")
+        lines.append(f"# TYPE timebank_sql_{name}_total counter")
+        for stats in all_stats:
+            lines.append(f'timebank_sql_{name}_total{{statement="{_label(stats.sql)}"}} {getattr(stats, field)}')
+
+    seconds, waits, timeouts = lock_wait()
+    lines += [
+        "# HELP timebank_sql_lock_wait_seconds_total Time spent waiting for the write lock.",
+        "# TYPE timebank_sql_lock_wait_seconds_total counter",
+        f"timebank_sql_lock_wait_seconds_total {seconds:.6f}",
+        "# HELP timebank_sql_lock_waits_total Write lock acquisitions.",
+        "# TYPE timebank_sql_lock_waits_total counter",
+        f"timebank_sql_lock_waits_total {waits}",
+        "# HELP timebank_sql_lock_timeouts_total Statements that failed with database is locked.",
+        "# TYPE timebank_sql_lock_timeouts_total counter",
+        f"timebank_sql_lock_timeouts_total {timeouts}",
+        "# HELP timebank_sql_recorded_ratio Fraction of the time statements are recorded.",
+        "# TYPE timebank_sql_recorded_ratio gauge",
+        f"timebank_sql_recorded_ratio {_duty}",
+        "# HELP timebank_sql_slow_queries Slow statements in the log.",
+        "# TYPE timebank_sql_slow_queries gauge",
+        f"timebank_sql_slow_queries {len(slow_queries())}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def export(path):
+    # Writes prometheus_text() atomically, for a textfile collector
+    with open(path + ".partial", "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(path + ".partial", path)
+
+
+def start_export(path, interval=15.0):
+    # Rewrites the export file every interval seconds on a daemon thread
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                export(path)
+            except OSError as e:
+                _log().warning("SQL stats export to %s failed: %s", path, e)
+
+    thread = threading.Thread(target=run, name="sqlstats-export", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,161 @@
+import csv
+from collections import namedtuple
+from contextlib import closing
+
+import db
+import partitions
+
+# Account statements stream from a keyset-paginated cursor: each page is one
+# indexed range read on idx_transactions_account_date starting after the last
+# (transaction_date, transaction_id) of the previous page, so memory stays
+# flat and time grows linearly however long the history is. Running balances
+# are computed as rows go by, starting from the balance at the opening of the
+# period. The whole statement is read inside one read transaction, so it is a
+# consistent snapshot even while postings continue. Archived months are read
+# from their partition files first, oldest first (see partitions.py); which
+# months are archived is part of the snapshot, and their files never change.
+
+StatementLine = namedtuple("StatementLine", ["transaction_id", "date", "type", "description", "status",
+                                             "amount", "balance"])
+
+# Signed balance effect of a row; only completed transactions move the balance
+_EFFECT_SQL = """
+CASE WHEN transaction_status != 'Completed' THEN 0
+     WHEN transaction_type = 'Withdrawal' THEN -transaction_amount
+     ELSE transaction_amount END
+"""
+
+CSV_HEADER = ["Transaction ID", "Date", "Type", "Description", "Status", "Amount", "Balance"]
+
+
+def _posted_since(conn, account_no, start_date):
+    if start_date is None:
+        return conn.execute(f"SELECT COALESCE(SUM({_EFFECT_SQL}), 0) FROM transactions WHERE account_no = ?",
+                            (account_no,)).fetchone()[0]
+    return conn.execute(f"""
+    SELECT COALESCE(SUM({_EFFECT_SQL}), 0) FROM transactions
+    WHERE account_no = ? AND transaction_date >= ?
+    """, (account_no, str(start_date))).fetchone()[0]
+
+
+def opening_balance(conn, account_no, start_date=None):
+    # The current balance less everything posted since the period opened
+    balance = conn.execute("SELECT balance FROM accounts WHERE account_no = ?", (account_no,)).fetchone()
+    if balance is None:
+        raise KeyError(f"Account not found: {account_no}")
+    later = _posted_since(conn, account_no, start_date)
+    for partition in partitions.archived(conn, start_date):
+        with closing(partitions.connect(partition)) as archive:
+            later += _posted_since(archive, account_no, start_date)
+    return (balance[0] or 0) - later
+
+
+def _rows(conn, account_no, start_date, end_date, page_size):
+    # The period's rows of one partition (or the hot file), in posting order
+    after = None
+    while True:
+        page_conditions = ["account_no = ?"]
+        page_params = [account_no]
+        # Later pages start from the keyset alone: with the period start
+        # also present SQLite may seek to it instead, rescanning every
+        # earlier page each time
+        if after is not None:
+            page_conditions.append("(transaction_date, transaction_id) > (?, ?)")
+            page_params.extend(after)
+        elif start_date is not None:
+            page_conditions.append("transaction_date >= ?")
+            page_params.append(str(start_date))
+        if end_date is not None:
+            page_conditions.append("transaction_date < date(?, '+1 day')")
+            page_params.append(str(end_date))
+
+        rows = conn.execute(f"""
+        SELECT transaction_id, transaction_date, transaction_type, transaction_description,
+               transaction_status, transaction_amount, {_EFFECT_SQL}
+        FROM transactions
+        WHERE {' AND '.join(page_conditions)}
+        ORDER BY transaction_date, transaction_id
+        LIMIT ?
+        """, page_params + [page_size]).fetchall()
+        yield from rows
+
+        if len(rows) < page_size:
+            return
+        after = (rows[-1][1], rows[-1][0])
+
+
+def statement_lines(account_no, start_date=None, end_date=None, page_size=1000, pool=None):
+    # Yields StatementLine in posting order. Raises KeyError for an unknown account.
+    # Dates are 'YYYY-MM-DD' (or date objects), both ends inclusive
+    pool = pool or db.get_pool()
+
+    with pool.transaction() as conn:
+        balance = opening_balance(conn, account_no, start_date)
+
+        for partition in partitions.archived(conn, start_date, end_date):
+            with closing(partitions.connect(partition)) as archive:
+                for line in _lines(_rows(archive, account_no, start_date, end_date, page_size), balance):
+                    balance = line.balance
+                    yield line
+        yield from _lines(_rows(conn, account_no, start_date, end_date, page_size), balance)
+
+
+def _lines(rows, balance):
+    # StatementLines with the running balance carried on from `balance`
+    for transaction_id, date, transaction_type, description, status, amount, effect in rows:
+        balance += effect
+        yield StatementLine(transaction_id, date, transaction_type, description, status,
+                            -amount if transaction_type == "Withdrawal" else amount, balance)
+
+
+def write_csv(lines, file):
+    # Returns the number of lines written
+    writer = csv.writer(file)
+    writer.writerow(CSV_HEADER)
+    count = 0
+    for line in lines:
+        writer.writerow([line.transaction_id, line.date, line.type, line.description or "", line.status,
+                         f"{line.amount:.2f}", f"{line.balance:.2f}"])
+        count += 1
+    return count
+
+
+def pages(lines, lines_per_page=50):
+    # Groups lines into fixed-size pages for a page-oriented renderer (PDF,
+    # print); only the current page is held in memory
+    page = []
+    for line in lines:
+        page.append(line)
+        if len(page) == lines_per_page:
+            yield page
+            page = []
+    if page:
+        yield page
+
+
+def write_text(lines, file, title="", lines_per_page=50):
+    # Fixed-width paginated layout, one form feed between pages, ready to be
+    # printed or drawn page by page into a PDF. Returns the number of lines.
+    count = 0
+    for number, page in enumerate(pages(lines, lines_per_page), 1):
+        if number > 1:
+            file.write("\f")
+        file.write(f"{title}  Page {number}\n")
+        file.write(f"{'Date':19}  {'Type':10}  {'Description':30}  {'Amount':>14}  {'Balance':>14}\n")
+        file.write("-" * 95 + "\n")
+        for line in page:
+            file.write(f"{line.date or '':19}  {line.type:10}  {(line.description or '')[:30]:30}  "
+                       f"{line.amount:14,.2f}  {line.balance:14,.2f}\n")
+        count += len(page)
+    return count
+
+
+def export_statement(account_no, path, start_date=None, end_date=None, pool=None):
+    # Writes a .csv statement, or the paginated text layout for any other
+    # extension. Returns the number of transactions written.
+    lines = statement_lines(account_no, start_date, end_date, pool=pool)
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        if path.lower().endswith(".csv"):
+            return write_csv(lines, file)
+        period = f"{start_date or 'opening'} to {end_date or 'today'}"
+        return write_text(lines, file, title=f"Statement for account {account_no}, {period}")
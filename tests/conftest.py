@@ -0,0 +1,54 @@
+import pytest
+
+import db
+import partitions
+from migrations import migrate
+
+ACCOUNTS = (10001, 10002, 10003)
+
+# Three closed months that archive() moves into partition files, and a
+# fourth that stays in the hot file
+MONTHS = ("2024-01", "2024-02", "2024-03", "2024-04")
+
+
+def new_pool(path):
+    # A migrated database with ACCOUNTS open at branch 1
+    pool = db.ConnectionPool(str(path))
+    migrate(pool)
+    with pool.transaction() as conn:
+        conn.executemany("""
+        INSERT INTO customer (cust_id, cust_name, phone, city, address, email) VALUES (?, ?, ?, 'Cairo', '', '')
+        """, ((account_no - 10000, f"Customer {account_no}", account_no) for account_no in ACCOUNTS))
+        conn.executemany("""
+        INSERT INTO accounts (account_no, cust_id, balance, account_type, branch_id) VALUES (?, ?, 0, 'Savings', 1)
+        """, ((account_no, account_no - 10000) for account_no in ACCOUNTS))
+    return pool
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = new_pool(tmp_path / "time_bank.db")
+    yield pool
+    pool.close_all()
+
+
+@pytest.fixture(scope="module")
+def archived_pool(tmp_path_factory):
+    # A few transactions a day in each of MONTHS, all but the last archived.
+    # Shared by a module's tests, which must only read it.
+    pool = new_pool(tmp_path_factory.mktemp("archived") / "time_bank.db")
+    rows = []
+    for month in MONTHS:
+        for day in range(1, 29):
+            for i, account_no in enumerate(ACCOUNTS):
+                rows.append((account_no, "Withdrawal" if i % 2 else "Deposit", 50.0 + 5000 * i,
+                             f"{month}-{day:02d} 10:00:0{i}", "Failed" if day % 7 == 0 else "Completed"))
+    with pool.transaction() as conn:
+        conn.executemany("""
+        INSERT INTO transactions (account_no, transaction_type, transaction_amount, transaction_date,
+                                  transaction_status)
+        VALUES (?, ?, ?, ?, ?)
+        """, rows)
+    partitions.archive(MONTHS[-1], pool=pool)
+    yield pool
+    pool.close_all()
@@ -0,0 +1,101 @@
+import multiprocessing
+import random
+
+import audit
+import db
+import ledger
+import metrics
+
+from conftest import ACCOUNTS
+
+PROCESSES = 4
+OPERATIONS = 250
+OPENING_DEPOSIT = 500
+
+
+def run_worker(path, seed, barrier, results):
+    # One teller process: its own pool on the shared file, a random mix of
+    # postings, transfers and batches. Reports the transaction rows it wrote
+    # and the postings rejected as business-rule failures.
+    pool = db.ConnectionPool(path)
+    rng = random.Random(seed)
+    written = rejected = 0
+    barrier.wait()
+    try:
+        for _ in range(OPERATIONS):
+            kind = rng.random()
+            account_no, other = rng.sample(ACCOUNTS, 2)
+            amount = float(rng.randint(1, 120))
+            try:
+                if kind < 0.35:
+                    ledger.post(account_no, rng.choice(ledger.TRANSACTION_TYPES), amount, pool=pool)
+                    written += 1
+                elif kind < 0.7:
+                    ledger.transfer(account_no, other, amount, pool=pool)
+                    written += 2
+                elif kind < 0.85:
+                    report = ledger.post_batch([(rng.choice(ACCOUNTS), rng.choice(ledger.TRANSACTION_TYPES),
+                                                 float(rng.randint(1, 120))) for _ in range(20)], pool=pool)
+                    written += report.posted
+                    rejected += len(report.failed)
+                else:
+                    rows = [tuple(rng.sample(ACCOUNTS, 2)) + (float(rng.randint(1, 120)),) for _ in range(10)]
+                    report = ledger.transfer_batch(rows, pool=pool)
+                    written += 2 * report.posted
+                    rejected += len(report.failed)
+            except ledger.PostingError:
+                rejected += 1
+        results.put((seed, written, rejected, None))
+    except Exception as e:
+        results.put((seed, written, rejected, repr(e)))
+    finally:
+        audit.get_writer(pool).close()
+        pool.close_all()
+
+
+def test_concurrent_posting_processes(pool):
+    for account_no in ACCOUNTS:
+        ledger.post(account_no, "Deposit", OPENING_DEPOSIT, pool=pool)
+
+    # Separate interpreters, as separate teller processes would be
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(PROCESSES)
+    results = context.Queue()
+    workers = [context.Process(target=run_worker, args=(pool.db_name, seed, barrier, results))
+               for seed in range(PROCESSES)]
+    for worker in workers:
+        worker.start()
+    reports = [results.get(timeout=300) for _ in workers]
+    for worker in workers:
+        worker.join(timeout=60)
+        assert worker.exitcode == 0
+
+    assert [report[3] for report in reports] == [None] * PROCESSES
+    written = sum(report[1] for report in reports)
+    assert written > 0 and sum(report[2] for report in reports) > 0
+
+    audit.copy_pending(pool)
+    with pool.connection() as conn:
+        # Every reported posting is there once, nothing else is
+        count = conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+        assert count == len(ACCOUNTS) + written
+
+        # No update was lost: each balance is what its transactions add up to
+        # (whole amounts, so the sums are exact), and none went negative
+        balances = dict(conn.execute("SELECT account_no, balance FROM accounts").fetchall())
+        sums = dict(conn.execute(f"""
+        SELECT account_no, SUM({ledger.SIGNED_AMOUNT_SQL}) FROM transactions GROUP BY account_no
+        """).fetchall())
+        assert balances == sums
+        assert min(balances.values()) >= 0
+
+        # Transfers move money, never create it: the legs pair up and net out
+        legs = conn.execute("""
+        SELECT COUNT(*), SUM(transaction_amount), SUM(transaction_amount > 0) FROM transactions
+        WHERE transaction_type = 'Transfer'
+        """).fetchone()
+        assert legs[0] == 2 * legs[2] and legs[1] == 0
+
+    # The trigger-maintained totals and the audit trail agree with the ledger
+    assert metrics.reconcile(pool=pool) == []
+    assert audit.verify(pool) == ([], [], [])
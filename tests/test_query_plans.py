@@ -0,0 +1,170 @@
+import itertools
+import re
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+import pages
+import partitions
+import services
+import statements
+
+from conftest import MONTHS
+
+# "SCAN t USING INDEX ..." under ORDER BY ... LIMIT walks the index and stops
+# early; a bare "SCAN t" or a temp b-tree sort reads the whole table.
+FULL_SCAN = re.compile(r"^SCAN \S+$|USE TEMP B-TREE")
+
+# The Manager's transaction browser filters (services.transaction_filter)
+BROWSER_FILTERS = {
+    "dates": {"start_date": "2024-02-01", "end_date": "2024-04-30"},
+    "branch": {"branch_id": 1},
+    "type": {"transaction_type": "Withdrawal"},
+    "status": {"status": "Failed"},
+    "completed": {"status": "Completed"},
+    "amount": {"amount_band": "100 - 999.99"},
+    "large": {"amount_band": "10,000 and over"},
+}
+
+
+def browser_filters():
+    names = list(BROWSER_FILTERS)
+    params = []
+    for size in range(len(names) + 1):
+        for combination in itertools.combinations(names, size):
+            if {"status", "completed"} <= set(combination) or {"amount", "large"} <= set(combination):
+                continue
+            filters = {}
+            for name in combination:
+                filters.update(BROWSER_FILTERS[name])
+            params.append(pytest.param(filters, id="+".join(combination) or "none"))
+    return params
+
+
+def query_plan(conn, sql, params=()):
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def view_tables(conn):
+    # The transactions tables temp.transaction_history currently reads
+    sql = conn.execute("SELECT sql FROM sqlite_temp_master WHERE type = 'view' AND name = ?",
+                       (partitions.HISTORY_VIEW,)).fetchone()[0]
+    return re.findall(r"FROM (\w+\.transactions)", sql)
+
+
+def assert_indexed(plan, tables=()):
+    assert not [step for step in plan if FULL_SCAN.search(step)], plan
+    for table in tables:
+        steps = [step for step in plan if step.split(" ")[1:2] == [table]]
+        assert steps and all(" USING " in step for step in steps), (table, plan)
+
+
+@pytest.mark.parametrize("keyed", [False, True], ids=["first page", "later page"])
+@pytest.mark.parametrize("filters", browser_filters())
+def test_transaction_browser_pages(archived_pool, filters, keyed):
+    # As TimeBankManagerDashboard.filter_transactions sets the model up:
+    # without dates only the current month, else the months the range reaches
+    where, params = services.transaction_filter(**filters)
+    start_date, end_date = filters.get("start_date"), filters.get("end_date")
+    if start_date is None and end_date is None:
+        start_date = f"{MONTHS[-1]}-01"
+    after_key = ("2024-04-10 10:00:00", 500) if keyed else None
+
+    with archived_pool.connection() as conn:
+        partitions.history_window(conn, after_key, start_date, end_date)
+        tables = view_tables(conn)
+        assert len(tables) == (3 if "start_date" in filters else 1)
+        plan = query_plan(conn, pages.page_sql(pages.TRANSACTIONS, where, keyed),
+                          (after_key or ()) + params)
+    assert_indexed(plan, tables)
+
+
+@pytest.mark.parametrize("keyed", [False, True], ids=["first page", "later page"])
+def test_account_history_pages(archived_pool, keyed):
+    after_key = ("2024-03-10 10:00:00", 500) if keyed else None
+    with archived_pool.connection() as conn:
+        partitions.history_window(conn, after_key)
+        tables = view_tables(conn)
+        assert len(tables) == 1 + 3
+        plan = query_plan(conn, pages.page_sql(pages.ACCOUNT_HISTORY, "t.account_no = ?", keyed),
+                          (after_key or ()) + (10001,))
+    assert_indexed(plan, tables)
+    assert all("idx_transactions_account_date" in step for step in plan if step.startswith("SEARCH")), plan
+
+
+def test_account_history_window_reads_every_month(archived_pool, monkeypatch):
+    # More archived months than can be attached at once: pages still read
+    # through indexes, and reading on below the window's stop key reaches
+    # every row
+    monkeypatch.setattr(partitions, "MAX_ATTACHED", 2)
+    with archived_pool.connection() as conn:
+        rows = []
+        after_key = None
+        while True:
+            page = pages.read_page(conn, pages.ACCOUNT_HISTORY, after_key, "t.account_no = ?", (10001,), 10,
+                                   partitions.history_window)
+            tables = view_tables(conn)
+            assert len(tables) <= 3
+            assert_indexed(query_plan(conn, pages.page_sql(pages.ACCOUNT_HISTORY, "t.account_no = ?", True),
+                                      ("2024-03-10 10:00:00", 500, 10001)), tables)
+            rows += page
+            if len(page) < 10:
+                break
+            after_key = page[-1][-2:]
+    assert len(rows) == len(MONTHS) * 28
+    keys = [row[-2:] for row in rows]
+    assert keys == sorted(keys, reverse=True)
+
+
+@pytest.mark.parametrize("query, where, params, after_key", [
+    (pages.EMPLOYEES, None, (), (1000,)),
+    (pages.EMPLOYEE_ACTIONS, None, (), ("2024-01-01 00:00:00", 500)),
+], ids=["employees", "employee actions"])
+def test_dashboard_pages(pool, query, where, params, after_key):
+    with pool.connection() as conn:
+        # The first page walks the table in key order and stops at the limit
+        first = query_plan(conn, pages.page_sql(query, where), params)
+        later = query_plan(conn, pages.page_sql(query, where, keyed=True), after_key + params)
+    assert not [step for step in first if "USE TEMP B-TREE" in step], first
+    assert_indexed(later)
+
+
+def test_search_results_page(pool):
+    # Ranked matches are sorted by rank, so a temp b-tree is expected; it
+    # holds only the rows the MATCH found, never a whole table
+    with pool.connection() as conn:
+        plan = query_plan(conn, pages.page_sql(pages.SEARCH_RESULTS, "customer_fts MATCH ?", keyed=True, limit=50),
+                          (-1.0, 10001, '"cust"*'))
+    assert not [step for step in plan if re.search(r"^SCAN \S+$", step)], plan
+
+
+def test_statement_queries(archived_pool, monkeypatch):
+    # Every SELECT a statement runs, on the hot file and on each partition
+    # file it reads, is traced and its plan checked where it ran
+    traced = []
+
+    def connect(partition):
+        conn = sqlite3.connect(partitions._uri(partition.path), uri=True, isolation_level=None,
+                               check_same_thread=False)
+        conn.set_trace_callback(lambda sql: traced.append((partition.path, sql)))
+        return conn
+
+    monkeypatch.setattr(partitions, "connect", connect)
+    with archived_pool.connection() as conn:
+        conn.set_trace_callback(lambda sql: traced.append((archived_pool.db_name, sql)))
+        try:
+            lines = list(statements.statement_lines(10001, "2024-02-01", "2024-04-15", page_size=10,
+                                                    pool=archived_pool))
+        finally:
+            conn.set_trace_callback(None)
+    assert len(lines) == 28 * 2 + 15
+
+    selects = [(path, sql) for path, sql in traced if sql.lstrip().upper().startswith("SELECT")]
+    assert {path for path, _ in selects} == {archived_pool.db_name} | {
+        partitions.partition_path(archived_pool.db_name, month) for month in MONTHS[1:3]}
+    for path, sql in selects:
+        if "transaction_partitions" in sql:
+            continue
+        with closing(sqlite3.connect(path)) as source:
+            assert_indexed(query_plan(source, sql))
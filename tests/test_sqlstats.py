@@ -0,0 +1,66 @@
+import gc
+
+import pytest
+
+import db
+import sqlstats
+
+
+@pytest.fixture
+def stats_pool(tmp_path):
+    # Instrumented connections recording every statement
+    sqlstats.enable(slow_threshold=10.0, duty=1.0)
+    sqlstats.reset()
+    pool = db.ConnectionPool(str(tmp_path / "stats.db"))
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT)")
+        conn.executemany("INSERT INTO t (v) VALUES (?)", ((str(i),) for i in range(100)))
+    yield pool
+    pool.close_all()
+    sqlstats.disable()
+    sqlstats.reset()
+
+
+def stats_for(sql):
+    return next(stats for stats in sqlstats.statements() if stats.sql == sqlstats.normalize(sql))
+
+
+def test_iterated_rows_are_counted(stats_pool):
+    sql = "SELECT id FROM t WHERE id <= 40"
+    with stats_pool.connection() as conn:
+        assert len([row for row in conn.execute(sql)]) == 40
+        for _ in conn.execute(sql):
+            break
+    # The exhausted cursor is recorded at once, the abandoned one when dropped
+    gc.collect()
+    stats = stats_for(sql)
+    assert (stats.calls, stats.rows) == (2, 41)
+
+
+def test_raw_texts_are_bounded(stats_pool, monkeypatch):
+    monkeypatch.setattr(sqlstats, "MAX_TEXTS", 10)
+    with stats_pool.connection() as conn:
+        for i in range(50):
+            conn.execute(f"SELECT v FROM t WHERE id = {i}").fetchall()
+    assert len(sqlstats._by_text) == 10
+    assert stats_for("SELECT v FROM t WHERE id = 1").calls == 50
+
+
+def test_slow_plan_is_taken_while_the_statement_runs(stats_pool, monkeypatch):
+    monkeypatch.setattr(sqlstats, "_slow_threshold", 0.0)
+    with stats_pool.connection() as conn:
+        conn.execute("SELECT v FROM t WHERE id = ?", (1,)).fetchall()
+        monkeypatch.setattr(sqlstats, "_slow_threshold", 10.0)
+        cursor = conn.execute("SELECT v FROM t WHERE id > ?", (1,))
+        cursor.fetchone()
+    # Only slow once fetched, and dropped with rows unread after the
+    # connection went back to the pool: logged without touching it
+    monkeypatch.setattr(sqlstats, "_slow_threshold", 0.0)
+    monkeypatch.setattr(sqlstats, "_explain", lambda *args: pytest.fail("explained on a released connection"))
+    del cursor
+    gc.collect()
+
+    slow = {entry.sql: entry for entry in sqlstats.slow_queries()}
+    assert "SEARCH t USING INTEGER PRIMARY KEY" in slow["SELECT v FROM t WHERE id = ?"].plan
+    assert slow["SELECT v FROM t WHERE id > ?"].rows == 1
+    assert slow["SELECT v FROM t WHERE id > ?"].plan is None
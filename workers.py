@@ -0,0 +1,100 @@
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class _Request:
+    def __init__(self, key, fn, args):
+        self.key = key
+        self.fn = fn
+        self.args = args
+        self.callbacks = []
+        self.cancelled = False
+
+
+class _Signals(QObject):
+    finished = pyqtSignal(object, object)
+    failed = pyqtSignal(object, object)
+
+
+class _Job(QRunnable):
+    def __init__(self, request, signals):
+        super().__init__()
+        self.request = request
+        self.signals = signals
+
+    def run(self):
+        # Superseded before a thread picked it up
+        if self.request.cancelled:
+            return
+        try:
+            result = self.request.fn(*self.request.args)
+        except Exception as e:
+            self.signals.failed.emit(self.request, e)
+            return
+        self.signals.finished.emit(self.request, result)
+
+
+class QueryExecutor(QObject):
+    # Runs database work on QThreadPool threads and delivers the result back on
+    # the GUI thread through queued signals.
+    #
+    # Requests submitted with a key are tracked per key: submitting the same
+    # fn and args while one is still in flight joins it instead of running the
+    # query again (e.g. Refresh clicked repeatedly), and submitting different
+    # args supersedes it, so its result is dropped (e.g. a newer search term).
+    # Requests without a key, such as postings, always run and always report.
+    #
+    # fn runs off the GUI thread and must not touch widgets; it gets its own
+    # pooled connection through db.connection()/db.transaction().
+
+    def __init__(self, thread_pool=None, parent=None):
+        super().__init__(parent)
+        self._thread_pool = thread_pool or QThreadPool.globalInstance()
+        self._in_flight = {}
+
+        self._signals = _Signals()
+        self._signals.finished.connect(self._on_finished)
+        self._signals.failed.connect(self._on_failed)
+
+    def submit(self, key, fn, args=(), on_result=None, on_error=None):
+        args = tuple(args)
+        current = self._in_flight.get(key) if key is not None else None
+
+        if current is not None and current.fn is fn and current.args == args:
+            current.callbacks.append((on_result, on_error))
+            return current
+
+        if current is not None:
+            current.cancelled = True
+
+        request = _Request(key, fn, args)
+        request.callbacks.append((on_result, on_error))
+        if key is not None:
+            self._in_flight[key] = request
+        self._thread_pool.start(_Job(request, self._signals))
+        return request
+
+    def cancel(self, key):
+        request = self._in_flight.pop(key, None)
+        if request is not None:
+            request.cancelled = True
+
+    def cancel_all(self):
+        for key in list(self._in_flight):
+            self.cancel(key)
+
+    def _complete(self, request):
+        if request.key is not None and self._in_flight.get(request.key) is request:
+            del self._in_flight[request.key]
+        return not request.cancelled
+
+    def _on_finished(self, request, result):
+        if self._complete(request):
+            for on_result, _ in request.callbacks:
+                if on_result is not None:
+                    on_result(result)
+
+    def _on_failed(self, request, error):
+        if self._complete(request):
+            for _, on_error in request.callbacks:
+                if on_error is not None:
+                    on_error(error)
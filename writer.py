@@ -0,0 +1,129 @@
+import queue
+import threading
+from concurrent.futures import Future
+
+import audit
+import db
+import ledger
+
+# A single thread that owns the only write connection of a process and runs
+# write commands from a queue, for servers where many clients post at once
+# (see api.py). Without it every request thread opens its own write
+# transaction and they queue on SQLite's lock inside the busy handler, where
+# a long wait ends in "database is locked"; here they queue in memory instead
+# and only one connection ever asks SQLite for the write lock.
+#
+# Commands waiting in the queue are committed together: the writer takes up
+# to max_group of them, runs each in its own SAVEPOINT inside one BEGIN
+# IMMEDIATE transaction and commits once. A command that raises only rolls
+# back its own savepoint. Results are delivered through the returned futures
+# after the commit, so a client is never told a write succeeded before it is
+# durable. Readers keep using the pool in parallel under WAL.
+
+
+class WriterBusy(Exception):
+    # The queue is full; the client should retry later
+    pass
+
+
+class _Command:
+    def __init__(self, fn, args):
+        self.fn = fn
+        self.args = args
+        self.future = Future()
+        self.result = None
+        self.error = None
+
+
+class SerialWriter:
+    def __init__(self, pool=None, max_group=256, max_queue=10000):
+        self.pool = pool or db.get_pool()
+        self.max_group = max_group
+
+        self._queue = queue.Queue(max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="serial-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, fn, *args):
+        # Queues fn(conn, *args) and returns a concurrent.futures.Future for
+        # its result. Raises WriterBusy if max_queue commands are waiting.
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Writer is closed")
+        self.start()
+        command = _Command(fn, args)
+        try:
+            self._queue.put_nowait(command)
+        except queue.Full:
+            raise WriterBusy("Too many writes waiting, try again")
+        return command.future
+
+    def _next_group(self):
+        command = self._queue.get()
+        if command is None:
+            return None
+        group = [command]
+        while len(group) < self.max_group:
+            try:
+                command = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if command is None:
+                # Finish this group, then stop
+                self._queue.put(None)
+                break
+            group.append(command)
+        return group
+
+    def _run(self):
+        with self.pool.connection() as conn:
+            while True:
+                group = self._next_group()
+                if group is None:
+                    return
+                group = [command for command in group if command.future.set_running_or_notify_cancel()]
+                if group:
+                    self._commit_group(conn, group)
+
+    def _commit_group(self, conn, group):
+        try:
+            ledger.with_retry(lambda: conn.execute("BEGIN IMMEDIATE"))
+            for command in group:
+                conn.execute("SAVEPOINT command")
+                try:
+                    command.result = command.fn(conn, *command.args)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO command")
+                    command.error = e
+                conn.execute("RELEASE command")
+            conn.execute("COMMIT")
+        except Exception as e:
+            # Nothing in the group was committed
+            if conn.in_transaction:
+                conn.rollback()
+            for command in group:
+                command.future.set_exception(e)
+            return
+
+        for command in group:
+            if command.error is not None:
+                command.future.set_exception(command.error)
+            else:
+                command.future.set_result(command.result)
+        audit.notify(self.pool)
+
+    def close(self):
+        # Runs every command already queued, then stops the thread
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()